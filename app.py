@@ -17,7 +17,16 @@ from constants import *
 from ui_components import *
 from data_loader import *
 from preview_tables import *
+from problem_instance import build_problem_instance
+from instance_snapshot import save_snapshot
+from feasibility import analyze_feasibility, format_issue, has_errors
 from solver_cp_sat import build_and_solve_model
+from rolling_horizon import solve_rolling_horizon
+from lns import solve_lns
+from headless import load_solution
+from heuristics import greedy_solution
+from solve_jobs import start_job, get_job, stop_job, cancel_job, forget_job, JOB_CANCELLED, JOB_FAILED
+from workbook_cache import get_workbook_cache
 from postprocessing import *
 import pandas as pd
 
@@ -43,6 +52,8 @@ st.session_state.setdefault(SS_STAGE, STAGE_UPLOAD)
 st.session_state.setdefault(SS_UPLOADED_FILE, None)
 st.session_state.setdefault(SS_EXCEL_DATA, None)
 st.session_state.setdefault(SS_SOLUTION, None)
+st.session_state.setdefault(SS_WARM_START, None)
+st.session_state.setdefault(SS_SOLVE_JOB, None)
 st.session_state.setdefault(SS_GRADE_COLORS, {})
 st.session_state.setdefault(SS_OPTIMIZATION_PARAMS, {
     'time_limit_min': DEFAULT_TIME_LIMIT_MIN,
@@ -51,6 +62,11 @@ st.session_state.setdefault(SS_OPTIMIZATION_PARAMS, {
     'transition_penalty': DEFAULT_TRANSITION_PENALTY,
 })
 
+# A refreshed page starts a new session; reattach to the solve named in the URL
+if st.session_state[SS_SOLVE_JOB] is None and get_job(st.query_params.get('job')) is not None:
+    st.session_state[SS_SOLVE_JOB] = st.query_params['job']
+    st.session_state[SS_STAGE] = STAGE_OPTIMIZING
+
 
 # ========== STAGE 0: UPLOAD ==========
 def render_upload_stage():
@@ -83,9 +99,18 @@ def render_upload_stage():
             render_alert("File uploaded successfully! Processing...", "success")
 
             try:
-                file_buffer = io.BytesIO(uploaded_file.read())
-                loader = ExcelDataLoader(file_buffer)
-                success, data, errors, warnings = loader.load_and_validate()
+                file_bytes = uploaded_file.getvalue()
+                workbook_cache = get_workbook_cache()
+                cached = workbook_cache.get(file_bytes)
+
+                if cached is not None:
+                    data, warnings = cached
+                    success, errors = True, []
+                else:
+                    loader = ExcelDataLoader(io.BytesIO(file_bytes))
+                    success, data, errors, warnings = loader.load_and_validate()
+                    if success:
+                        workbook_cache.put(file_bytes, data, warnings)
 
                 if success:
                     st.session_state[SS_EXCEL_DATA] = data
@@ -106,6 +131,12 @@ def render_upload_stage():
         # Download template section
         render_download_template_button()
         
+        cache_stats = get_workbook_cache().stats()
+        st.caption(
+            f"Workbook cache: {cache_stats['entries']} file(s), {cache_stats['size_bytes'] / 1024 ** 2:.1f} MB; "
+            f"{cache_stats['hits']} hit(s), {cache_stats['misses']} miss(es) since the app started"
+        )
+        
 
     # ========== RIGHT COLUMN: Quick Start Guide (In Card) ==========
     with col2:
@@ -360,6 +391,39 @@ def render_preview_stage():
             help="Choose penalty approach."
         )
 
+    rolling_horizon = st.checkbox(
+        "Rolling horizon (long plans, lower quality)",
+        value=current_params.get('rolling_horizon', False),
+        help=f"Solve {ROLLING_WINDOW_DAYS}-day windows and keep the first {ROLLING_COMMIT_DAYS} days of each. "
+             f"Scales to long horizons, but on horizons longer than one window the plan is usually worse "
+             f"than a full solve."
+    )
+    lns = st.checkbox(
+        "Large Neighborhood Search (large sites)",
+        value=current_params.get('lns', False),
+        disabled=rolling_horizon,
+        help=f"Improve a first schedule by re-solving one line, one {LNS_WINDOW_DAYS}-day window or a few grades "
+             f"at a time, {LNS_NEIGHBORHOOD_SECONDS:g} s each, until the time limit."
+    )
+
+    previous_solution = st.session_state.get(SS_SOLUTION)
+    with st.expander("Warm start"):
+        warm_start = st.checkbox(
+            "Start from the previous solution",
+            value=current_params.get('warm_start', False) and previous_solution is not None,
+            disabled=previous_solution is None,
+            help="Hint the solver with the last schedule, matched by line, date and grade. "
+                 "Speeds up re-runs after small parameter changes."
+        )
+        warm_start_file = st.file_uploader("...or from a saved solution (JSON result)", type=['json'])
+        greedy_hint = st.checkbox(
+            "Otherwise start from a greedy plan",
+            value=current_params.get('greedy_hint', False),
+            help="Hint the solver with the instant greedy schedule to find a first plan sooner."
+        )
+        if rolling_horizon or lns:
+            st.caption("Warm starts apply to the full solve only; rolling horizon and LNS ignore them.")
+
     # =========================
     # 2a) Penalty Ratio (Standard Only)
     # =========================
@@ -442,9 +506,23 @@ def render_preview_stage():
         'buffer_days': int(buffer_days),
         'stockout_penalty': int(stockout_penalty),
         'transition_penalty': int(transition_penalty),
-        'penalty_method': selected_method
+        'penalty_method': selected_method,
+        'rolling_horizon': bool(rolling_horizon),
+        'lns': bool(lns) and not rolling_horizon,
+        'warm_start': bool(warm_start),
+        'greedy_hint': bool(greedy_hint),
     }
 
+    warm_start_solution = None
+    if warm_start_file is not None:
+        try:
+            warm_start_solution = load_solution(io.BytesIO(warm_start_file.getvalue()))
+        except ValueError as e:
+            render_alert(f"Warm-start file ignored: {e}", "warning")
+    elif warm_start and previous_solution is not None:
+        warm_start_solution = previous_solution.get('solution')
+    st.session_state[SS_WARM_START] = warm_start_solution
+
     # =========================
     # 4) NAVIGATION
     # =========================
@@ -455,6 +533,22 @@ def render_preview_stage():
             st.session_state[SS_STAGE] = STAGE_UPLOAD
             st.rerun()
 
+    with col_nav2:
+        if st.button("⚡ Instant Greedy Plan", use_container_width=True,
+                     help="Build a schedule in milliseconds without the solver (not optimized)"):
+            params = st.session_state[SS_OPTIMIZATION_PARAMS]
+            instance, _ = build_problem_instance(excel_data, params['buffer_days'])
+            feasibility_issues = analyze_feasibility(instance)
+            if has_errors(feasibility_issues):
+                for issue in feasibility_issues:
+                    render_alert(format_issue(issue), issue['severity'])
+                render_alert("❌ Input data has conflicting constraints; fix the workbook before planning.", "error")
+            else:
+                solution = greedy_solution(instance, params['stockout_penalty'], params['transition_penalty'])
+                st.session_state[SS_SOLUTION] = solution_state('GREEDY', solution, instance, params)
+                st.session_state[SS_STAGE] = STAGE_RESULTS
+                st.rerun()
+
     with col_nav3:
         if st.button("🎯 Run Optimization →", use_container_width=True, type="primary"):
             st.session_state[SS_STAGE] = STAGE_OPTIMIZING
@@ -463,9 +557,36 @@ def render_preview_stage():
 
 
 
+def solution_state(status, solution: dict, instance, params: dict, warm_start: Optional[dict] = None) -> dict:
+    """Session-state record of a schedule for the results stage"""
+    return {
+        'status': status,
+        'solution': solution,
+        'instance': instance,
+        'params': dict(params),
+        'warm_start': warm_start,
+        'solve_time': solution.get('time', 0) if isinstance(solution, dict) else 0,
+        'data': {
+            'grades': instance.grades,
+            'lines': instance.lines,
+            'dates': instance.dates,
+            'num_days': instance.num_days,
+            'buffer_days': instance.buffer_days,
+            'shutdown_periods': instance.shutdown_periods,
+            'allowed_lines': instance.allowed_lines,
+            'min_inventory': instance.grade_name_map(instance.min_inventory),
+            'max_inventory': instance.grade_name_map(instance.max_inventory),
+            'initial_inventory': instance.grade_name_map(instance.initial_inventory),
+            'pre_shutdown_grades': instance.line_grade_map(instance.pre_shutdown_grade),
+            'restart_grades': instance.line_grade_map(instance.restart_grade),
+            'capacities': dict(zip(instance.lines, instance.capacities.tolist())),
+        }
+    }
+
+
 # ========== STAGE 2: OPTIMIZATION IN PROGRESS ==========
 def render_optimization_stage():
-    """Stage 2: Show optimization in progress with animation"""
+    """Stage 2: Start the solve in the background and poll it until it finishes"""
     render_header(f"{APP_ICON} {APP_TITLE}", "Optimization in Progress")
     render_stage_progress(2)
 
@@ -477,158 +598,174 @@ def render_optimization_stage():
         </div>
     """, unsafe_allow_html=True)
 
+    progress_bar = st.progress(0.0)
+    status_text = st.empty()
+
+    job = get_job(st.session_state.get(SS_SOLVE_JOB))
+    if job is None:
+        job = start_optimization_job(progress_bar, status_text)
+        if job is None:
+            return
+
+    # Notes recorded when the job was started (instance warnings, feasibility findings)
+    for message, severity in job.notes:
+        render_alert(message, severity)
+
+    progress_bar.progress(min(0.4 + job.progress * 0.6, 1.0))
+    col1, col2, col3 = st.columns([1, 1, 1])
+    best_objective = job.best_objective
+    render_metric_card("Best Objective", f"{best_objective:,.0f}" if best_objective is not None else "—", col1, 0)
+    render_metric_card("Time Elapsed", f"{job.elapsed:.0f}s", col2, 1)
+    render_metric_card("Time Limit", f"{job.params['time_limit_min'] * 60:.0f}s", col3, 2)
+
+    objective_trace = job.objective_trace()
+    if objective_trace:
+        st.plotly_chart(create_objective_trace_chart(objective_trace), use_container_width=True)
+
+    if job.is_running:
+        status_text.info(f"⚡ {job.message}")
+        # Rolling horizon and LNS chain several solves; stopping one of them would not end the run
+        single_solve = not (job.params.get('rolling_horizon') or job.params.get('lns'))
+        col_stop, col_cancel = st.columns(2)
+        with col_stop:
+            if single_solve and st.button(
+                "⏹ Stop and Keep Best", disabled=best_objective is None or job.stopped_early,
+                help="End the search now and continue with the best schedule found so far"
+            ):
+                stop_job(job.job_id)
+        with col_cancel:
+            if st.button("✖ Cancel Optimization"):
+                cancel_job(job.job_id)
+                leave_optimization_stage(job.job_id, STAGE_PREVIEW)
+        time.sleep(SOLVE_POLL_SECONDS)
+        st.rerun()
+
+    if job.status == JOB_CANCELLED:
+        leave_optimization_stage(job.job_id, STAGE_PREVIEW)
+
+    if job.status == JOB_FAILED:
+        status_text.error("❌ Optimization failed.")
+        render_error_state("Optimization Error", "An error occurred while solving.")
+        st.code(job.error)
+        if st.button("← Back to Configuration"):
+            leave_optimization_stage(job.job_id, STAGE_PREVIEW)
+        return
+
+    status, solution_callback, solver = job.result
+    instance, params = job.instance, job.params
+
+    # Check solution
+    num_found = 0
+    try:
+        num_found = int(solution_callback.num_solutions()) if hasattr(solution_callback, 'num_solutions') else 0
+    except Exception:
+        try:
+            num_found = len(getattr(solution_callback, 'solutions', []))
+        except Exception:
+            num_found = 0
+
+    if num_found > 0:
+        if job.stopped_early:
+            status_text.success("✅ Optimization stopped; keeping the best schedule found.")
+        else:
+            status_text.success("✅ Optimization completed successfully!")
+        # Extract solution
+        last_solution = None
+        try:
+            last_solution = solution_callback.solutions[-1]
+        except Exception:
+            last_solution = solution_callback if isinstance(solution_callback, dict) else {}
+
+        # Store solution (unchanged structure)
+        st.session_state[SS_SOLUTION] = solution_state(
+            status, last_solution, instance, params, getattr(solution_callback, 'warm_start', None)
+        )
+        st.success("Optimization complete! Redirecting to results...")
+        leave_optimization_stage(job.job_id, STAGE_RESULTS)
+    elif status != cp_model.INFEASIBLE:
+        # Timed out without a solution: keep the planner working with the greedy plan
+        status_text.warning("⚠️ No solver solution found; showing the greedy plan.")
+        fallback_solution = greedy_solution(instance, params['stockout_penalty'], params['transition_penalty'])
+        st.session_state[SS_SOLUTION] = solution_state('GREEDY_FALLBACK', fallback_solution, instance, params)
+        leave_optimization_stage(job.job_id, STAGE_RESULTS)
+    else:
+        status_text.error("❌ No feasible solution found.")
+        render_error_state(
+            "No Solution Found",
+            "The solver could not find a feasible solution. Please check your constraints and try again."
+        )
+        # Provide navigation back
+        if st.button("← Back to Configuration"):
+            leave_optimization_stage(job.job_id, STAGE_PREVIEW)
+
+
+def start_optimization_job(progress_bar, status_text):
+    """Check the data and submit the background solve; returns the job, or None if the data cannot be solved"""
     excel_data = st.session_state.get(SS_EXCEL_DATA)
     if not excel_data:
         render_error_state("No Data Found", "Please upload a file first.")
         if st.button("← Back to Upload"):
             st.session_state[SS_STAGE] = STAGE_UPLOAD
             st.rerun()
-        return
+        return None
 
     params = st.session_state[SS_OPTIMIZATION_PARAMS]
-    progress_bar = st.progress(0.0)
-    status_text = st.empty()
+    notes = []
 
     try:
-        status_text.info("📄 Processing plant data...")
-        plant_data = process_plant_data(excel_data['Plant'])
-        progress_bar.progress(0.1)
-
-        status_text.info("📄 Processing inventory data...")
-        inventory_data = process_inventory_data(excel_data['Inventory'], plant_data['lines'])
-        progress_bar.progress(0.2)
-
-        status_text.info("📄 Processing demand data...")
-        demand_data, dates, num_days = process_demand_data(excel_data['Demand'], params['buffer_days'])
-        formatted_dates = [d.strftime('%d-%b-%y') for d in dates]
+        status_text.info("📄 Processing input data...")
+        instance, instance_warnings = build_problem_instance(excel_data, params['buffer_days'])
         progress_bar.progress(0.3)
 
         status_text.info("📄 Validating shutdown constraints...")
-        # Validate pre-shutdown and restart grades
-        invalid_grades_warning = []
-        for line, grade in plant_data.get('pre_shutdown_grades', {}).items():
-            if grade not in inventory_data['grades']:
-                invalid_grades_warning.append(f"Pre-shutdown grade '{grade}' for line '{line}' is not a valid grade.")
-            elif line not in inventory_data['allowed_lines'][grade]:
-                invalid_grades_warning.append(f"Pre-shutdown grade '{grade}' for line '{line}' is not allowed on that line.")
-        for line, grade in plant_data.get('restart_grades', {}).items():
-            if grade not in inventory_data['grades']:
-                invalid_grades_warning.append(f"Restart grade '{grade}' for line '{line}' is not a valid grade.")
-            elif line not in inventory_data['allowed_lines'][grade]:
-                invalid_grades_warning.append(f"Restart grade '{grade}' for line '{line}' is not allowed on that line.")
-        if invalid_grades_warning:
-            for warning in invalid_grades_warning:
-                render_alert(warning, "warning")
-            st.warning("⚠️ Invalid shutdown/restart grades may cause infeasible solutions.")
-
-        status_text.info("📄 Processing shutdown periods...")
-        shutdown_periods = process_shutdown_dates(plant_data.get('shutdown_periods', {}), dates)
+        # Invalid shutdown periods and pre-shutdown/restart grades are reported by the instance builder
+        if instance_warnings:
+            notes.extend((warning, "warning") for warning in instance_warnings)
+            notes.append(("⚠️ Invalid shutdown settings may cause infeasible solutions.", "warning"))
         progress_bar.progress(0.35)
 
-        status_text.info("📄 Processing transition rules...")
-        transition_dfs = {k: v for k, v in excel_data.items() if k.startswith('Transition_')}
-        transition_rules = process_transition_rules(transition_dfs)
+        status_text.info("🔍 Checking data feasibility...")
+        feasibility_issues = analyze_feasibility(instance)
+        notes.extend((format_issue(issue), issue['severity']) for issue in feasibility_issues)
+        if has_errors(feasibility_issues):
+            for message, severity in notes:
+                render_alert(message, severity)
+            progress_bar.progress(1.0)
+            status_text.error("❌ Input data has conflicting constraints.")
+            render_error_state(
+                "Infeasible Input Data",
+                "The constraints listed above cannot all be satisfied. Please fix the workbook and try again."
+            )
+            if st.button("← Back to Configuration"):
+                st.session_state[SS_STAGE] = STAGE_PREVIEW
+                st.rerun()
+            return None
         progress_bar.progress(0.4)
 
         status_text.info("⚡ Running optimization solver...")
 
-        # Progress callback for solver
-        def progress_callback(pct: float, msg: str):
-            try:
-                progress_bar.progress(0.4 + float(pct) * 0.6)
-                status_text.info(f"⚡ {msg}")
-            except Exception:
-                pass
-
-        # Run solver (unchanged parameters/logic)
-        status, solution_callback, solver = build_and_solve_model(
-            grades=inventory_data['grades'],
-            lines=plant_data['lines'],
-            dates=dates,
-            formatted_dates=formatted_dates,
-            num_days=num_days,
-            capacities=plant_data['capacities'],
-            initial_inventory=inventory_data['initial_inventory'],
-            min_inventory=inventory_data['min_inventory'],
-            max_inventory=inventory_data['max_inventory'],
-            min_closing_inventory=inventory_data['min_closing_inventory'],
-            demand_data=demand_data,
-            allowed_lines=inventory_data['allowed_lines'],
-            min_run_days=inventory_data['min_run_days'],
-            max_run_days=inventory_data['max_run_days'],
-            force_start_date=inventory_data.get('force_start_date', {}),
-            rerun_allowed=inventory_data.get('rerun_allowed', {}),
-            material_running_info=plant_data.get('material_running', {}),
-            shutdown_periods=shutdown_periods,
-            pre_shutdown_grades=plant_data.get('pre_shutdown_grades', {}),
-            restart_grades=plant_data.get('restart_grades', {}),
-            transition_rules=transition_rules,
-            buffer_days=params['buffer_days'],
+        if params.get('rolling_horizon'):
+            solve = solve_rolling_horizon
+        elif params.get('lns'):
+            solve = solve_lns
+        else:
+            solve = build_and_solve_model
+        solve_kwargs = {}
+        if solve is build_and_solve_model and st.session_state.get(SS_WARM_START):
+            solve_kwargs['warm_start'] = st.session_state[SS_WARM_START]
+        elif solve is build_and_solve_model and params.get('greedy_hint', False):
+            # Greedy plan as a hint: a first schedule sooner
+            solve_kwargs['warm_start'] = greedy_solution(
+                instance, params['stockout_penalty'], params['transition_penalty']
+            )
+        job_id = start_job(
+            solve, instance, params, notes,
             stockout_penalty=params['stockout_penalty'],
             transition_penalty=params['transition_penalty'],
             time_limit_min=params['time_limit_min'],
-            progress_callback=progress_callback
+            **solve_kwargs
         )
 
-        progress_bar.progress(1.0)
-
-        # Check solution
-        num_found = 0
-        try:
-            num_found = int(solution_callback.num_solutions()) if hasattr(solution_callback, 'num_solutions') else 0
-        except Exception:
-            try:
-                num_found = len(getattr(solution_callback, 'solutions', []))
-            except Exception:
-                num_found = 0
-
-        if num_found > 0:
-            status_text.success("✅ Optimization completed successfully!")
-            # Extract solution
-            last_solution = None
-            try:
-                last_solution = solution_callback.solutions[-1]
-            except Exception:
-                last_solution = solution_callback if isinstance(solution_callback, dict) else {}
-
-            # Store solution (unchanged structure)
-            st.session_state[SS_SOLUTION] = {
-                'status': status,
-                'solution': last_solution,
-                'solver': solver,
-                'solve_time': getattr(last_solution, 'get', lambda k, d=None: d)('time', 0) if isinstance(last_solution, dict) else 0,
-                'production_vars': getattr(solution_callback, 'production', {}) if hasattr(solution_callback, 'production') else {},
-                'data': {
-                    'grades': inventory_data['grades'],
-                    'lines': plant_data['lines'],
-                    'dates': dates,
-                    'num_days': num_days,
-                    'buffer_days': params['buffer_days'],
-                    'shutdown_periods': shutdown_periods,
-                    'allowed_lines': inventory_data['allowed_lines'],
-                    'min_inventory': inventory_data['min_inventory'],
-                    'max_inventory': inventory_data['max_inventory'],
-                    'initial_inventory': inventory_data['initial_inventory'],
-                    'pre_shutdown_grades': plant_data.get('pre_shutdown_grades', {}),
-                    'restart_grades': plant_data.get('restart_grades', {}),
-                    'capacities': plant_data.get('capacities', {}),
-                }
-            }
-
-            st.session_state[SS_STAGE] = STAGE_RESULTS
-            st.success("Optimization complete! Redirecting to results...")
-            st.rerun()
-        else:
-            status_text.error("❌ No feasible solution found.")
-            render_error_state(
-                "No Solution Found",
-                "The solver could not find a feasible solution. Please check your constraints and try again."
-            )
-            # Provide navigation back
-            if st.button("← Back to Configuration"):
-                st.session_state[SS_STAGE] = STAGE_PREVIEW
-                st.rerun()
-
     except Exception as e:
         status_text.error("❌ Optimization failed.")
         render_error_state("Optimization Error", f"An error occurred: {str(e)}")
@@ -637,6 +774,21 @@ def render_optimization_stage():
         if st.button("← Back to Configuration"):
             st.session_state[SS_STAGE] = STAGE_PREVIEW
             st.rerun()
+        return None
+
+    # The job id in the URL lets a refreshed page pick the running solve up again
+    st.session_state[SS_SOLVE_JOB] = job_id
+    st.query_params['job'] = job_id
+    return get_job(job_id)
+
+
+def leave_optimization_stage(job_id: str, stage):
+    """Drop the finished or cancelled job and move to another stage"""
+    forget_job(job_id)
+    st.session_state[SS_SOLVE_JOB] = None
+    st.query_params.pop('job', None)
+    st.session_state[SS_STAGE] = stage
+    st.rerun()
 
 
 # ========== STAGE 3: RESULTS ==========
@@ -680,6 +832,23 @@ def render_results_stage():
     render_metric_card("Total Stockouts", f"{total_stockouts:,.0f} MT", col3, 2)
     render_metric_card("Time Elapsed", f"{solve_time:.1f}s", col4, 3)
 
+    if solution_data.get('status') == 'GREEDY':
+        st.info("Greedy plan built without the solver; run the optimization for a better schedule.")
+    elif solution_data.get('status') == 'GREEDY_FALLBACK':
+        st.warning("The solver found no solution within the time limit; this is the greedy plan.")
+    for violation in solution.get('violations', []) if isinstance(solution, dict) else []:
+        render_alert(f"Plan breaks a hard rule: {violation}", "warning")
+
+    warm_start_report = solution_data.get('warm_start')
+    if warm_start_report:
+        caption = f"Warm start: hinted {warm_start_report['coverage']:.0%} of the schedule"
+        if 'first_agreement' in warm_start_report:
+            caption += (
+                f"; the first solution kept {warm_start_report['first_agreement']:.0%} of the hint, "
+                f"the final one {warm_start_report['final_agreement']:.0%}"
+            )
+        st.caption(caption + ".")
+
     render_section_divider()
 
     # Results tabs - Combined into Summary
@@ -769,15 +938,7 @@ def render_results_stage():
         with col_summary1:
             st.markdown("### 📊 Production Summary")
             try:
-                summary_df = create_production_summary(
-                    solution,
-                    solution_data.get('production_vars', {}),
-                    solution_data.get('solver'),
-                    data.get('grades', []),
-                    data.get('lines', []),
-                    data.get('num_days', 0),
-                    buffer_days=data.get('buffer_days', 0)
-                )
+                summary_df = create_production_summary(solution, solution_data['instance'])
             except Exception as e:
                 summary_df = pd.DataFrame()
                 st.error(f"Failed to create production summary: {e}")
@@ -841,6 +1002,20 @@ def render_results_stage():
         if st.button("← Back to Configuration", use_container_width=True):
             st.session_state[SS_STAGE] = STAGE_PREVIEW
             st.rerun()
+    with col_nav2:
+        instance = solution_data.get('instance')
+        if instance is not None:
+            try:
+                st.download_button(
+                    "💾 Download Instance Snapshot",
+                    data=save_snapshot(instance, solution_data.get('params', {})),
+                    file_name="instance_snapshot.npz",
+                    mime="application/octet-stream",
+                    use_container_width=True,
+                    help="Processed instance and solver settings, replayable with 'python headless.py instance_snapshot.npz'"
+                )
+            except Exception as e:
+                st.error(f"Failed to build instance snapshot: {e}")
     with col_nav3:
         if st.button("🔄 New Optimization", use_container_width=True, type="primary"):
             # Reset state but keep theme
@@ -0,0 +1,135 @@
+"""
+Benchmarks of alternative model formulations on identical instances
+
+Each variant is a model_options dict; every variant is built and solved on
+the same ProblemInstance and reported side by side:
+
+    python benchmarks.py plan.xlsx --compare transition_encoding=clauses,automaton --time-limit 60
+    python benchmarks.py snapshot.npz --compare inventory_balance
+"""
+
+import re
+import time
+from typing import Dict, List, Optional
+import pandas as pd
+from constants import (
+    DEFAULT_BUFFER_DAYS, DEFAULT_STOCKOUT_PENALTY, DEFAULT_TRANSITION_PENALTY, MODEL_OPTION_CHOICES,
+)
+from problem_instance import ProblemInstance
+from solver_cp_sat import build_model, solve_model
+
+
+def parse_presolve_log(log_lines: List[str]) -> Dict:
+    """Presolved model size and presolve time from a CP-SAT search log"""
+    stats = {'presolved_variables': None, 'presolved_constraints': None, 'presolve_s': None}
+    presolve_start = None
+    in_presolved_model = False
+    constraints = 0
+    for line in log_lines:
+        if line.startswith('Starting presolve at'):
+            presolve_start = float(re.findall(r'[\d.]+', line)[0])
+        elif line.startswith('Presolved optimization model'):
+            in_presolved_model = True
+            constraints = 0
+        elif in_presolved_model:
+            if line.startswith('#Variables:'):
+                stats['presolved_variables'] = int(line.split()[1].replace("'", ''))
+            elif line.startswith('#k'):
+                constraints += int(line.split()[1].replace("'", ''))
+            elif not line.strip() or line.startswith('['):
+                stats['presolved_constraints'] = constraints
+                in_presolved_model = False
+        elif line.startswith('Starting search at') and presolve_start is not None:
+            stats['presolve_s'] = round(float(re.findall(r'[\d.]+', line)[0]) - presolve_start, 3)
+    return stats
+
+
+def benchmark_variant(instance: ProblemInstance, model_options: Dict, time_limit_s: float,
+                      stockout_penalty: int = DEFAULT_STOCKOUT_PENALTY,
+                      transition_penalty: int = DEFAULT_TRANSITION_PENALTY) -> Dict:
+    """Build and solve one formulation; returns size, timing and quality figures"""
+    schedule_model = build_model(instance, stockout_penalty, transition_penalty, model_options)
+    stats = schedule_model.stats()
+    
+    log_lines = []
+    solve_start = time.time()
+    status, solution_callback, solver = solve_model(
+        schedule_model, time_limit_s / 60.0, log_callback=lambda message: log_lines.extend(message.split('\n'))
+    )
+    solve_time = time.time() - solve_start
+    
+    return {
+        **{key: str(value) for key, value in schedule_model.options.items()},
+        'build_time_s': round(stats['build_time'], 3),
+        'variables': stats['variables'],
+        'constraints': stats['constraints'],
+        **parse_presolve_log(log_lines),
+        'first_solution_s': round(solution_callback.solution_times[0], 3) if solution_callback.solution_times else None,
+        'solutions': solution_callback.num_solutions(),
+        'status': solver.StatusName(status),
+        'objective': solver.ObjectiveValue() if solution_callback.num_solutions() > 0 else None,
+        'best_bound': solver.BestObjectiveBound(),
+        'solve_time_s': round(solve_time, 3),
+    }
+
+
+def benchmark_model_options(instance: ProblemInstance, variants: List[Dict], time_limit_s: float,
+                            stockout_penalty: int = DEFAULT_STOCKOUT_PENALTY,
+                            transition_penalty: int = DEFAULT_TRANSITION_PENALTY) -> pd.DataFrame:
+    """Run every variant on the same instance, one row per variant"""
+    rows = [
+        benchmark_variant(instance, variant, time_limit_s, stockout_penalty, transition_penalty)
+        for variant in variants
+    ]
+    return pd.DataFrame(rows)
+
+
+def variants_from_spec(compare: Optional[List[str]]) -> List[Dict]:
+    """Expand 'option=value1,value2' specs into the cartesian product of option dicts"""
+    variants = [{}]
+    for spec in compare or []:
+        key, _, values = spec.partition('=')
+        if key not in MODEL_OPTION_CHOICES:
+            raise ValueError(f"Unknown model option '{key}'")
+        choices = values.split(',') if values else list(MODEL_OPTION_CHOICES[key])
+        variants = [dict(variant, **{key: choice}) for variant in variants for choice in choices]
+    return variants
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Compare model formulations on one instance")
+    parser.add_argument('input', help="Workbook (.xlsx) or instance snapshot (.npz)")
+    parser.add_argument('--compare', action='append', metavar='OPTION=V1,V2',
+                        help="Model option values to compare (repeatable; no values = all choices)")
+    parser.add_argument('--time-limit', type=float, default=30.0, help="Solver time limit per variant (seconds)")
+    parser.add_argument('--buffer-days', type=int, default=DEFAULT_BUFFER_DAYS)
+    parser.add_argument('-o', '--output', help="Optional CSV path for the results table")
+    args = parser.parse_args(argv)
+    
+    if args.input.lower().endswith('.npz'):
+        from instance_snapshot import load_snapshot
+        instance, params = load_snapshot(args.input)
+    else:
+        from headless import load_workbook
+        from problem_instance import build_problem_instance
+        data, _ = load_workbook(args.input)
+        instance, _ = build_problem_instance(data, args.buffer_days)
+        params = {}
+    
+    results = benchmark_model_options(
+        instance,
+        variants_from_spec(args.compare),
+        args.time_limit,
+        stockout_penalty=params.get('stockout_penalty', DEFAULT_STOCKOUT_PENALTY),
+        transition_penalty=params.get('transition_penalty', DEFAULT_TRANSITION_PENALTY),
+    )
+    print(results.to_string(index=False))
+    if args.output:
+        results.to_csv(args.output, index=False)
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,103 @@
+"""
+Shared calendar index: date lookups and per-line availability
+"""
+
+import numpy as np
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+def contiguous_blocks(day_indices: Iterable[int]) -> List[Tuple[int, int]]:
+    """Group day indices into inclusive (start, end) blocks of consecutive days"""
+    blocks = []
+    for d in sorted(set(int(d) for d in day_indices)):
+        if blocks and d == blocks[-1][1] + 1:
+            blocks[-1] = (blocks[-1][0], d)
+        else:
+            blocks.append((d, d))
+    return blocks
+
+
+class CalendarIndex:
+    """Date axis of the planning horizon, built once and shared by the whole pipeline
+    
+    Holds the date -> day index map and, per line, a boolean availability array,
+    the shutdown block boundaries and the next unavailable day for every day, so
+    that day lookups and shutdown checks are O(1).
+    
+    A calendar for a window of a longer horizon passes ``horizon_days``, the
+    days from its first date to the end of the full horizon. Shutdown days past
+    its last date then still count for ``next_unavailable`` and
+    ``window_available``, so the window end is not mistaken for a cutoff.
+    """
+    
+    def __init__(self, dates: List[date], shutdown_days: Optional[Dict[str, List[int]]] = None,
+                 lines: Optional[List[str]] = None, horizon_days: Optional[int] = None):
+        self.dates = list(dates)
+        self.num_days = len(self.dates)
+        self.date_to_index = {d: i for i, d in enumerate(self.dates)}
+        self.formatted_dates = [d.strftime('%d-%b-%y') for d in self.dates]
+        self._date_axis = np.array(self.dates, dtype='datetime64[D]')
+        self.horizon_days = max(int(horizon_days), self.num_days) if horizon_days is not None else self.num_days
+        
+        shutdown_days = shutdown_days or {}
+        self.lines = list(lines) if lines is not None else list(shutdown_days.keys())
+        for line in shutdown_days:
+            if line not in self.lines:
+                self.lines.append(line)
+        
+        self.available = {}
+        self.shutdown_blocks = {}
+        self._shutdown_flags = {}
+        self._next_unavailable = {}
+        for line in self.lines:
+            horizon_mask = np.ones(self.horizon_days, dtype=bool)
+            horizon_mask[[d for d in shutdown_days.get(line, []) if 0 <= d < self.horizon_days]] = False
+            mask = horizon_mask[:self.num_days].copy()
+            self.available[line] = mask
+            self.shutdown_blocks[line] = contiguous_blocks(np.flatnonzero(~mask).tolist())
+            self._shutdown_flags[line] = (~mask).tolist()
+            
+            # next_unavailable[d]: first shutdown day >= d, or horizon_days if none
+            next_unavailable = np.full(self.horizon_days + 1, self.horizon_days, dtype=np.int64)
+            for d in range(self.horizon_days - 1, -1, -1):
+                next_unavailable[d] = d if not horizon_mask[d] else next_unavailable[d + 1]
+            self._next_unavailable[line] = next_unavailable.tolist()
+    
+    def index_of(self, value) -> Optional[int]:
+        """Day index of a date, or None if it is outside the horizon"""
+        return self.date_to_index.get(value)
+    
+    def indices_of(self, values: np.ndarray) -> np.ndarray:
+        """Vectorized day index lookup for datetime64 values; -1 where NaT or outside the horizon"""
+        values = np.asarray(values, dtype='datetime64[D]')
+        if self.num_days == 0:
+            return np.full(values.shape, -1, dtype=np.int64)
+        positions = np.clip(np.searchsorted(self._date_axis, values), 0, self.num_days - 1)
+        found = ~np.isnat(values) & (self._date_axis[positions] == values)
+        return np.where(found, positions, -1)
+    
+    def day_range(self, start: date, end: date) -> List[int]:
+        """Day indices of the horizon dates within [start, end]"""
+        lo = np.searchsorted(self._date_axis, np.datetime64(start, 'D'), side='left')
+        hi = np.searchsorted(self._date_axis, np.datetime64(end, 'D'), side='right')
+        return list(range(int(lo), int(hi)))
+    
+    def is_shutdown(self, line: str, d: int) -> bool:
+        flags = self._shutdown_flags.get(line)
+        return bool(flags and flags[d])
+    
+    def shutdown_days(self, line: str) -> List[int]:
+        return [d for start, end in self.shutdown_blocks.get(line, []) for d in range(start, end + 1)]
+    
+    def next_unavailable(self, line: str, d: int) -> int:
+        """First shutdown day at or after d on this line (horizon_days if none)"""
+        next_days = self._next_unavailable.get(line)
+        if next_days is None:
+            return self.horizon_days
+        return next_days[d]
+    
+    def window_available(self, line: str, start: int, length: int) -> bool:
+        """True if days [start, start + length) are inside the horizon and free of shutdowns"""
+        end = start + length
+        return end <= self.horizon_days and self.next_unavailable(line, start) >= end
@@ -3,6 +3,8 @@ Configuration and constants for the Polymer Production Scheduler
 Enhanced UX version with proper stage management
 """
 
+import os
+
 # Application Configuration
 APP_TITLE = "Polymer Production Scheduler"
 APP_ICON = "🏭"
@@ -13,10 +15,42 @@ DEFAULT_TIME_LIMIT_MIN = 10
 DEFAULT_BUFFER_DAYS = 3
 DEFAULT_STOCKOUT_PENALTY = 10
 DEFAULT_TRANSITION_PENALTY = 5
+IDLE_LINE_PENALTY = 500  # Objective cost of a line-day without production outside shutdowns
 
 # Solver Configuration
 SOLVER_NUM_WORKERS = 8
 SOLVER_RANDOM_SEED = 42
+ROLLING_WINDOW_DAYS = 42  # Rolling horizon: days optimized per window
+ROLLING_COMMIT_DAYS = 21  # Rolling horizon: leading days of each window that are kept
+LNS_NEIGHBORHOOD_SECONDS = 5.0  # LNS: time limit of each neighborhood re-solve
+LNS_WINDOW_DAYS = 7  # LNS: days freed by a time-window neighborhood
+LNS_NEIGHBORHOOD_GRADES = 2  # LNS: grades freed by a grade neighborhood
+LNS_INITIAL_FRACTION = 0.2  # LNS: share of the time limit for the initial full solve
+GREEDY_LOOKAHEAD_DAYS = 7  # Greedy scheduler: days of projected shortage weighed per decision
+SOLVE_POLL_SECONDS = 1.0  # Background solves: UI refresh interval while a job runs
+SOLVE_JOB_RETENTION_S = 3600  # Background solves: how long uncollected finished jobs are kept
+
+# Model Formulation Options (alternative encodings of the same constraints)
+DEFAULT_MODEL_OPTIONS = {
+    'transition_encoding': 'clauses',  # Forbidden transitions: 'clauses' (pairwise) or 'automaton'
+    'changeover_encoding': 'indicator',  # Transition penalty: 'indicator' (per line-day) or 'pairwise'
+    # Daily supply: 'reified' (supply = min(stock, demand) via an indicator), 'min_equality'
+    # (same semantics, AddMinEquality) or 'linear' (supply <= stock; may hold stock back)
+    'inventory_balance': 'reified',
+    'quantity_scaling': 'none',  # 'gcd': divide all quantities by their greatest common divisor
+    'production_encoding': 'variables',  # 'linear': production = capacity * is_producing, no IntVars
+    'fixed_cells': 'constraints',  # 'constants': cells fixed by the data are ints, not variables
+    'run_formulation': 'windows',  # Min/max run: 'windows' (per start/window) or 'counter' (run-length counters)
+}
+MODEL_OPTION_CHOICES = {
+    'transition_encoding': ('clauses', 'automaton'),
+    'changeover_encoding': ('indicator', 'pairwise'),
+    'inventory_balance': ('reified', 'min_equality', 'linear'),
+    'quantity_scaling': ('none', 'gcd'),
+    'production_encoding': ('variables', 'linear'),
+    'fixed_cells': ('constraints', 'constants'),
+    'run_formulation': ('windows', 'counter'),
+}
 
 # Stage Management (proper numeric stages)
 STAGE_UPLOAD = 0
@@ -38,6 +72,7 @@ MAX_FILE_SIZE_MB = 50
 # Required Excel Sheets
 REQUIRED_SHEETS = ['Plant', 'Inventory', 'Demand']
 OPTIONAL_SHEET_PREFIX = 'Transition_'
+EXCEL_FIRST_DATA_ROW = 2  # Sheets have a single header row
 
 # Excel Column Names
 PLANT_COLUMNS = {
@@ -70,6 +105,14 @@ SS_UPLOADED_FILE = "uploaded_file"
 SS_EXCEL_DATA = "excel_data"
 SS_OPTIMIZATION_PARAMS = "opt_params"
 SS_SOLUTION = "solution"
+SS_WARM_START = "warm_start_solution"
+SS_SOLVE_JOB = "solve_job"
 SS_SOLVER_STATUS = "solver_status"
 SS_GRADE_COLORS = "grade_colors"
 SS_THEME = "app_theme"
+
+# Parsed Workbook Cache (next to the app unless PPS_WORKBOOK_CACHE_DIR is set, whatever the working directory)
+WORKBOOK_CACHE_DIR = os.environ.get(
+    'PPS_WORKBOOK_CACHE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache', 'workbooks')
+)
+WORKBOOK_CACHE_MAX_MB = 200
@@ -2,48 +2,44 @@
 Excel file loading and validation
 """
 
+import numpy as np
 import pandas as pd
 import io
+import logging
+import time
 from datetime import datetime, timedelta
 from typing import Dict, List, Tuple, Optional
-import streamlit as st
-from constants import REQUIRED_SHEETS, PLANT_COLUMNS, INVENTORY_COLUMNS
+from calendar_index import CalendarIndex
+from transition_matrix import TransitionMatrix, transition_matrix_from_frames
+from constants import REQUIRED_SHEETS, OPTIONAL_SHEET_PREFIX, EXCEL_FIRST_DATA_ROW, PLANT_COLUMNS, INVENTORY_COLUMNS
+
+logger = logging.getLogger(__name__)
 
 
 class ExcelDataLoader:
     """Handles loading and validation of Excel data"""
     
-    def __init__(self, file_buffer: io.BytesIO):
+    def __init__(self, file_buffer: io.BytesIO, single_pass: bool = True):
         self.file_buffer = file_buffer
+        self.single_pass = single_pass
         self.data = {}
         self.errors = []
         self.warnings = []
+        self.timings = {}  # seconds spent per step ('open' + one entry per sheet)
     
     def load_and_validate(self) -> Tuple[bool, Dict, List[str], List[str]]:
         """Load all sheets and validate structure"""
         try:
-            # Load required sheets
-            for sheet in REQUIRED_SHEETS:
-                try:
-                    self.file_buffer.seek(0)
-                    df = pd.read_excel(self.file_buffer, sheet_name=sheet)
-                    self.data[sheet] = df
-                except Exception as e:
-                    self.errors.append(f"Missing or invalid sheet '{sheet}': {str(e)}")
-                    return False, {}, self.errors, self.warnings
-            
-            # Load optional transition sheets
-            self.file_buffer.seek(0)
-            xl_file = pd.ExcelFile(self.file_buffer)
-            transition_sheets = [s for s in xl_file.sheet_names if s.startswith('Transition_')]
-            
-            for sheet in transition_sheets:
-                try:
-                    self.file_buffer.seek(0)
-                    df = pd.read_excel(self.file_buffer, sheet_name=sheet, index_col=0)
-                    self.data[sheet] = df
-                except Exception as e:
-                    self.warnings.append(f"Could not load transition sheet '{sheet}': {str(e)}")
+            if self.single_pass:
+                loaded = self._load_sheets_single_pass()
+            else:
+                loaded = self._load_sheets_per_call()
+            if not loaded:
+                return False, {}, self.errors, self.warnings
+            logger.info(
+                "Workbook loaded in %.3fs (%s)", sum(self.timings.values()),
+                ", ".join(f"{step} {seconds:.3f}s" for step, seconds in self.timings.items())
+            )
             
             # Validate sheet structures
             self._validate_plant_sheet()
@@ -59,6 +55,71 @@ class ExcelDataLoader:
             self.errors.append(f"Error loading Excel file: {str(e)}")
             return False, {}, self.errors, self.warnings
     
+    def _load_sheets_single_pass(self) -> bool:
+        """Open the workbook once and parse every needed sheet from that handle"""
+        start = time.perf_counter()
+        self.file_buffer.seek(0)
+        xl_file = pd.ExcelFile(self.file_buffer)
+        sheet_names = xl_file.sheet_names
+        self.timings['open'] = time.perf_counter() - start
+        
+        # Load required sheets
+        for sheet in REQUIRED_SHEETS:
+            if sheet not in sheet_names:
+                self.errors.append(f"Missing or invalid sheet '{sheet}': Worksheet named '{sheet}' not found")
+                return False
+            try:
+                start = time.perf_counter()
+                self.data[sheet] = xl_file.parse(sheet)
+                self.timings[sheet] = time.perf_counter() - start
+            except Exception as e:
+                self.errors.append(f"Missing or invalid sheet '{sheet}': {str(e)}")
+                return False
+        
+        # Load optional transition sheets
+        for sheet in [s for s in sheet_names if s.startswith(OPTIONAL_SHEET_PREFIX)]:
+            try:
+                start = time.perf_counter()
+                self.data[sheet] = xl_file.parse(sheet, index_col=0)
+                self.timings[sheet] = time.perf_counter() - start
+            except Exception as e:
+                self.warnings.append(f"Could not load transition sheet '{sheet}': {str(e)}")
+        
+        return True
+    
+    def _load_sheets_per_call(self) -> bool:
+        """Legacy mode: re-read the buffer with one read_excel call per sheet"""
+        # Load required sheets
+        for sheet in REQUIRED_SHEETS:
+            try:
+                start = time.perf_counter()
+                self.file_buffer.seek(0)
+                df = pd.read_excel(self.file_buffer, sheet_name=sheet)
+                self.data[sheet] = df
+                self.timings[sheet] = time.perf_counter() - start
+            except Exception as e:
+                self.errors.append(f"Missing or invalid sheet '{sheet}': {str(e)}")
+                return False
+        
+        # Load optional transition sheets
+        start = time.perf_counter()
+        self.file_buffer.seek(0)
+        xl_file = pd.ExcelFile(self.file_buffer)
+        transition_sheets = [s for s in xl_file.sheet_names if s.startswith(OPTIONAL_SHEET_PREFIX)]
+        self.timings['open'] = time.perf_counter() - start
+        
+        for sheet in transition_sheets:
+            try:
+                start = time.perf_counter()
+                self.file_buffer.seek(0)
+                df = pd.read_excel(self.file_buffer, sheet_name=sheet, index_col=0)
+                self.data[sheet] = df
+                self.timings[sheet] = time.perf_counter() - start
+            except Exception as e:
+                self.warnings.append(f"Could not load transition sheet '{sheet}': {str(e)}")
+        
+        return True
+    
     def _validate_plant_sheet(self):
         """Validate Plant sheet structure"""
         df = self.data.get('Plant')
@@ -115,11 +176,13 @@ def process_plant_data(plant_df: pd.DataFrame) -> Dict:
         'shutdown_periods': {},
         'pre_shutdown_grades': {},  # NEW
         'restart_grades': {},       # NEW
+        'rows': {},                 # Excel row number of each plant
     }
     
-    for _, row in plant_df.iterrows():
+    for position, (_, row) in enumerate(plant_df.iterrows()):
         plant = row[PLANT_COLUMNS['plant']]
         result['capacities'][plant] = row[PLANT_COLUMNS['capacity']]
+        result['rows'][plant] = position + EXCEL_FIRST_DATA_ROW
         
         # Material running info
         if pd.notna(row.get(PLANT_COLUMNS['material_running'])):
@@ -163,9 +226,25 @@ def process_plant_data(plant_df: pd.DataFrame) -> Dict:
     return result
 
 
+def _inventory_column(df: pd.DataFrame, key: str, default=None) -> pd.Series:
+    """Inventory column by logical key, or a constant series if the column is absent"""
+    col = INVENTORY_COLUMNS[key]
+    if col in df.columns:
+        return df[col]
+    return pd.Series(default, index=df.index, dtype=object)
+
+
 def process_inventory_data(inventory_df: pd.DataFrame, lines: List[str]) -> Dict:
-    """Process inventory sheet into structured data"""
-    grades = inventory_df[INVENTORY_COLUMNS['grade']].unique().tolist()
+    """Process inventory sheet into structured data
+    
+    The sheet is handled column-wise: the ``Lines`` column is exploded into one
+    row per (grade, line) pair and defaults are filled per column. Besides the
+    dict views used throughout the app, ``grade_line_params`` holds the
+    per-(grade, line) parameters as aligned arrays.
+    """
+    grade_col = INVENTORY_COLUMNS['grade']
+    df = inventory_df.reset_index(drop=True)
+    grades = df[grade_col].unique().tolist()
     
     result = {
         'grades': grades,
@@ -178,85 +257,93 @@ def process_inventory_data(inventory_df: pd.DataFrame, lines: List[str]) -> Dict
         'force_start_date': {},
         'allowed_lines': {grade: [] for grade in grades},
         'rerun_allowed': {},
+        'grade_line_params': {},
+        'grade_rows': {},
     }
     
-    grade_inventory_defined = set()
+    # Global inventory parameters come from the first row of each grade
+    first_rows = df.drop_duplicates(grade_col, keep='first')
+    first_grades = first_rows[grade_col].tolist()
+    for key, out_key, default in [
+        ('opening', 'initial_inventory', 0),
+        ('min_inv', 'min_inventory', 0),
+        ('max_inv', 'max_inventory', 1000000000),
+        ('min_closing', 'min_closing_inventory', 0),
+    ]:
+        values = _inventory_column(first_rows, key, default).fillna(default).tolist()
+        result[out_key] = dict(zip(first_grades, values))
+    result['grade_rows'] = dict(zip(first_grades, (first_rows.index + EXCEL_FIRST_DATA_ROW).tolist()))
     
-    for _, row in inventory_df.iterrows():
-        grade = row[INVENTORY_COLUMNS['grade']]
-        
-        # Process Lines column
-        lines_value = row.get(INVENTORY_COLUMNS['lines'])
-        if pd.notna(lines_value) and lines_value != '':
-            plants_for_row = [x.strip() for x in str(lines_value).split(',')]
-        else:
-            plants_for_row = lines
-        
-        # Add plants to allowed_lines
-        for plant in plants_for_row:
-            if plant not in result['allowed_lines'][grade]:
-                result['allowed_lines'][grade].append(plant)
-        
-        # Global inventory parameters (only set once per grade)
-        if grade not in grade_inventory_defined:
-            result['initial_inventory'][grade] = row.get(INVENTORY_COLUMNS['opening'], 0)
-            if pd.isna(result['initial_inventory'][grade]):
-                result['initial_inventory'][grade] = 0
-            
-            result['min_inventory'][grade] = row.get(INVENTORY_COLUMNS['min_inv'], 0)
-            if pd.isna(result['min_inventory'][grade]):
-                result['min_inventory'][grade] = 0
-            
-            result['max_inventory'][grade] = row.get(INVENTORY_COLUMNS['max_inv'], 1000000000)
-            if pd.isna(result['max_inventory'][grade]):
-                result['max_inventory'][grade] = 1000000000
-            
-            result['min_closing_inventory'][grade] = row.get(INVENTORY_COLUMNS['min_closing'], 0)
-            if pd.isna(result['min_closing_inventory'][grade]):
-                result['min_closing_inventory'][grade] = 0
-            
-            grade_inventory_defined.add(grade)
-        
-        # Plant-specific parameters
-        for plant in plants_for_row:
-            grade_plant_key = (grade, plant)
-            
-            result['min_run_days'][grade_plant_key] = int(row.get(INVENTORY_COLUMNS['min_run'], 1))
-            if pd.isna(result['min_run_days'][grade_plant_key]):
-                result['min_run_days'][grade_plant_key] = 1
-            
-            result['max_run_days'][grade_plant_key] = int(row.get(INVENTORY_COLUMNS['max_run'], 9999))
-            if pd.isna(result['max_run_days'][grade_plant_key]):
-                result['max_run_days'][grade_plant_key] = 9999
-            
-            # Force Start Date
-            if pd.notna(row.get(INVENTORY_COLUMNS['force_start'])):
-                try:
-                    result['force_start_date'][grade_plant_key] = pd.to_datetime(
-                        row[INVENTORY_COLUMNS['force_start']]
-                    ).date()
-                except:
-                    result['force_start_date'][grade_plant_key] = None
-            else:
-                result['force_start_date'][grade_plant_key] = None
-            
-            # Rerun Allowed
-            rerun_val = row.get(INVENTORY_COLUMNS['rerun'])
-            if pd.notna(rerun_val):
-                val_str = str(rerun_val).strip().lower()
-                result['rerun_allowed'][grade_plant_key] = val_str not in ['no', 'n', 'false', '0']
-            else:
-                result['rerun_allowed'][grade_plant_key] = True
+    # Explode the Lines column into one row per (grade, line); blank means all lines
+    lines_value = _inventory_column(df, 'lines')
+    has_lines = (lines_value.notna() & (lines_value != '')).to_numpy()
+    split_lines = lines_value.astype(str).str.split(',')
+    plant_lists = pd.Series(
+        [parts if explicit else list(lines) for parts, explicit in zip(split_lines, has_lines)],
+        index=df.index, dtype=object
+    )
+    exploded = df.assign(_line=plant_lists).explode('_line')
+    exploded = exploded[exploded['_line'].notna()]
+    explicit = has_lines[exploded.index.to_numpy()]
+    exploded['_line'] = np.where(explicit, exploded['_line'].astype(str).str.strip(), exploded['_line'])
+    
+    # Allowed lines keep the order in which they first appear for each grade
+    first_pairs = exploded.drop_duplicates([grade_col, '_line'], keep='first')
+    for grade, plants in first_pairs.groupby(grade_col, sort=False)['_line']:
+        result['allowed_lines'][grade] = plants.tolist()
+    
+    # Plant-specific parameters: later rows override earlier ones for the same pair
+    pairs = exploded.drop_duplicates([grade_col, '_line'], keep='last')
+    keys = list(zip(pairs[grade_col], pairs['_line']))
+    
+    min_run = pd.to_numeric(_inventory_column(pairs, 'min_run', 1), errors='coerce').fillna(1).astype(int).to_numpy()
+    max_run = pd.to_numeric(_inventory_column(pairs, 'max_run', 9999), errors='coerce').fillna(9999).astype(int).to_numpy()
+    
+    rerun_value = _inventory_column(pairs, 'rerun')
+    rerun_allowed = (
+        rerun_value.isna()
+        | ~rerun_value.astype(str).str.strip().str.lower().isin(['no', 'n', 'false', '0'])
+    ).to_numpy()
+    
+    force_start = pd.to_datetime(
+        _inventory_column(pairs, 'force_start'), errors='coerce'
+    ).to_numpy(dtype='datetime64[D]')
+    
+    result['grade_line_params'] = {
+        'keys': keys,
+        'min_run': min_run,
+        'max_run': max_run,
+        'rerun_allowed': rerun_allowed,
+        'force_start': force_start,
+        'rows': (pairs.index + EXCEL_FIRST_DATA_ROW).to_numpy(),
+    }
+    
+    # Dict views keyed by (grade, line)
+    result['min_run_days'] = dict(zip(keys, min_run.tolist()))
+    result['max_run_days'] = dict(zip(keys, max_run.tolist()))
+    result['rerun_allowed'] = dict(zip(keys, rerun_allowed.tolist()))
+    result['force_start_date'] = {
+        key: (None if np.isnat(value) else value.item())
+        for key, value in zip(keys, force_start)
+    }
     
     return result
 
 
-def process_demand_data(demand_df: pd.DataFrame, buffer_days: int = 0) -> Tuple[Dict, List, int]:
-    """Process demand sheet into structured data"""
-    grades = [col for col in demand_df.columns if col != demand_df.columns[0]]
+def process_demand_data(demand_df: pd.DataFrame, buffer_days: int = 0,
+                        grades: Optional[List[str]] = None) -> Tuple[np.ndarray, List, int]:
+    """Process demand sheet into a dense grades x days demand matrix
     
-    dates = sorted(list(set(demand_df.iloc[:, 0].dt.date.tolist())))
-    num_days = len(dates)
+    Rows follow ``grades`` (default: the grade columns of the sheet); grades
+    without a demand column and buffer days are all-zero. Returns the matrix,
+    the date axis (including buffer days) and the number of days.
+    """
+    date_col = demand_df.columns[0]
+    if grades is None:
+        grades = [col for col in demand_df.columns if col != date_col]
+    
+    day_keys = demand_df[date_col].dt.date
+    dates = sorted(set(day_keys.tolist()))
     
     # Add buffer days
     last_date = dates[-1]
@@ -265,28 +352,34 @@ def process_demand_data(demand_df: pd.DataFrame, buffer_days: int = 0) -> Tuple[
     
     num_days = len(dates)
     
-    demand_data = {}
-    for grade in grades:
-        if grade in demand_df.columns:
-            demand_data[grade] = {
-                demand_df.iloc[i, 0].date(): demand_df[grade].iloc[i] 
-                for i in range(len(demand_df))
-            }
-        else:
-            demand_data[grade] = {date: 0 for date in dates}
+    # One reindex aligns every grade to the full horizon; later rows win for repeated dates
+    demand_table = (
+        demand_df.drop(columns=[date_col])
+        .set_axis(day_keys, axis=0)
+        .loc[lambda df: ~df.index.duplicated(keep='last')]
+        .reindex(index=dates, columns=grades)
+        .apply(pd.to_numeric, errors='coerce')
+        .fillna(0)
+    )
+    demand_matrix = np.rint(demand_table.to_numpy(dtype=float).T).astype(np.int64)
     
-    # Set buffer days demand to 0
-    for grade in grades:
-        for date in dates[-buffer_days:]:
-            if date not in demand_data[grade]:
-                demand_data[grade][date] = 0
-    
-    return demand_data, dates, num_days
+    return demand_matrix, dates, num_days
 
 
-def process_shutdown_dates(shutdown_periods: Dict, dates: List) -> Dict:
-    """Convert shutdown start/end dates to day indices"""
+def process_shutdown_dates(shutdown_periods: Dict, dates: List, warnings: Optional[List[str]] = None) -> Dict:
+    """Convert shutdown start/end dates to day indices
+    
+    Invalid periods are skipped; their messages are appended to ``warnings``
+    when a list is given, otherwise logged.
+    """
     processed = {}
+    calendar = CalendarIndex(dates)
+    
+    def warn(message):
+        if warnings is not None:
+            warnings.append(message)
+        else:
+            logger.warning(message)
     
     for plant, period in shutdown_periods.items():
         try:
@@ -294,44 +387,19 @@ def process_shutdown_dates(shutdown_periods: Dict, dates: List) -> Dict:
             end_date = pd.to_datetime(period['end']).date()
             
             if start_date > end_date:
-                st.warning(f"⚠️ Invalid shutdown period for {plant}")
+                warn(f"Invalid shutdown period for {plant}: start date is after end date.")
                 processed[plant] = []
                 continue
             
-            shutdown_days = []
-            for d, date in enumerate(dates):
-                if start_date <= date <= end_date:
-                    shutdown_days.append(d)
-            
-            processed[plant] = shutdown_days
+            processed[plant] = calendar.day_range(start_date, end_date)
             
         except Exception as e:
-            st.warning(f"⚠️ Error processing shutdown for {plant}: {e}")
+            warn(f"Error processing shutdown for {plant}: {e}")
             processed[plant] = []
     
     return processed
 
 
-def process_transition_rules(transition_dfs: Dict) -> Dict:
-    """Process transition matrices - extract plant name from sheet name"""
-    transition_rules = {}
-    
-    for sheet_name, df in transition_dfs.items():
-        # Extract plant name from sheet name (e.g., "Transition_Plant1" -> "Plant1")
-        if sheet_name.startswith('Transition_'):
-            plant_name = sheet_name.replace('Transition_', '')
-        else:
-            plant_name = sheet_name
-        
-        if df is not None:
-            transition_rules[plant_name] = {}
-            for prev_grade in df.index:
-                allowed_transitions = []
-                for current_grade in df.columns:
-                    if str(df.loc[prev_grade, current_grade]).lower() == 'yes':
-                        allowed_transitions.append(current_grade)
-                transition_rules[plant_name][prev_grade] = allowed_transitions
-        else:
-            transition_rules[plant_name] = None
-    
-    return transition_rules
+def process_transition_rules(transition_dfs: Dict, grades: Optional[List[str]] = None) -> TransitionMatrix:
+    """Process transition sheets into boolean matrices aligned to the grade index"""
+    return transition_matrix_from_frames(transition_dfs, grades)
@@ -0,0 +1,245 @@
+"""
+Static feasibility analysis of a processed problem instance
+
+Runs before the CP-SAT model is built and reports data conflicts that make the
+hard constraints unsatisfiable, so a bad upload fails in milliseconds instead
+of after the full solver time limit.
+"""
+
+import numpy as np
+from typing import Dict, List, Optional
+from problem_instance import ProblemInstance
+
+SEVERITY_ERROR = 'error'      # Hard constraints cannot all hold; the solve is pointless
+SEVERITY_WARNING = 'warning'  # Suspicious data the solver will work around
+
+
+def _issue(severity: str, sheet: str, row: Optional[int], message: str) -> Dict:
+    return {
+        'severity': severity,
+        'sheet': sheet,
+        'row': int(row) if row is not None and row >= 0 else None,
+        'message': message,
+    }
+
+
+def _sentence(text: str) -> str:
+    return text[:1].upper() + text[1:]
+
+
+def format_issue(issue: Dict) -> str:
+    """One-line description of an issue with its sheet/row location"""
+    location = issue['sheet'] if issue['row'] is None else f"{issue['sheet']} row {issue['row']}"
+    return f"{location}: {issue['message']}"
+
+
+def has_errors(issues: List[Dict]) -> bool:
+    return any(issue['severity'] == SEVERITY_ERROR for issue in issues)
+
+
+def analyze_feasibility(instance: ProblemInstance) -> List[Dict]:
+    """Check the instance for conflicts between hard constraints
+    
+    Returns a list of issues ({'severity', 'sheet', 'row', 'message'}) in the
+    order the checks run. Errors are definite conflicts; warnings flag data
+    the model silently ignores or relaxes.
+    """
+    issues = []
+    issues.extend(_check_unknown_lines(instance))
+    issues.extend(_check_pinned_days(instance))
+    issues.extend(_check_run_limits(instance))
+    issues.extend(_check_inventory(instance))
+    return issues
+
+
+def _check_unknown_lines(instance: ProblemInstance) -> List[Dict]:
+    """Inventory Lines entries naming plants that are not on the Plant sheet"""
+    return [
+        _issue(
+            SEVERITY_WARNING, 'Inventory', row,
+            f"Line '{plant}' listed for '{grade}' is not on the Plant sheet; it will be ignored."
+        )
+        for grade, plant, row in instance.unknown_lines
+    ]
+
+
+def _check_pinned_days(instance: ProblemInstance) -> List[Dict]:
+    """Days whose grade is fixed by the data: material running, pre-shutdown/restart and force start"""
+    issues = []
+    grades, lines = instance.grades, instance.lines
+    calendar = instance.calendar
+    num_days = instance.num_days
+    
+    for l, line in enumerate(lines):
+        plant_row = instance.plant_rows[l]
+        available = calendar.available[line]
+        
+        # pinned[d]: grade the data forces on day d (-1 = free); source[d] describes why
+        pinned = np.full(num_days, -1, dtype=np.int64)
+        source = [None] * num_days
+
+        def pin(d, g, description, sheet, row):
+            if not available[d]:
+                issues.append(_issue(
+                    SEVERITY_ERROR, sheet, row,
+                    f"{_sentence(description)} falls on a shutdown day of line '{line}' ({instance.formatted_dates[d]})."
+                ))
+            elif pinned[d] >= 0 and pinned[d] != g:
+                issues.append(_issue(
+                    SEVERITY_ERROR, sheet, row,
+                    f"{_sentence(description)} conflicts with {source[d]} on {instance.formatted_dates[d]}."
+                ))
+            else:
+                pinned[d] = g
+                source[d] = description
+        
+        # Material running block
+        material = instance.material_grade[l]
+        material_days = int(instance.material_days[l])
+        if material >= 0:
+            blocked = np.flatnonzero(~available[:material_days])
+            if blocked.size:
+                issues.append(_issue(
+                    SEVERITY_ERROR, 'Plant', plant_row,
+                    f"Material running '{grades[material]}' on line '{line}' must run for {material_days} days "
+                    f"but the line is shut down on {instance.formatted_dates[blocked[0]]}."
+                ))
+            for d in np.flatnonzero(available[:material_days]).tolist():
+                pin(d, material, f"material running '{grades[material]}'", 'Plant', plant_row)
+        
+        # Pre-shutdown and restart grades around the shutdown
+        shutdown_blocks = calendar.shutdown_blocks.get(line)
+        if shutdown_blocks:
+            pre_grade = instance.pre_shutdown_grade[l]
+            day_before = shutdown_blocks[0][0] - 1
+            if pre_grade >= 0 and day_before >= 0:
+                pin(day_before, pre_grade, f"pre-shutdown grade '{grades[pre_grade]}'", 'Plant', plant_row)
+            restart_grade = instance.restart_grade[l]
+            day_after = shutdown_blocks[-1][1] + 1
+            if restart_grade >= 0 and day_after < num_days:
+                pin(day_after, restart_grade, f"restart grade '{grades[restart_grade]}'", 'Plant', plant_row)
+        
+        # The material grade must change over on the day after its block
+        if material >= 0 and material_days < num_days and pinned[material_days] == material:
+            issues.append(_issue(
+                SEVERITY_ERROR, 'Plant', plant_row,
+                f"{_sentence(source[material_days])} is required on {instance.formatted_dates[material_days]}, "
+                f"but line '{line}' must change over from it after the material running block."
+            ))
+        
+        # Force start dates
+        for g in np.flatnonzero(instance.force_start_outside[:, l]).tolist():
+            issues.append(_issue(
+                SEVERITY_WARNING, 'Inventory', instance.inventory_rows[g, l],
+                f"Force start date for '{grades[g]}' on line '{line}' is outside the planning horizon "
+                f"({instance.formatted_dates[0]} to {instance.formatted_dates[-1]}); it will be ignored."
+            ))
+        for g in np.flatnonzero(instance.force_start[:, l] >= 0).tolist():
+            d = int(instance.force_start[g, l])
+            row = instance.inventory_rows[g, l]
+            if material == g and d == material_days:
+                issues.append(_issue(
+                    SEVERITY_ERROR, 'Inventory', row,
+                    f"Force start of '{grades[g]}' on {instance.formatted_dates[d]} falls on the forced changeover "
+                    f"day after its material running block on line '{line}'."
+                ))
+                continue
+            pin(d, g, f"force start of '{grades[g]}'", 'Inventory', row)
+        
+        # Forbidden transitions between consecutive pinned days
+        forbidden = instance.transitions.forbidden_matrix(line)
+        for d in range(num_days - 1):
+            prev_grade, next_grade = pinned[d], pinned[d + 1]
+            if prev_grade >= 0 and next_grade >= 0 and forbidden[prev_grade, next_grade]:
+                issues.append(_issue(
+                    SEVERITY_ERROR, f"Transition_{line}", None,
+                    f"{_sentence(source[d])} on {instance.formatted_dates[d]} is followed by "
+                    f"{source[d + 1]} on {instance.formatted_dates[d + 1]}, a forbidden transition on line '{line}'."
+                ))
+    
+    return issues
+
+
+def _check_run_limits(instance: ProblemInstance) -> List[Dict]:
+    """Min/max run days against the shutdown-free stretches of each line"""
+    issues = []
+    grades, lines = instance.grades, instance.lines
+    calendar = instance.calendar
+    
+    for l, line in enumerate(lines):
+        # Longest stretch of consecutive available days
+        available = calendar.available[line].astype(np.int8)
+        edges = np.flatnonzero(np.diff(np.concatenate(([0], available, [0]))))
+        longest_gap = int((edges[1::2] - edges[::2]).max()) if edges.size else 0
+        
+        for g in instance.grades_on_line(l):
+            row = instance.inventory_rows[g, l]
+            min_run = int(instance.min_run[g, l])
+            max_run = int(instance.max_run[g, l])
+            
+            if min_run > max_run:
+                issues.append(_issue(
+                    SEVERITY_WARNING, 'Inventory', row,
+                    f"Min. run days ({min_run}) exceed max. run days ({max_run}) for '{grades[g]}' on line '{line}'; "
+                    f"it can only run where a shutdown or the horizon end cuts the run short."
+                ))
+            elif min_run > longest_gap:
+                issues.append(_issue(
+                    SEVERITY_WARNING, 'Inventory', row,
+                    f"Min. run days ({min_run}) for '{grades[g]}' on line '{line}' exceed its longest "
+                    f"shutdown-free stretch ({longest_gap} days); runs will be cut short by shutdowns."
+                ))
+            
+            # Max run applies to the material running block too
+            if instance.material_grade[l] == g:
+                material_days = int(instance.material_days[l])
+                if material_days > max_run and calendar.window_available(line, 0, max_run + 1):
+                    issues.append(_issue(
+                        SEVERITY_ERROR, 'Plant', instance.plant_rows[l],
+                        f"Material running '{grades[g]}' on line '{line}' is fixed for {material_days} days, "
+                        f"longer than its max. run days ({max_run})."
+                    ))
+    
+    return issues
+
+
+def _check_inventory(instance: ProblemInstance) -> List[Dict]:
+    """Opening stock and forced production against the storage limits"""
+    issues = []
+    grades = instance.grades
+    num_days = instance.num_days
+    if num_days == 0:
+        return issues
+    
+    # Production never reduces stock, so day-0 closing stock is at least opening - demand
+    day0_floor = instance.initial_inventory - instance.demand[:, 0]
+    for g in np.flatnonzero(day0_floor > instance.max_inventory).tolist():
+        issues.append(_issue(
+            SEVERITY_ERROR, 'Inventory', instance.grade_rows[g],
+            f"Opening inventory of '{grades[g]}' ({instance.initial_inventory[g]:,}) minus first-day demand "
+            f"({instance.demand[g, 0]:,}) exceeds its max. inventory ({instance.max_inventory[g]:,})."
+        ))
+    
+    # Every line runs at full capacity on every available day that has an allowed grade
+    daily_capacity = np.zeros(num_days, dtype=np.int64)
+    for l, line in enumerate(instance.lines):
+        if instance.allowed[:, l].any():
+            daily_capacity += instance.capacities[l] * instance.calendar.available[line]
+    
+    # Total stock after day d is at least opening + production - demand
+    stock_floor = (
+        instance.initial_inventory.sum()
+        + np.cumsum(daily_capacity)
+        - np.cumsum(instance.demand.sum(axis=0))
+    )
+    storage = instance.max_inventory.sum()
+    overflow = np.flatnonzero(stock_floor > storage)
+    if overflow.size:
+        d = int(overflow[0])
+        issues.append(_issue(
+            SEVERITY_ERROR, 'Inventory', None,
+            f"Full-capacity production exceeds total storage by {instance.formatted_dates[d]}: at least "
+            f"{stock_floor[d]:,} in stock against a combined max. inventory of {storage:,}."
+        ))
+    
+    return issues
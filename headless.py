@@ -0,0 +1,358 @@
+"""
+Headless planning pipeline: workbook -> load -> process -> build -> solve
+
+No Streamlit or plotly imports; warnings come back in the result and are
+logged. Command line usage:
+
+    python headless.py plan.xlsx [-o plan_solution.json] [--format json|parquet]
+    python headless.py snapshot.npz --time-limit 5   (replays the recorded settings)
+    python headless.py plan.xlsx --rolling-horizon 28,14
+    python headless.py plan.xlsx --lns --time-limit 10
+    python headless.py plan.xlsx --buffer-days 5 --warm-start plan_solution.json
+    python headless.py plan.xlsx --warm-start greedy
+"""
+
+import io
+import json
+import logging
+import os
+from typing import Dict, List, Optional, Tuple, Union
+import pandas as pd
+from constants import (
+    DEFAULT_TIME_LIMIT_MIN, DEFAULT_BUFFER_DAYS,
+    DEFAULT_STOCKOUT_PENALTY, DEFAULT_TRANSITION_PENALTY,
+    ROLLING_WINDOW_DAYS, ROLLING_COMMIT_DAYS,
+)
+from data_loader import ExcelDataLoader
+from problem_instance import ProblemInstance, build_problem_instance
+from feasibility import analyze_feasibility, format_issue, has_errors
+from solver_cp_sat import build_and_solve_model
+from rolling_horizon import solve_rolling_horizon
+from lns import solve_lns
+from heuristics import greedy_solution
+
+logger = logging.getLogger(__name__)
+
+
+def load_workbook(source: Union[str, bytes], use_cache: bool = True) -> Tuple[Dict[str, pd.DataFrame], List[str]]:
+    """Load and validate a workbook from a path or raw bytes; raises ValueError on validation errors"""
+    if isinstance(source, (bytes, bytearray)):
+        file_bytes = bytes(source)
+    else:
+        with open(source, 'rb') as f:
+            file_bytes = f.read()
+    
+    workbook_cache = None
+    if use_cache:
+        from workbook_cache import get_workbook_cache
+        workbook_cache = get_workbook_cache()
+        cached = workbook_cache.get(file_bytes)
+        if cached is not None:
+            return cached
+    
+    loader = ExcelDataLoader(io.BytesIO(file_bytes))
+    success, data, errors, warnings = loader.load_and_validate()
+    if not success:
+        raise ValueError("Workbook validation failed:\n" + "\n".join(errors))
+    if workbook_cache is not None:
+        workbook_cache.put(file_bytes, data, warnings)
+    return data, warnings
+
+
+def solve_instance(instance: ProblemInstance, stockout_penalty: int = DEFAULT_STOCKOUT_PENALTY,
+                   transition_penalty: int = DEFAULT_TRANSITION_PENALTY,
+                   time_limit_min: float = DEFAULT_TIME_LIMIT_MIN,
+                   check_feasibility: bool = True, model_options: Optional[Dict] = None,
+                   rolling_horizon: Optional[Tuple[int, int]] = None, lns: bool = False,
+                   warm_start: Union[Dict, str, None] = None) -> Dict:
+    """Run the feasibility analyzer and the solver on a processed instance
+    
+    Returns {'status', 'solution', 'objective', 'best_bound', 'wall_time',
+    'issues', 'warm_start'}; 'solution' is the last solution dict found (None if
+    none) and 'status' is 'DATA_ERROR' when the analyzer found definite conflicts.
+    ``rolling_horizon`` = (window_days, commit_days) solves window by window
+    and ``lns`` improves an initial solve by neighborhood re-solves; status and
+    bound then describe the final evaluation of the resulting schedule.
+    ``warm_start`` (a previous solution dict, or 'greedy' for the greedy plan)
+    hints the single full solve, so it cannot be combined with
+    ``rolling_horizon`` or ``lns``; 'warm_start' reports how much of it was
+    hinted and kept.
+    """
+    if rolling_horizon and lns:
+        raise ValueError("Choose either rolling_horizon or lns")
+    if warm_start is not None and (rolling_horizon or lns):
+        raise ValueError("warm_start only applies to the full solve, not to rolling_horizon or lns")
+    issues = analyze_feasibility(instance) if check_feasibility else []
+    for issue in issues:
+        logger.warning(format_issue(issue))
+    if has_errors(issues):
+        return {
+            'status': 'DATA_ERROR',
+            'solution': None,
+            'objective': None,
+            'best_bound': None,
+            'wall_time': 0.0,
+            'issues': issues,
+            'warm_start': None,
+        }
+    
+    if warm_start == 'greedy':
+        warm_start = greedy_solution(instance, stockout_penalty, transition_penalty)
+    
+    if lns:
+        status, solution_callback, solver = solve_lns(
+            instance, stockout_penalty, transition_penalty, time_limit_min, model_options=model_options,
+            improvement_callback=lambda elapsed, objective, neighborhood: logger.info(
+                f"LNS {elapsed:.1f}s: objective {objective:,.0f} ({neighborhood})"
+            ),
+        )
+    elif rolling_horizon:
+        window_days, commit_days = rolling_horizon
+        status, solution_callback, solver = solve_rolling_horizon(
+            instance, stockout_penalty, transition_penalty, time_limit_min,
+            model_options=model_options, window_days=window_days, commit_days=commit_days,
+        )
+    else:
+        status, solution_callback, solver = build_and_solve_model(
+            instance=instance,
+            stockout_penalty=stockout_penalty,
+            transition_penalty=transition_penalty,
+            time_limit_min=time_limit_min,
+            model_options=model_options,
+            warm_start=warm_start,
+        )
+        if solution_callback.warm_start:
+            logger.info(f"Warm start: {solution_callback.warm_start}")
+    solution = solution_callback.solutions[-1] if solution_callback.num_solutions() > 0 else None
+    return {
+        'status': solver.StatusName(status),
+        'solution': solution,
+        'objective': solution['objective'] if solution else None,
+        'best_bound': solver.BestObjectiveBound(),
+        'wall_time': solver.WallTime(),
+        'issues': issues,
+        'warm_start': solution_callback.warm_start,
+    }
+
+
+def solve_workbook(source: Union[str, bytes], buffer_days: int = DEFAULT_BUFFER_DAYS,
+                   stockout_penalty: int = DEFAULT_STOCKOUT_PENALTY,
+                   transition_penalty: int = DEFAULT_TRANSITION_PENALTY,
+                   time_limit_min: float = DEFAULT_TIME_LIMIT_MIN,
+                   use_cache: bool = True, check_feasibility: bool = True,
+                   model_options: Optional[Dict] = None,
+                   rolling_horizon: Optional[Tuple[int, int]] = None, lns: bool = False,
+                   warm_start: Union[Dict, str, None] = None) -> Dict:
+    """Full pipeline for one workbook; the result also carries the instance and all warnings"""
+    data, load_warnings = load_workbook(source, use_cache=use_cache)
+    instance, instance_warnings = build_problem_instance(data, buffer_days)
+    warnings = list(load_warnings) + list(instance_warnings)
+    for warning in warnings:
+        logger.warning(warning)
+    
+    result = solve_instance(
+        instance, stockout_penalty, transition_penalty, time_limit_min, check_feasibility, model_options,
+        rolling_horizon, lns, warm_start,
+    )
+    result['instance'] = instance
+    result['warnings'] = warnings
+    result['params'] = {
+        'buffer_days': buffer_days,
+        'stockout_penalty': stockout_penalty,
+        'transition_penalty': transition_penalty,
+        'time_limit_min': time_limit_min,
+        'model_options': model_options or {},
+        'rolling_horizon': list(rolling_horizon) if rolling_horizon else None,
+        'lns': lns,
+        'warm_start': warm_start if isinstance(warm_start, str) else warm_start is not None,
+    }
+    return result
+
+
+def solve_snapshot(source, time_limit_min: Optional[float] = None, check_feasibility: bool = True,
+                   model_options: Optional[Dict] = None,
+                   rolling_horizon: Optional[Tuple[int, int]] = None, lns: Optional[bool] = None,
+                   warm_start: Union[Dict, str, None] = None) -> Dict:
+    """Replay an instance snapshot with its recorded parameters
+    
+    Penalties, time limit, model options and the solve method (full solve,
+    rolling horizon with its windows, LNS, greedy hint) come from the
+    snapshot. ``time_limit_min`` and ``model_options`` override the recorded
+    ones; passing ``rolling_horizon`` or ``lns`` replaces the recorded method.
+    A warm start from a previous solution is not recorded and must be passed
+    again as ``warm_start``.
+    """
+    from instance_snapshot import load_snapshot
+    
+    instance, params = load_snapshot(source)
+    if time_limit_min is not None:
+        params = dict(params, time_limit_min=time_limit_min)
+    if model_options:
+        params = dict(params, model_options=dict(params.get('model_options') or {}, **model_options))
+    if rolling_horizon is None and lns is None:
+        # App snapshots record rolling_horizon as a flag (default windows), headless ones as [window, commit]
+        recorded_windows = params.get('rolling_horizon')
+        if recorded_windows is True:
+            rolling_horizon = (ROLLING_WINDOW_DAYS, ROLLING_COMMIT_DAYS)
+        elif recorded_windows:
+            rolling_horizon = tuple(recorded_windows)
+        lns = bool(params.get('lns'))
+        if warm_start is None and params.get('greedy_hint') and not (rolling_horizon or lns):
+            warm_start = 'greedy'
+    lns = bool(lns)
+    params = dict(params, rolling_horizon=list(rolling_horizon) if rolling_horizon else None, lns=lns)
+    result = solve_instance(
+        instance,
+        stockout_penalty=params.get('stockout_penalty', DEFAULT_STOCKOUT_PENALTY),
+        transition_penalty=params.get('transition_penalty', DEFAULT_TRANSITION_PENALTY),
+        time_limit_min=params.get('time_limit_min', DEFAULT_TIME_LIMIT_MIN),
+        check_feasibility=check_feasibility,
+        model_options=params.get('model_options'),
+        rolling_horizon=rolling_horizon,
+        lns=lns,
+        warm_start=warm_start,
+    )
+    result['instance'] = instance
+    result['warnings'] = []
+    result['params'] = params
+    return result
+
+
+def load_solution(source: Union[str, io.IOBase]) -> Dict:
+    """Solution dict from a JSON result written by this module (or a bare solution dict), by path or file object"""
+    if isinstance(source, str):
+        with open(source) as f:
+            payload = json.load(f)
+    else:
+        payload = json.load(source)
+    solution = payload if 'is_producing' in payload else payload.get('solution')
+    if not solution or 'is_producing' not in solution:
+        raise ValueError("The file holds no schedule")
+    return solution
+
+
+# ========== OUTPUT ==========
+def result_to_json(result: Dict) -> str:
+    """Serializable view of a solve result (the instance itself is omitted)"""
+    payload = {key: value for key, value in result.items() if key != 'instance'}
+    return json.dumps(payload, indent=2, default=str)
+
+
+def result_to_frames(result: Dict) -> Dict[str, pd.DataFrame]:
+    """Tidy per-line schedule and per-grade inventory tables of a solve result"""
+    instance = result['instance']
+    solution = result.get('solution') or {}
+    schedule = solution.get('is_producing', {})
+    production = solution.get('production', {})
+    inventory = solution.get('inventory', {})
+    stockout = solution.get('stockout', {})
+    
+    schedule_rows = []
+    for line in instance.lines:
+        for day, date_str in zip(instance.dates, instance.formatted_dates):
+            schedule_rows.append({
+                'date': day,
+                'line': line,
+                'grade': schedule.get(line, {}).get(date_str),
+            })
+    
+    inventory_rows = []
+    for g, grade in enumerate(instance.grades):
+        for d, (day, date_str) in enumerate(zip(instance.dates, instance.formatted_dates)):
+            inventory_rows.append({
+                'date': day,
+                'grade': grade,
+                'demand': int(instance.demand[g, d]),
+                'production': production.get(grade, {}).get(date_str, 0),
+                'opening_inventory': inventory.get(grade, {}).get(date_str),
+                'stockout': stockout.get(grade, {}).get(date_str, 0),
+            })
+    
+    return {
+        'schedule': pd.DataFrame(schedule_rows),
+        'inventory': pd.DataFrame(inventory_rows),
+    }
+
+
+def write_result(result: Dict, output: str, output_format: str = 'json') -> List[str]:
+    """Write a solve result; Parquet output (needs pyarrow) writes one file per table"""
+    if output_format == 'json':
+        with open(output, 'w') as f:
+            f.write(result_to_json(result))
+        return [output]
+    
+    if output_format == 'parquet':
+        stem, _ = os.path.splitext(output)
+        paths = []
+        for name, frame in result_to_frames(result).items():
+            path = f"{stem}_{name}.parquet"
+            frame.to_parquet(path, index=False)
+            paths.append(path)
+        return paths
+    
+    raise ValueError(f"Unknown output format: {output_format}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Solve a production plan without the Streamlit UI")
+    parser.add_argument('input', help="Workbook (.xlsx) or instance snapshot (.npz)")
+    parser.add_argument('-o', '--output', help="Output path (default: <input>_solution.<ext>)")
+    parser.add_argument('--format', choices=['json', 'parquet'], default='json')
+    parser.add_argument('--buffer-days', type=int, default=DEFAULT_BUFFER_DAYS)
+    parser.add_argument('--stockout-penalty', type=int, default=DEFAULT_STOCKOUT_PENALTY)
+    parser.add_argument('--transition-penalty', type=int, default=DEFAULT_TRANSITION_PENALTY)
+    parser.add_argument('--time-limit', type=float, default=None,
+                        help=f"Solver time limit in minutes (default: {DEFAULT_TIME_LIMIT_MIN}, "
+                             f"or the recorded limit for snapshots)")
+    parser.add_argument('--no-cache', action='store_true', help="Do not use the parsed workbook cache")
+    parser.add_argument('--skip-feasibility', action='store_true', help="Solve even if the data check fails")
+    parser.add_argument('--option', action='append', default=[], metavar='KEY=VALUE',
+                        help="Model formulation option, e.g. transition_encoding=automaton (repeatable)")
+    parser.add_argument('--rolling-horizon', nargs='?', const=f"{ROLLING_WINDOW_DAYS},{ROLLING_COMMIT_DAYS}",
+                        metavar='WINDOW,COMMIT',
+                        help=f"Solve in overlapping windows (default {ROLLING_WINDOW_DAYS},{ROLLING_COMMIT_DAYS} days)")
+    parser.add_argument('--lns', action='store_true', default=None,
+                        help="Improve the plan by Large Neighborhood Search")
+    parser.add_argument('--warm-start', metavar='SOLUTION_JSON',
+                        help="Hint the solver with the schedule of a previous JSON result, or 'greedy'")
+    args = parser.parse_args(argv)
+    if args.warm_start and (args.rolling_horizon or args.lns):
+        parser.error("--warm-start cannot be combined with --rolling-horizon or --lns")
+    model_options = dict(option.split('=', 1) for option in args.option)
+    rolling_horizon = tuple(int(days) for days in args.rolling_horizon.split(',')) if args.rolling_horizon else None
+    
+    warm_start = load_solution(args.warm_start) if args.warm_start not in (None, 'greedy') else args.warm_start
+    
+    logging.basicConfig(level=logging.INFO, format='%(levelname)s %(name)s: %(message)s')
+    
+    if args.input.lower().endswith('.npz'):
+        result = solve_snapshot(
+            args.input, args.time_limit, not args.skip_feasibility, model_options, rolling_horizon, args.lns,
+            warm_start,
+        )
+    else:
+        result = solve_workbook(
+            args.input,
+            buffer_days=args.buffer_days,
+            stockout_penalty=args.stockout_penalty,
+            transition_penalty=args.transition_penalty,
+            time_limit_min=args.time_limit if args.time_limit is not None else DEFAULT_TIME_LIMIT_MIN,
+            use_cache=not args.no_cache,
+            check_feasibility=not args.skip_feasibility,
+            model_options=model_options,
+            rolling_horizon=rolling_horizon,
+            lns=bool(args.lns),
+            warm_start=warm_start,
+        )
+    
+    output = args.output or f"{os.path.splitext(args.input)[0]}_solution.{args.format}"
+    for path in write_result(result, output, args.format):
+        logger.info(f"Wrote {path}")
+    logger.info(f"Status {result['status']}, objective {result['objective']}")
+    return 0 if result['solution'] is not None else 1
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,307 @@
+"""
+Greedy constructive scheduler
+
+Builds a schedule day by day without CP-SAT. A line keeps its current run
+while min run days are owed; otherwise it runs the grade whose projected
+inventory falls below its minimum first, among the grades the rules allow
+(shutdowns, material running, pre-shutdown/restart and force start days,
+max run, rerun and forbidden transitions). It takes milliseconds and
+returns the SolutionCallback solution dict, so the plan can be previewed,
+used as a fallback when the solver finds nothing, or passed to
+build_and_solve_model as a warm start (``headless.py --warm-start greedy``).
+"""
+
+import time
+import numpy as np
+from typing import Dict, List
+from constants import GREEDY_LOOKAHEAD_DAYS, IDLE_LINE_PENALTY
+from problem_instance import ProblemInstance
+from solver_cp_sat import CONFLICT_CELL, fixed_cell_values
+
+
+def greedy_schedule(instance: ProblemInstance, stockout_penalty: int, transition_penalty: int,
+                    lookahead_days: int = GREEDY_LOOKAHEAD_DAYS) -> np.ndarray:
+    """Grade index per line and day (L x D int64, -1 = idle)
+    
+    A free line-day runs the grade whose production saves the most stockout and
+    min inventory penalty over the next ``lookahead_days``, net of the changeover
+    cost; when nothing is short yet, the grade with the earliest projected
+    stockout.
+    """
+    G, L, D = instance.num_grades, instance.num_lines, instance.num_days
+    calendar = instance.calendar
+    fixed = fixed_cell_values(instance)
+    # Cells two rules disagree on cannot be satisfied either way; they are left unproduced
+    # and schedule_violations reports them
+    blocked = (fixed == 0) | (fixed == CONFLICT_CELL)
+    demand = instance.demand
+    # Stock needed by the end of each day: demand so far plus the min closing inventory from the closing day
+    closing_day = D - instance.buffer_days - 1 if instance.buffer_days > 0 else D
+    closing_target = np.where(instance.min_closing_inventory > 0, instance.min_closing_inventory, 0)
+    cumulative_demand = np.cumsum(demand, axis=1)
+    cumulative_demand[:, max(closing_day, 0):] += closing_target[:, None]
+    inventory = instance.initial_inventory.astype(np.int64).copy()
+    schedule = np.full((L, D), -1, dtype=np.int64)
+    line_grades = [instance.grades_on_line(l) for l in range(L)]
+    forbidden = [instance.transitions.forbidden_matrix(line) for line in instance.lines]
+    costs = [instance.transitions.cost_matrix(line, transition_penalty) for line in instance.lines]
+    
+    # Run state per line: grade produced yesterday (-1 if idle), its run length and min run days still owed
+    current = instance.initial_grade.astype(np.int64).copy()
+    run_length = np.where(current >= 0, instance.initial_run_days, 0)
+    owed = np.zeros(L, dtype=np.int64)
+    for l, g in enumerate(current.tolist()):
+        if g >= 0 and not instance.initial_run_exempt[l]:
+            days = max(int(instance.min_run[g, l] - run_length[l]), 0)
+            owed[l] = days if calendar.window_available(instance.lines[l], 0, days) else 0
+    started = instance.started_before.copy()
+
+    def stockout_day(g, d, stock):
+        """First day from d on which the stock above min inventory no longer covers demand and the closing target"""
+        covered = stock - instance.min_inventory[g] + (cumulative_demand[g, d - 1] if d > 0 else 0)
+        return max(int(np.searchsorted(cumulative_demand[g], covered, side='right')), d)
+
+    def shortage(g, d, stock):
+        """Stockout plus min (closing) inventory deficit over the lookahead if nothing more of g is produced"""
+        closing = stock - np.cumsum(demand[g, d:d + lookahead_days])
+        deficit = np.maximum(instance.min_inventory[g] - np.maximum(closing, 0), 0).sum()
+        # The closing target only applies with buffer days, as in build_model
+        if instance.buffer_days > 0 and d <= closing_day < d + len(closing):
+            deficit += 3 * max(closing_target[g] - max(int(closing[closing_day - d]), 0), 0)
+        return max(-int(closing[-1]), 0) + int(deficit)
+    
+    for d in range(D):
+        produced = np.zeros(G, dtype=np.int64)
+        for l, line in enumerate(instance.lines):
+            if calendar.is_shutdown(line, d) or not line_grades[l]:
+                current[l], run_length[l], owed[l] = -1, 0, 0
+                continue
+            
+            capacity = int(instance.capacities[l])
+            previous = int(current[l])
+            # Grade pinned on the next day (pre-shutdown, restart, force start); today must be able to precede it
+            tomorrow_forced = [h for h in line_grades[l] if d + 1 < D and fixed[h, l, d + 1] == 1]
+
+            def can_run(g):
+                if blocked[g, l, d]:
+                    return False
+                if g == previous:
+                    return run_length[l] < instance.max_run[g, l]
+                if previous >= 0 and forbidden[l][previous, g]:
+                    return False
+                if not instance.rerun_allowed[g, l]:
+                    # The single run must not be spent on a stub cut short by a shutdown
+                    if started[g, l] or not calendar.window_available(line, d, int(instance.min_run[g, l])):
+                        return False
+                return not any(h != g and forbidden[l][g, h] for h in tomorrow_forced)
+
+            def overflows(g):
+                return inventory[g] + produced[g] + capacity - demand[g, d] > instance.max_inventory[g]
+            
+            forced = [g for g in line_grades[l] if fixed[g, l, d] == 1]
+            candidates = [g for g in line_grades[l] if can_run(g)]
+            if forced:
+                choice = forced[0]
+            elif owed[l] > 0 and previous in line_grades[l] and not blocked[previous, l, d]:
+                choice = previous
+            elif (previous in candidates and not instance.rerun_allowed[previous, l] and not overflows(previous)
+                  and stockout_day(previous, d, inventory[previous] + produced[previous]) < D):
+                # A grade that cannot run again keeps its single run until its demand is covered
+                choice = previous
+            else:
+                def score(g):
+                    stock = inventory[g] + produced[g]
+                    saving = stockout_penalty * (shortage(g, d, stock) - shortage(g, d, stock + capacity))
+                    if previous >= 0 and g != previous and len(line_grades[l]) > 1:
+                        saving -= costs[l][previous, g]
+                    # Overflowing max inventory ranks last; ties keep the current run going
+                    return overflows(g), -saving, stockout_day(g, d, stock), g != previous
+                
+                fallback = [g for g in line_grades[l] if not blocked[g, l, d]] or line_grades[l]
+                choice = min(candidates or fallback, key=score)
+            
+            if choice == previous:
+                run_length[l] += 1
+                owed[l] = max(owed[l] - 1, 0)
+            else:
+                in_material_block = instance.material_grade[l] == choice and d < instance.material_days[l]
+                min_run = int(instance.min_run[choice, l])
+                run_length[l] = 1
+                owed[l] = min_run - 1 if not in_material_block and calendar.window_available(line, d, min_run) else 0
+                if not in_material_block:
+                    started[choice, l] = True
+            current[l] = choice
+            schedule[l, d] = choice
+            produced[choice] += capacity
+        
+        available = inventory + produced
+        inventory = available - np.minimum(available, demand[:, d])
+    
+    return schedule
+
+
+def _runs(row: List[int]) -> List[tuple]:
+    """(grade, first day, length) of every run in a line's day row, idle days excluded"""
+    runs = []
+    for d, g in enumerate(row):
+        if g < 0:
+            continue
+        if runs and runs[-1][0] == g and runs[-1][1] + runs[-1][2] == d:
+            runs[-1] = (g, runs[-1][1], runs[-1][2] + 1)
+        else:
+            runs.append((g, d, 1))
+    return runs
+
+
+def schedule_violations(instance: ProblemInstance, schedule: np.ndarray, inventory: np.ndarray) -> List[str]:
+    """Hard rules a schedule (L x D grade indices) breaks; inventory is the G x (D + 1) opening stock"""
+    violations = []
+    calendar = instance.calendar
+    dates = instance.formatted_dates
+    fixed = fixed_cell_values(instance)
+    
+    for g, grade in enumerate(instance.grades):
+        over = np.flatnonzero(inventory[g, 1:] > instance.max_inventory[g])
+        if over.size:
+            violations.append(f"{grade} exceeds max inventory on {dates[over[0]]}")
+    
+    for l, line in enumerate(instance.lines):
+        forbidden = instance.transitions.forbidden_matrix(line)
+        row = schedule[l].tolist()
+        initial_grade = int(instance.initial_grade[l])
+        
+        pinned = [d for g, d in zip(*np.nonzero(fixed[:, l, :] >= 0)) if (row[d] == g) != bool(fixed[g, l, d])]
+        if pinned:
+            violations.append(f"{line}: fixed day {dates[min(pinned)]} not followed")
+        for g, d in zip(*np.nonzero(fixed[:, l, :] == CONFLICT_CELL)):
+            violations.append(f"{line}: conflicting rules fix {instance.grades[g]} on {dates[d]}")
+        
+        previous = initial_grade
+        for d, g in enumerate(row):
+            if g >= 0 and previous >= 0 and g != previous and forbidden[previous, g]:
+                violations.append(
+                    f"{line}: forbidden transition {instance.grades[previous]} -> {instance.grades[g]} on {dates[d]}"
+                )
+            previous = g
+        
+        starts = instance.started_before[:, l].astype(np.int64)
+        for g, first_day, length in _runs(row):
+            grade = instance.grades[g]
+            carried_days = int(instance.initial_run_days[l]) if first_day == 0 and g == initial_grade else 0
+            material_block = first_day == 0 and g == instance.material_grade[l] and instance.material_days[l] > 0
+            if carried_days + length > instance.max_run[g, l]:
+                violations.append(f"{line}: {grade} run from {dates[first_day]} exceeds its max run")
+            
+            if carried_days:
+                owed_days = 0 if instance.initial_run_exempt[l] else int(instance.min_run[g, l]) - carried_days
+                if length < owed_days and calendar.window_available(line, 0, owed_days):
+                    violations.append(f"{line}: {grade} carried-in run ends before its min run")
+                continue
+            if material_block:
+                continue
+            
+            min_run = int(instance.min_run[g, l])
+            if length < min_run and calendar.window_available(line, first_day, min_run):
+                violations.append(f"{line}: {grade} run from {dates[first_day]} is shorter than its min run")
+            starts[g] += 1
+            if starts[g] > 1 and not instance.rerun_allowed[g, l]:
+                violations.append(f"{line}: {grade} runs again from {dates[first_day]}")
+    return violations
+
+
+def schedule_solution(instance: ProblemInstance, schedule: np.ndarray, stockout_penalty: int,
+                      transition_penalty: int, elapsed: float = 0.0) -> Dict:
+    """Simulate a schedule (L x D grade indices, -1 = idle) into a SolutionCallback-style solution dict
+    
+    Inventory follows the solver's balance (supply is the lesser of stock and
+    demand) and the objective uses the solver's penalties, idle line-days
+    included, so the figures are comparable with CP-SAT solutions. Broken hard rules are listed under
+    'violations'.
+    """
+    G, D = instance.num_grades, instance.num_days
+    dates = instance.formatted_dates
+    production = np.zeros((G, D), dtype=np.int64)
+    for l in range(instance.num_lines):
+        running = schedule[l] >= 0
+        production[schedule[l, running], np.flatnonzero(running)] += instance.capacities[l]
+    
+    inventory = np.zeros((G, D + 1), dtype=np.int64)
+    stockout = np.zeros((G, D), dtype=np.int64)
+    inventory[:, 0] = instance.initial_inventory
+    for d in range(D):
+        available = inventory[:, d] + production[:, d]
+        supplied = np.minimum(available, instance.demand[:, d])
+        stockout[:, d] = instance.demand[:, d] - supplied
+        inventory[:, d + 1] = available - supplied
+    
+    # Objective terms as in build_model
+    deficit = np.maximum(instance.min_inventory[:, None] - inventory[:, 1:], 0)
+    deficit[instance.min_inventory <= 0] = 0
+    closing_deficit = 0
+    if instance.buffer_days > 0:
+        closing = np.maximum(instance.min_closing_inventory - inventory[:, D - instance.buffer_days], 0)
+        closing_deficit = int(closing[instance.min_closing_inventory > 0].sum())
+    stockout_cost = stockout_penalty * (int(stockout.sum()) + int(deficit.sum()) + 3 * closing_deficit)
+    
+    transition_cost = 0
+    idle_cost = 0
+    per_line = {}
+    for l, line in enumerate(instance.lines):
+        # Idle outside shutdowns, on lines that can run any grade
+        if instance.grades_on_line(l):
+            idle_days = sum(
+                1 for d in np.flatnonzero(schedule[l] < 0) if not instance.calendar.is_shutdown(line, int(d))
+            )
+            idle_cost += IDLE_LINE_PENALTY * idle_days
+        
+        costs = instance.transitions.cost_matrix(line, transition_penalty)
+        row = schedule[l].tolist()
+        previous = int(instance.initial_grade[l])
+        if len(instance.grades_on_line(l)) >= 2:
+            for d, g in enumerate(row):
+                if g >= 0 and previous >= 0 and g != previous:
+                    transition_cost += int(costs[previous, g])
+                previous = g
+        
+        # Counted like SolutionCallback: grade changes across idle days, within the horizon
+        running = [g for g in row if g >= 0]
+        per_line[line] = sum(1 for a, b in zip(running, running[1:]) if a != b)
+    
+    objective = float(stockout_cost + transition_cost + idle_cost)
+    return {
+        'objective': objective,
+        'time': elapsed,
+        'production': {
+            grade: {dates[d]: int(production[g, d]) for d in np.flatnonzero(production[g])}
+            for g, grade in enumerate(instance.grades)
+        },
+        'inventory': {
+            grade: {**{dates[d]: int(inventory[g, d]) for d in range(D)}, 'final': int(inventory[g, D])}
+            for g, grade in enumerate(instance.grades)
+        },
+        'stockout': {
+            grade: {dates[d]: int(stockout[g, d]) for d in np.flatnonzero(stockout[g])}
+            for g, grade in enumerate(instance.grades)
+        },
+        'is_producing': {
+            line: {dates[d]: instance.grades[g] if g >= 0 else None for d, g in enumerate(schedule[l].tolist())}
+            for l, line in enumerate(instance.lines)
+        },
+        'transitions': {'per_line': per_line, 'total': sum(per_line.values())},
+        'objective_breakdown': {
+            'stockout': stockout_cost,
+            'transitions': transition_cost,
+            'idle': idle_cost,
+            'solver_objective': objective,
+            'calculated_total': objective,
+        },
+        'violations': schedule_violations(instance, schedule, inventory),
+    }
+
+
+def greedy_solution(instance: ProblemInstance, stockout_penalty: int, transition_penalty: int) -> Dict:
+    """Greedy schedule as a solution dict"""
+    start_time = time.time()
+    schedule = greedy_schedule(instance, stockout_penalty, transition_penalty)
+    return schedule_solution(instance, schedule, stockout_penalty, transition_penalty, time.time() - start_time)
+
@@ -0,0 +1,119 @@
+"""
+Binary snapshots of a processed ProblemInstance and its solver parameters
+
+A snapshot is a single NPZ archive: every instance array is stored as-is and
+a small JSON header (stored as a uint8 array) carries the grade/line names,
+the date axis layout and the solver parameters. Snapshots can be replayed
+without the workbook with ``python headless.py snapshot.npz``.
+"""
+
+import io
+import json
+import numpy as np
+from datetime import datetime
+from typing import Dict, Tuple, Union
+from calendar_index import CalendarIndex
+from transition_matrix import TransitionMatrix
+from problem_instance import ProblemInstance
+
+SNAPSHOT_FORMAT_VERSION = 1
+
+# Instance arrays stored verbatim under their attribute names
+_ARRAY_FIELDS = (
+    'capacities',
+    'initial_inventory', 'min_inventory', 'max_inventory', 'min_closing_inventory',
+    'demand',
+    'allowed', 'min_run', 'max_run', 'rerun_allowed', 'force_start',
+    'material_grade', 'material_days',
+    'pre_shutdown_grade', 'restart_grade',
+    'plant_rows', 'grade_rows', 'inventory_rows',
+    'initial_grade', 'initial_run_days', 'initial_run_exempt', 'started_before',
+    'force_start_outside',
+)
+
+
+def save_snapshot(instance: ProblemInstance, params: Dict) -> bytes:
+    """Serialize an instance and its solver parameters to NPZ bytes"""
+    calendar = instance.calendar
+    transitions = instance.transitions
+    G = instance.num_grades
+    transition_lines = transitions.lines
+    
+    header = {
+        'format_version': SNAPSHOT_FORMAT_VERSION,
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'grades': instance.grades,
+        'lines': instance.lines,
+        'buffer_days': instance.buffer_days,
+        'calendar_lines': calendar.lines,
+        'transition_lines': transition_lines,
+        'cost_lines': list(transitions.costs.keys()),
+        'unknown_lines': [list(entry) for entry in instance.unknown_lines],
+        'params': params,
+    }
+    
+    arrays = {name: getattr(instance, name) for name in _ARRAY_FIELDS}
+    arrays['dates'] = np.array(calendar.dates, dtype='datetime64[D]')
+    arrays['available'] = (
+        np.stack([calendar.available[line] for line in calendar.lines])
+        if calendar.lines else np.ones((0, calendar.num_days), dtype=bool)
+    )
+    arrays['transition_allowed'] = (
+        np.stack([transitions.allowed[line] for line in transition_lines])
+        if transition_lines else np.ones((0, G, G), dtype=bool)
+    )
+    arrays['transition_rows_defined'] = (
+        np.stack([transitions.rows_defined[line] for line in transition_lines])
+        if transition_lines else np.zeros((0, G), dtype=bool)
+    )
+    arrays['transition_costs'] = (
+        np.stack([transitions.costs[line] for line in transitions.costs])
+        if transitions.costs else np.zeros((0, G, G), dtype=np.int64)
+    )
+    arrays['header'] = np.frombuffer(json.dumps(header).encode('utf-8'), dtype=np.uint8)
+    
+    buffer = io.BytesIO()
+    np.savez_compressed(buffer, **arrays)
+    return buffer.getvalue()
+
+
+def load_snapshot(source: Union[bytes, str, io.IOBase]) -> Tuple[ProblemInstance, Dict]:
+    """Rebuild an instance and its solver parameters from snapshot bytes, a path or a file object"""
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+    
+    with np.load(source, allow_pickle=False) as archive:
+        header = json.loads(archive['header'].tobytes().decode('utf-8'))
+        if header.get('format_version') != SNAPSHOT_FORMAT_VERSION:
+            raise ValueError(
+                f"Unsupported snapshot format version {header.get('format_version')} "
+                f"(expected {SNAPSHOT_FORMAT_VERSION})"
+            )
+        arrays = {name: archive[name] for name in archive.files if name != 'header'}
+    
+    dates = arrays['dates'].astype(object).tolist()
+    shutdown_days = {
+        line: np.flatnonzero(~available).tolist()
+        for line, available in zip(header['calendar_lines'], arrays['available'])
+    }
+    calendar = CalendarIndex(dates, shutdown_days, header['calendar_lines'])
+    
+    transition_lines = header['transition_lines']
+    transitions = TransitionMatrix(
+        header['grades'],
+        dict(zip(transition_lines, arrays['transition_allowed'])),
+        dict(zip(transition_lines, arrays['transition_rows_defined'])),
+        dict(zip(header.get('cost_lines', []), arrays.get('transition_costs', []))),
+    )
+    
+    instance = ProblemInstance(
+        grades=header['grades'],
+        lines=header['lines'],
+        calendar=calendar,
+        buffer_days=header['buffer_days'],
+        transitions=transitions,
+        unknown_lines=[tuple(entry) for entry in header.get('unknown_lines', [])],
+        **{name: arrays.get(name) for name in _ARRAY_FIELDS},
+    )
+    return instance, header.get('params', {})
+
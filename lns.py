@@ -0,0 +1,163 @@
+"""
+Large Neighborhood Search around the CP-SAT model
+
+Starting from an incumbent schedule, each iteration frees one neighborhood
+of is_producing cells - one line, one time window or a few grades - pins
+every other cell to the incumbent, hints the freed cells with their current
+values and re-solves the small sub-model for a few seconds. Improvements
+replace the incumbent. The best schedule is finally evaluated on the full
+model, so the result is the usual (status, SolutionCallback, CpSolver)
+triple of build_and_solve_model.
+
+Every iteration rebuilds the whole model with the pinned cells as constants
+rather than editing one model in place: constant cells let the build drop
+most constraints, so the sub-model stays small, at the cost of one full
+build per neighborhood.
+"""
+
+import random
+import time
+import numpy as np
+from typing import Dict, Optional, Tuple
+from ortools.sat.python import cp_model
+from constants import (
+    SOLVER_RANDOM_SEED, LNS_NEIGHBORHOOD_SECONDS, LNS_WINDOW_DAYS, LNS_NEIGHBORHOOD_GRADES, LNS_INITIAL_FRACTION,
+)
+from problem_instance import ProblemInstance
+from solver_cp_sat import (
+    FREE_CELL, SolutionCallback, build_model, solve_model, resolve_model_options,
+    solution_cells, solve_fixed_schedule,
+)
+
+NEIGHBORHOOD_KINDS = ('line', 'window', 'grades')
+EVALUATION_MIN_SECONDS = 5.0  # Floor of the final evaluation's time limit once the budget is spent
+
+
+def neighborhood_mask(instance: ProblemInstance, kind: str, rng: random.Random,
+                      window_days: int = LNS_WINDOW_DAYS,
+                      num_grades: int = LNS_NEIGHBORHOOD_GRADES) -> Tuple[np.ndarray, str]:
+    """Cells freed by one random neighborhood (G x L x D bool) and a short description"""
+    mask = np.zeros((instance.num_grades, instance.num_lines, instance.num_days), dtype=bool)
+    if kind == 'line':
+        l = rng.randrange(instance.num_lines)
+        mask[:, l, :] = True
+        description = f"line {instance.lines[l]}"
+    elif kind == 'window':
+        length = min(window_days, instance.num_days)
+        start = rng.randrange(instance.num_days - length + 1)
+        mask[:, :, start:start + length] = True
+        description = f"days {instance.formatted_dates[start]} to {instance.formatted_dates[start + length - 1]}"
+    elif kind == 'grades':
+        chosen = rng.sample(range(instance.num_grades), min(num_grades, instance.num_grades))
+        mask[chosen, :, :] = True
+        description = "grades " + ", ".join(instance.grades[g] for g in sorted(chosen))
+    else:
+        raise ValueError(f"Unknown neighborhood kind: {kind}")
+    return mask & instance.allowed[:, :, None], description
+
+
+def _hint_cells(schedule_model, cells: np.ndarray, mask: np.ndarray):
+    """Hint the freed cells with their incumbent values"""
+    for g, l, d in zip(*np.nonzero(mask)):
+        var = schedule_model.is_producing[g][l][d]
+        if not isinstance(var, int):
+            schedule_model.model.AddHint(var, int(cells[g, l, d]))
+
+
+def solve_lns(
+    instance: ProblemInstance,
+    stockout_penalty: int,
+    transition_penalty: int,
+    time_limit_min: float,
+    progress_callback=None,
+    model_options: Optional[Dict] = None,
+    incumbent: Optional[Dict] = None,
+    neighborhood_seconds: float = LNS_NEIGHBORHOOD_SECONDS,
+    improvement_callback=None,
+    seed: int = SOLVER_RANDOM_SEED,
+    on_solve_start=None
+) -> Tuple[int, SolutionCallback, cp_model.CpSolver]:
+    """Improve an incumbent by repeated neighborhood re-solves until the time limit
+    
+    Without ``incumbent`` (a solution dict) the full model is first solved for
+    LNS_INITIAL_FRACTION of the time limit; if that finds nothing or proves
+    optimality its (status, callback, solver) is returned as is. ``improvement_callback``
+    receives (elapsed_s, objective, neighborhood description) for the initial
+    incumbent and every accepted improvement. ``on_solve_start`` is passed to
+    every solve (see solve_model). Each iteration rebuilds the full model; that
+    build time comes on top of ``neighborhood_seconds`` but within the time
+    limit. The final evaluation gets what is left, at least
+    EVALUATION_MIN_SECONDS.
+    """
+    options = resolve_model_options(model_options)
+    rng = random.Random(seed)
+    start_time = time.time()
+    deadline = start_time + time_limit_min * 60.0
+
+    def report(pct, message):
+        if progress_callback:
+            progress_callback(pct, message)
+    
+    initial_result = None
+    if incumbent is None:
+        report(0.0, "Finding an initial schedule...")
+        schedule_model = build_model(instance, stockout_penalty, transition_penalty, options)
+        result = solve_model(
+            schedule_model, time_limit_min * LNS_INITIAL_FRACTION, log_search_progress=False,
+            on_solve_start=on_solve_start,
+        )
+        if result[1].num_solutions() == 0:
+            return result
+        incumbent = result[1].solutions[-1]
+        initial_result = result
+    
+    cells = solution_cells(instance, incumbent)
+    best_objective = incumbent['objective']
+    if improvement_callback:
+        improvement_callback(time.time() - start_time, best_objective, "initial")
+    # No neighborhood can improve a proven optimum
+    if initial_result is not None and initial_result[0] == cp_model.OPTIMAL:
+        report(1.0, "Initial schedule is optimal")
+        return initial_result
+    
+    iteration = 0
+    while time.time() + 1.0 < deadline:
+        kind = NEIGHBORHOOD_KINDS[iteration % len(NEIGHBORHOOD_KINDS)]
+        mask, description = neighborhood_mask(instance, kind, rng)
+        iteration += 1
+        
+        # Pin everything outside the neighborhood to the incumbent
+        fixed_cells = np.where(mask, FREE_CELL, cells).astype(np.int8)
+        schedule_model = build_model(
+            instance, stockout_penalty, transition_penalty, dict(options, fixed_cells='constants'),
+            fixed_cells=fixed_cells,
+        )
+        _hint_cells(schedule_model, cells, mask)
+        # The build may have used up what was left of the budget
+        time_limit_s = min(neighborhood_seconds, deadline - time.time())
+        if time_limit_s <= 0:
+            break
+        status, solution_callback, solver = solve_model(
+            schedule_model, time_limit_s / 60.0, log_search_progress=False, on_solve_start=on_solve_start
+        )
+        
+        # Objectives are integral; the margin ignores floating-point noise
+        if solution_callback.num_solutions() > 0 and solution_callback.solutions[-1]['objective'] < best_objective - 0.5:
+            candidate = solution_callback.solutions[-1]
+            cells = solution_cells(instance, candidate)
+            best_objective = candidate['objective']
+            if improvement_callback:
+                improvement_callback(time.time() - start_time, best_objective, description)
+        
+        report(
+            min((time.time() - start_time) / (time_limit_min * 60.0), 1.0),
+            f"LNS iteration {iteration} ({description}): best objective {best_objective:,.0f}"
+        )
+    
+    report(1.0, "Evaluating the best schedule...")
+    evaluation_time_s = max(deadline - time.time(), EVALUATION_MIN_SECONDS)
+    return solve_fixed_schedule(
+        instance, stockout_penalty, transition_penalty, cells, options, evaluation_time_s / 60.0,
+        on_solve_start=on_solve_start,
+    )
+
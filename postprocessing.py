@@ -8,7 +8,7 @@ import plotly.express as px
 import plotly.graph_objects as go
 from datetime import datetime, date, timedelta
 from typing import Dict, List, Any
-import streamlit as st
+from calendar_index import contiguous_blocks
 
 
 # ===============================================================
@@ -97,10 +97,9 @@ def create_gantt_chart(
     )
     
     # Shutdown shading
-    if line in shutdown_periods and shutdown_periods[line]:
-        sd = shutdown_periods[line]
-        x0 = dates[sd[0]]
-        x1 = dates[sd[-1]] + timedelta(days=1)
+    for block_start, block_end in contiguous_blocks(shutdown_periods.get(line, [])):
+        x0 = dates[block_start]
+        x1 = dates[block_end] + timedelta(days=1)
         fig.add_vrect(
             x0=x0, x1=x1,
             fillcolor="red", opacity=0.12,
@@ -220,10 +219,9 @@ def create_inventory_chart(
     # Shutdown shading
     shutdown_added = False
     for line in lines_for_grade:
-        if line in shutdown_periods and shutdown_periods[line]:
-            shutdown_days = shutdown_periods[line]
-            start_shutdown = dates[shutdown_days[0]]
-            end_shutdown = dates[shutdown_days[-1]]
+        for block_start, block_end in contiguous_blocks(shutdown_periods.get(line, [])):
+            start_shutdown = dates[block_start]
+            end_shutdown = dates[block_end]
             
             fig.add_vrect(
                 x0=start_shutdown,
@@ -355,12 +353,11 @@ def create_schedule_table(
     schedule = solution.get("is_producing", {}).get(line, {})
     shutdown_days = shutdown_periods.get(line, []) if shutdown_periods else []
     
-    # Create a set of shutdown dates for quick lookup
-    shutdown_date_set = set()
-    if shutdown_days:
-        for day_idx in shutdown_days:
-            if day_idx < len(dates):
-                shutdown_date_set.add(dates[day_idx])
+    # Per-day shutdown flags for O(1) lookup
+    shutdown_flags = [False] * len(dates)
+    for block_start, block_end in contiguous_blocks(shutdown_days):
+        for day_idx in range(block_start, min(block_end + 1, len(dates))):
+            shutdown_flags[day_idx] = True
     
     rows = []
     current_grade = None
@@ -370,7 +367,7 @@ def create_schedule_table(
     for i, d in enumerate(dates):
         ds = d.strftime("%d-%b-%y")
         grade_today = schedule.get(ds)
-        is_shutdown_today = d in shutdown_date_set
+        is_shutdown_today = shutdown_flags[i]
         
         # Determine current state
         if is_shutdown_today:
@@ -413,33 +410,32 @@ def create_schedule_table(
 #  PRODUCTION SUMMARY
 # ===============================================================
 
-def create_production_summary(solution, production_vars, solver, grades, lines, num_days, buffer_days=0):
+def create_production_summary(solution, instance):
     """Builds production summary table for demand period only (excluding buffer days)."""
     rows = []
+    grades = instance.grades
+    lines = instance.lines
     
     # Calculate last day of actual demand period (excluding buffer)
-    last_demand_day = num_days - buffer_days
+    last_demand_day = instance.num_days - instance.buffer_days
+    demand_dates = instance.formatted_dates[:last_demand_day]
+    
+    # Per-line production = producing days x line capacity
+    schedule = solution.get('is_producing', {})
+    produced = {}
+    for l, line in enumerate(lines):
+        line_schedule = schedule.get(line, {})
+        for date_str in demand_dates:
+            grade = line_schedule.get(date_str)
+            if grade is not None:
+                produced[(grade, line)] = produced.get((grade, line), 0) + int(instance.capacities[l])
     
     for grade in sorted(grades):
         row = {"Grade": grade}
         total = 0
 
         for line in lines:
-            val = 0
-            for d in range(last_demand_day):  # Only count production during demand period
-                key = (grade, line, d)
-                if key in production_vars:
-                    try:
-                        val += solver.Value(production_vars[key])
-                    except:
-                        # If solver object not available, try to get from solution dict
-                        try:
-                            date_key = f"Day_{d}" if not hasattr(d, 'strftime') else d.strftime("%d-%b-%y")
-                            production_data = solution.get('production', {}).get(grade, {})
-                            if date_key in production_data:
-                                val += production_data[date_key]
-                        except:
-                            pass
+            val = produced.get((grade, line), 0)
             row[line] = int(val)
             total += val
 
@@ -503,3 +499,54 @@ def create_stockout_details_table(
 
     df = pd.DataFrame(rows).sort_values(["Date", "Grade"]).reset_index(drop=True)
     return df
+
+
+# ===============================================================
+#  OBJECTIVE TRACE CHART (LIVE SOLVE)
+# ===============================================================
+def create_objective_trace_chart(trace: List[Dict]) -> go.Figure:
+    """Incumbent objective and best bound against solve time."""
+    elapsed = [point["elapsed"] for point in trace]
+
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(
+        x=elapsed,
+        y=[point["objective"] for point in trace],
+        mode="lines+markers",
+        line=dict(color="#1f77b4", width=2, shape="hv"),
+        marker=dict(size=6),
+        name="Best objective",
+        hovertemplate="%{x:.1f}s<br>Objective: %{y:,.0f}<extra></extra>"
+    ))
+    fig.add_trace(go.Scatter(
+        x=elapsed,
+        y=[point["bound"] for point in trace],
+        mode="lines",
+        line=dict(color="gray", width=1.5, dash="dash", shape="hv"),
+        name="Best bound",
+        hovertemplate="%{x:.1f}s<br>Bound: %{y:,.0f}<extra></extra>"
+    ))
+
+    fig.update_layout(
+        xaxis=dict(
+            title="Solve Time (s)",
+            showgrid=True,
+            gridcolor="lightgray",
+            rangemode="tozero",
+            tickfont=dict(color="#333333", size=12)
+        ),
+        yaxis=dict(
+            title="Objective",
+            showgrid=True,
+            gridcolor="lightgray",
+            tickfont=dict(color="#333333", size=12)
+        ),
+        plot_bgcolor="white",
+        paper_bgcolor="white",
+        margin=dict(l=60, r=80, t=40, b=60),
+        font=dict(size=12, color="gray"),
+        height=320,
+        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1)
+    )
+
+    return fig
@@ -0,0 +1,289 @@
+"""
+Typed, index-based problem instance shared by the solver and postprocessing
+"""
+
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Tuple
+from calendar_index import CalendarIndex
+from transition_matrix import TransitionMatrix
+from data_loader import (
+    process_plant_data, process_inventory_data, process_demand_data,
+    process_shutdown_dates, process_transition_rules,
+)
+
+
+class ProblemInstance:
+    """Fully processed scheduling problem
+    
+    Grades and lines are addressed by position (``grade_index``/``line_index``);
+    every per-grade, per-line or per-(grade, line) parameter is a NumPy array so
+    the solver's hot loops index arrays instead of hashing tuple keys, and the
+    whole instance pickles cheaply.
+    
+    Array conventions (G grades, L lines, D days):
+        capacities                  (L,)    int64
+        initial/min/max_inventory,
+        min_closing_inventory       (G,)    int64
+        demand                      (G, D)  int64
+        allowed                     (G, L)  bool
+        min_run, max_run            (G, L)  int64
+        rerun_allowed               (G, L)  bool
+        force_start                 (G, L)  int64 day index, -1 if none
+        material_grade              (L,)    int64 grade index, -1 if none
+        material_days               (L,)    int64 forced run days from day 0
+        pre_shutdown_grade,
+        restart_grade               (L,)    int64 grade index, -1 if none
+        plant_rows                  (L,)    int64 Plant sheet row, -1 if unknown
+        grade_rows                  (G,)    int64 first Inventory sheet row, -1 if unknown
+        inventory_rows              (G, L)  int64 Inventory sheet row, -1 if unknown
+    
+    Inputs the build could not place, reported by the feasibility analyzer:
+        force_start_outside         (G, L)  bool  Force Start Date outside the horizon (ignored)
+        unknown_lines               list of (grade, plant, Inventory row) for Lines entries
+                                            naming plants missing from the Plant sheet
+    
+    State carried in from before day 0 (defaults: a fresh start), used by the
+    rolling-horizon solver:
+        initial_grade               (L,)    int64 grade running the day before day 0, -1 if none
+        initial_run_days            (L,)    int64 length of that run so far
+        initial_run_exempt          (L,)    bool  that run owes no min run days
+        started_before              (G, L)  bool  grade already started a run (counts for rerun)
+    """
+    
+    __slots__ = (
+        'grades', 'lines', 'grade_index', 'line_index',
+        'dates', 'formatted_dates', 'num_days', 'buffer_days',
+        'capacities',
+        'initial_inventory', 'min_inventory', 'max_inventory', 'min_closing_inventory',
+        'demand',
+        'allowed', 'min_run', 'max_run', 'rerun_allowed', 'force_start',
+        'material_grade', 'material_days',
+        'pre_shutdown_grade', 'restart_grade',
+        'calendar', 'transitions',
+        'plant_rows', 'grade_rows', 'inventory_rows',
+        'force_start_outside', 'unknown_lines',
+        'initial_grade', 'initial_run_days', 'initial_run_exempt', 'started_before',
+    )
+
+    def __init__(self, grades: List[str], lines: List[str], calendar: CalendarIndex, buffer_days: int,
+                 capacities: np.ndarray, initial_inventory: np.ndarray, min_inventory: np.ndarray,
+                 max_inventory: np.ndarray, min_closing_inventory: np.ndarray, demand: np.ndarray,
+                 allowed: np.ndarray, min_run: np.ndarray, max_run: np.ndarray, rerun_allowed: np.ndarray,
+                 force_start: np.ndarray, material_grade: np.ndarray, material_days: np.ndarray,
+                 pre_shutdown_grade: np.ndarray, restart_grade: np.ndarray, transitions: TransitionMatrix,
+                 plant_rows: np.ndarray = None, grade_rows: np.ndarray = None,
+                 inventory_rows: np.ndarray = None, initial_grade: np.ndarray = None,
+                 initial_run_days: np.ndarray = None, initial_run_exempt: np.ndarray = None,
+                 started_before: np.ndarray = None, force_start_outside: np.ndarray = None,
+                 unknown_lines: List[Tuple[str, str, int]] = None):
+        self.grades = list(grades)
+        self.lines = list(lines)
+        self.grade_index = {grade: g for g, grade in enumerate(self.grades)}
+        self.line_index = {line: l for l, line in enumerate(self.lines)}
+        self.calendar = calendar
+        self.dates = calendar.dates
+        self.formatted_dates = calendar.formatted_dates
+        self.num_days = calendar.num_days
+        self.buffer_days = int(buffer_days)
+        self.capacities = capacities
+        self.initial_inventory = initial_inventory
+        self.min_inventory = min_inventory
+        self.max_inventory = max_inventory
+        self.min_closing_inventory = min_closing_inventory
+        self.demand = demand
+        self.allowed = allowed
+        self.min_run = min_run
+        self.max_run = max_run
+        self.rerun_allowed = rerun_allowed
+        self.force_start = force_start
+        self.material_grade = material_grade
+        self.material_days = material_days
+        self.pre_shutdown_grade = pre_shutdown_grade
+        self.restart_grade = restart_grade
+        self.transitions = transitions
+        
+        # Source sheet rows, used to point data issues back at the workbook
+        G, L = len(self.grades), len(self.lines)
+        self.plant_rows = plant_rows if plant_rows is not None else np.full(L, -1, dtype=np.int64)
+        self.grade_rows = grade_rows if grade_rows is not None else np.full(G, -1, dtype=np.int64)
+        self.inventory_rows = (
+            inventory_rows if inventory_rows is not None else np.full((G, L), -1, dtype=np.int64)
+        )
+        self.force_start_outside = (
+            force_start_outside if force_start_outside is not None else np.zeros((G, L), dtype=bool)
+        )
+        self.unknown_lines = list(unknown_lines or [])
+        
+        # Carried-in state
+        self.initial_grade = initial_grade if initial_grade is not None else np.full(L, -1, dtype=np.int64)
+        self.initial_run_days = (
+            initial_run_days if initial_run_days is not None else np.zeros(L, dtype=np.int64)
+        )
+        self.initial_run_exempt = (
+            initial_run_exempt if initial_run_exempt is not None else np.zeros(L, dtype=bool)
+        )
+        self.started_before = started_before if started_before is not None else np.zeros((G, L), dtype=bool)
+
+    def __getstate__(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __setstate__(self, state):
+        for name, value in state.items():
+            setattr(self, name, value)
+
+    @property
+    def num_grades(self) -> int:
+        return len(self.grades)
+
+    @property
+    def num_lines(self) -> int:
+        return len(self.lines)
+
+    def grades_on_line(self, l: int) -> List[int]:
+        """Grade indices allowed on line l, in grade order"""
+        return np.flatnonzero(self.allowed[:, l]).tolist()
+
+    def lines_for_grade(self, g: int) -> List[int]:
+        """Line indices grade g may run on, in line order"""
+        return np.flatnonzero(self.allowed[g]).tolist()
+
+    @property
+    def allowed_lines(self) -> Dict[str, List[str]]:
+        return {grade: [self.lines[l] for l in self.lines_for_grade(g)] for g, grade in enumerate(self.grades)}
+
+    @property
+    def shutdown_periods(self) -> Dict[str, List[int]]:
+        return {line: self.calendar.shutdown_days(line) for line in self.lines}
+
+    @property
+    def has_initial_state(self) -> bool:
+        return bool((self.initial_grade >= 0).any() or self.started_before.any())
+
+    def quantity_gcd(self) -> int:
+        """Greatest common divisor of every quantity (capacities, demand, inventory levels), at least 1"""
+        quantities = np.concatenate([
+            self.capacities, self.demand.ravel(), self.initial_inventory,
+            self.min_inventory, self.max_inventory, self.min_closing_inventory,
+        ]).astype(np.int64)
+        return max(int(np.gcd.reduce(np.abs(quantities))) if quantities.size else 1, 1)
+    
+    def grade_name_map(self, values: np.ndarray) -> Dict[str, object]:
+        """Per-grade array as a {grade: value} dict"""
+        return dict(zip(self.grades, values.tolist()))
+
+    def line_grade_map(self, grade_per_line: np.ndarray) -> Dict[str, str]:
+        """Per-line grade index array as a {line: grade} dict, skipping -1"""
+        return {
+            self.lines[l]: self.grades[g]
+            for l, g in enumerate(grade_per_line.tolist()) if g >= 0
+        }
+
+
+def _to_int_array(values: List, default: int) -> np.ndarray:
+    return np.rint(pd.to_numeric(pd.Series(values, dtype=object), errors='coerce')
+                   .fillna(default).to_numpy(dtype=float)).astype(np.int64)
+
+
+def build_problem_instance(excel_data: Dict[str, pd.DataFrame], buffer_days: int) -> Tuple[ProblemInstance, List[str]]:
+    """Build a ProblemInstance from the validated sheets; also returns data warnings"""
+    warnings = []
+    
+    plant_data = process_plant_data(excel_data['Plant'])
+    lines = plant_data['lines']
+    inventory_data = process_inventory_data(excel_data['Inventory'], lines)
+    grades = inventory_data['grades']
+    demand, dates, num_days = process_demand_data(excel_data['Demand'], buffer_days, grades)
+    shutdown_periods = process_shutdown_dates(plant_data.get('shutdown_periods', {}), dates, warnings)
+    calendar = CalendarIndex(dates, shutdown_periods, lines)
+    transition_dfs = {k: v for k, v in excel_data.items() if k.startswith('Transition_')}
+    transitions = process_transition_rules(transition_dfs, grades)
+    
+    grade_index = {grade: g for g, grade in enumerate(grades)}
+    line_index = {line: l for l, line in enumerate(lines)}
+    G, L = len(grades), len(lines)
+    
+    # Grade x line parameters
+    allowed = np.zeros((G, L), dtype=bool)
+    for grade, plants in inventory_data['allowed_lines'].items():
+        for plant in plants:
+            if plant in line_index:
+                allowed[grade_index[grade], line_index[plant]] = True
+    
+    min_run = np.ones((G, L), dtype=np.int64)
+    max_run = np.full((G, L), 9999, dtype=np.int64)
+    rerun_allowed = np.ones((G, L), dtype=bool)
+    force_start = np.full((G, L), -1, dtype=np.int64)
+    force_start_outside = np.zeros((G, L), dtype=bool)
+    inventory_rows = np.full((G, L), -1, dtype=np.int64)
+    unknown_lines = []
+    params = inventory_data['grade_line_params']
+    force_start_days = calendar.indices_of(params['force_start'])
+    force_start_given = ~np.isnat(np.asarray(params['force_start'], dtype='datetime64[D]'))
+    for k, (grade, plant) in enumerate(params['keys']):
+        if plant not in line_index:
+            unknown_lines.append((grade, plant, int(params['rows'][k])))
+            continue
+        g, l = grade_index[grade], line_index[plant]
+        min_run[g, l] = params['min_run'][k]
+        max_run[g, l] = params['max_run'][k]
+        rerun_allowed[g, l] = params['rerun_allowed'][k]
+        force_start[g, l] = force_start_days[k]
+        force_start_outside[g, l] = force_start_given[k] and force_start_days[k] < 0
+        inventory_rows[g, l] = params['rows'][k]
+    
+    # Line parameters
+    capacities = _to_int_array([plant_data['capacities'][line] for line in lines], 0)
+    material_grade = np.full(L, -1, dtype=np.int64)
+    material_days = np.zeros(L, dtype=np.int64)
+    for plant, (material, expected_days) in plant_data.get('material_running', {}).items():
+        g = grade_index.get(material)
+        if g is None or expected_days is None or not allowed[g, line_index[plant]]:
+            # Unknown/disallowed grade or unspecified duration: no fixed block
+            continue
+        material_grade[line_index[plant]] = g
+        material_days[line_index[plant]] = min(expected_days, num_days)
+    
+    pre_shutdown_grade = np.full(L, -1, dtype=np.int64)
+    restart_grade = np.full(L, -1, dtype=np.int64)
+    for label, source, target in [
+        ('Pre-shutdown', plant_data.get('pre_shutdown_grades', {}), pre_shutdown_grade),
+        ('Restart', plant_data.get('restart_grades', {}), restart_grade),
+    ]:
+        for line, grade in source.items():
+            if grade not in grade_index:
+                warnings.append(f"{label} grade '{grade}' for line '{line}' is not a valid grade.")
+            elif not allowed[grade_index[grade], line_index[line]]:
+                warnings.append(f"{label} grade '{grade}' for line '{line}' is not allowed on that line.")
+            else:
+                target[line_index[line]] = grade_index[grade]
+    
+    # Grade parameters
+    instance = ProblemInstance(
+        grades=grades,
+        lines=lines,
+        calendar=calendar,
+        buffer_days=buffer_days,
+        capacities=capacities,
+        initial_inventory=_to_int_array([inventory_data['initial_inventory'][g] for g in grades], 0),
+        min_inventory=_to_int_array([inventory_data['min_inventory'][g] for g in grades], 0),
+        max_inventory=_to_int_array([inventory_data['max_inventory'][g] for g in grades], 1000000000),
+        min_closing_inventory=_to_int_array([inventory_data['min_closing_inventory'][g] for g in grades], 0),
+        demand=demand,
+        allowed=allowed,
+        min_run=min_run,
+        max_run=max_run,
+        rerun_allowed=rerun_allowed,
+        force_start=force_start,
+        material_grade=material_grade,
+        material_days=material_days,
+        pre_shutdown_grade=pre_shutdown_grade,
+        restart_grade=restart_grade,
+        transitions=transitions,
+        plant_rows=np.array([plant_data['rows'].get(line, -1) for line in lines], dtype=np.int64),
+        grade_rows=np.array([inventory_data['grade_rows'].get(g, -1) for g in grades], dtype=np.int64),
+        inventory_rows=inventory_rows,
+        force_start_outside=force_start_outside,
+        unknown_lines=unknown_lines,
+    )
+    return instance, warnings
@@ -0,0 +1,282 @@
+"""
+Rolling-horizon decomposition for long planning horizons
+
+The horizon is solved in overlapping windows: each window of ``window_days``
+is optimized from the state left by the days already committed (opening
+inventory, running grade and its run length, grades already started) and
+only its first ``commit_days`` are kept. The stitched schedule is finally
+evaluated on the full instance with every is_producing cell pinned, so the
+result is the usual (status, SolutionCallback, CpSolver) triple of
+build_and_solve_model. Horizons no longer than one window are solved whole.
+"""
+
+import time
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+from ortools.sat.python import cp_model
+from constants import ROLLING_WINDOW_DAYS, ROLLING_COMMIT_DAYS
+from calendar_index import CalendarIndex
+from problem_instance import ProblemInstance
+from solver_cp_sat import (
+    FREE_CELL, SolutionCallback, build_model, solve_model, resolve_model_options, solve_fixed_schedule,
+)
+
+# Time reserved for the final evaluation of the stitched schedule (every cell is fixed),
+# at most this and at most EVALUATION_TIME_SHARE of the time limit
+EVALUATION_TIME_LIMIT_MIN = 1.0
+EVALUATION_TIME_SHARE = 0.1
+
+
+def window_starts(num_days: int, window_days: int, commit_days: int) -> List[int]:
+    """First day of every window; the last window reaches the horizon end and commits all of it"""
+    if commit_days < 1 or window_days < commit_days:
+        raise ValueError("Rolling horizon needs 1 <= commit_days <= window_days")
+    starts = [0]
+    while starts[-1] + window_days < num_days:
+        starts.append(starts[-1] + commit_days)
+    return starts
+
+
+def initial_state(instance: ProblemInstance) -> Dict[str, np.ndarray]:
+    """State carried into the first window: the instance's own opening state"""
+    return {
+        'inventory': instance.initial_inventory.copy(),
+        'grade': instance.initial_grade.copy(),
+        'run_days': instance.initial_run_days.copy(),
+        'run_exempt': instance.initial_run_exempt.copy(),
+        'started': instance.started_before.copy(),
+    }
+
+
+def window_instance(instance: ProblemInstance, start: int, length: int, state: Dict[str, np.ndarray]) -> ProblemInstance:
+    """Sub-instance for days [start, start + length) opening with the carried-in state"""
+    end = min(start + length, instance.num_days)
+    calendar = instance.calendar
+    # Shutdowns after the window stay visible: a run crossing the window end is not cut short
+    # there, so it keeps its min run (its tail is owed by the next window)
+    shutdown_days = {
+        line: [d - start for d in calendar.shutdown_days(line) if d >= start]
+        for line in calendar.lines
+    }
+    window_calendar = CalendarIndex(
+        calendar.dates[start:end], shutdown_days, calendar.lines, calendar.horizon_days - start
+    )
+    
+    # Remaining material running block; a block ending on `start` still forces the changeover on day 0
+    material_grade = np.where(instance.material_days < start, -1, instance.material_grade)
+    material_days = np.clip(instance.material_days - start, 0, end - start)
+    
+    # Pre-shutdown/restart pins belong to the instance's first/last shutdown block only
+    pre_shutdown_grade = np.full(instance.num_lines, -1, dtype=np.int64)
+    restart_grade = np.full(instance.num_lines, -1, dtype=np.int64)
+    for l, line in enumerate(instance.lines):
+        shutdown_blocks = calendar.shutdown_blocks.get(line)
+        if not shutdown_blocks:
+            continue
+        first_block_start = shutdown_blocks[0][0]
+        if start <= first_block_start - 1 < end:
+            pre_shutdown_grade[l] = instance.pre_shutdown_grade[l]
+        last_block_end = shutdown_blocks[-1][1]
+        if start <= last_block_end < end - 1:
+            restart_grade[l] = instance.restart_grade[l]
+    
+    force_start = np.where(
+        (instance.force_start >= start) & (instance.force_start < end), instance.force_start - start, -1
+    )
+    
+    return ProblemInstance(
+        grades=instance.grades,
+        lines=instance.lines,
+        calendar=window_calendar,
+        buffer_days=min(instance.buffer_days, end - start) if end == instance.num_days else 0,
+        capacities=instance.capacities,
+        initial_inventory=state['inventory'],
+        min_inventory=instance.min_inventory,
+        max_inventory=instance.max_inventory,
+        min_closing_inventory=instance.min_closing_inventory,
+        demand=instance.demand[:, start:end],
+        allowed=instance.allowed,
+        min_run=instance.min_run,
+        max_run=instance.max_run,
+        rerun_allowed=instance.rerun_allowed,
+        force_start=force_start,
+        material_grade=material_grade,
+        material_days=material_days,
+        pre_shutdown_grade=pre_shutdown_grade,
+        restart_grade=restart_grade,
+        transitions=instance.transitions,
+        plant_rows=instance.plant_rows,
+        grade_rows=instance.grade_rows,
+        inventory_rows=instance.inventory_rows,
+        initial_grade=state['grade'],
+        initial_run_days=state['run_days'],
+        initial_run_exempt=state['run_exempt'],
+        started_before=state['started'],
+    )
+
+
+def boundary_pins(instance: ProblemInstance, start: int, end: int) -> np.ndarray:
+    """Pre-shutdown/restart days in [start, end) whose shutdown block lies outside the window
+    
+    The window model only pins the days next to a shutdown block it contains;
+    a block starting on ``end`` or ending the day before ``start`` needs these
+    explicit pins (G x L x window days, -1 = free).
+    """
+    pins = np.full((instance.num_grades, instance.num_lines, end - start), FREE_CELL, dtype=np.int8)
+    for l, line in enumerate(instance.lines):
+        shutdown_blocks = instance.calendar.shutdown_blocks.get(line)
+        if not shutdown_blocks:
+            continue
+        first_block_start = shutdown_blocks[0][0]
+        last_block_end = shutdown_blocks[-1][1]
+        boundary_days = (
+            (first_block_start - 1, instance.pre_shutdown_grade[l], first_block_start == end),
+            (last_block_end + 1, instance.restart_grade[l], last_block_end == start - 1),
+        )
+        for day, grade, block_outside in boundary_days:
+            if grade >= 0 and block_outside and start <= day < end:
+                pins[:, l, day - start] = np.where(instance.allowed[:, l], 0, FREE_CELL)
+                pins[grade, l, day - start] = 1
+    return pins
+
+
+def _advance_state(instance: ProblemInstance, schedule: np.ndarray, commit_end: int,
+                   window: ProblemInstance, solution: Dict, commit_days: int,
+                   state: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """State after the committed days, from the stitched schedule (L x D, -1 = idle)"""
+    calendar = instance.calendar
+    if commit_days < window.num_days:
+        inventory_key = window.formatted_dates[commit_days]
+    else:
+        inventory_key = 'final'
+    inventory = np.array(
+        [solution['inventory'][grade][inventory_key] for grade in instance.grades], dtype=np.int64
+    )
+    
+    grade = np.full(instance.num_lines, -1, dtype=np.int64)
+    run_days = np.zeros(instance.num_lines, dtype=np.int64)
+    run_exempt = np.zeros(instance.num_lines, dtype=bool)
+    started = state['started'].copy()
+    commit_start = commit_end - commit_days
+    for l, line in enumerate(instance.lines):
+        line_schedule = schedule[l]
+        
+        # Runs started in the committed days (the material running block is not a start)
+        for d in range(commit_start, commit_end):
+            g = line_schedule[d]
+            previous = line_schedule[d - 1] if d > 0 else instance.initial_grade[l]
+            in_material_block = instance.material_grade[l] == g and d < instance.material_days[l]
+            if g >= 0 and g != previous and not in_material_block:
+                started[g, l] = True
+        
+        last = line_schedule[commit_end - 1]
+        if last < 0:
+            continue
+        run_start = commit_end - 1
+        while run_start > 0 and line_schedule[run_start - 1] == last:
+            run_start -= 1
+        grade[l] = last
+        run_days[l] = commit_end - run_start
+        if run_start == 0 and instance.initial_grade[l] == last:
+            # Continues the run carried into the whole horizon
+            run_days[l] += instance.initial_run_days[l]
+            run_exempt[l] = instance.initial_run_exempt[l]
+        elif run_start == 0 and instance.material_grade[l] == last and instance.material_days[l] > 0:
+            run_exempt[l] = True
+        else:
+            # Same exemption as the full model: the run's min-run window hits a shutdown or the horizon end
+            run_exempt[l] = not calendar.window_available(line, run_start, int(instance.min_run[last, l]))
+    
+    return {
+        'inventory': inventory,
+        'grade': grade,
+        'run_days': run_days,
+        'run_exempt': run_exempt,
+        'started': started,
+    }
+
+
+def solve_rolling_horizon(
+    instance: ProblemInstance,
+    stockout_penalty: int,
+    transition_penalty: int,
+    time_limit_min: float,
+    progress_callback=None,
+    model_options: Optional[Dict] = None,
+    window_days: int = ROLLING_WINDOW_DAYS,
+    commit_days: int = ROLLING_COMMIT_DAYS,
+    on_solve_start=None
+) -> Tuple[int, SolutionCallback, cp_model.CpSolver]:
+    """Solve the instance window by window and evaluate the stitched schedule on the full model
+    
+    Any overlap ``window_days - commit_days`` (even none) is valid: a run
+    that crosses the end of the committed days is carried into the next
+    window with its run length, and that window must finish its min run.
+    Window ends are not treated as cutoffs. A larger overlap lets each
+    window see more of the days it commits to, which improves the plan and
+    makes it less likely that a later window inherits a state it cannot
+    continue feasibly.
+    
+    The time limit covers the final evaluation as well: that gets a small
+    reserve and the windows share the rest evenly, each window also taking
+    what earlier ones left unused. If a window has no solution its
+    (status, callback, solver) is returned as is, so callers see the usual
+    "no solution" outcome. ``on_solve_start`` is passed to every window solve
+    and the final evaluation (see solve_model).
+    """
+    options = resolve_model_options(model_options)
+    
+    deadline = time.time() + time_limit_min * 60.0
+    evaluation_time_min = min(EVALUATION_TIME_LIMIT_MIN, time_limit_min * EVALUATION_TIME_SHARE)
+    starts = window_starts(instance.num_days, window_days, commit_days)
+    schedule = np.full((instance.num_lines, instance.num_days), -1, dtype=np.int64)
+    state = initial_state(instance)
+    
+    for k, start in enumerate(starts):
+        last_window = k == len(starts) - 1
+        window = window_instance(instance, start, window_days, state)
+        if progress_callback:
+            progress_callback(
+                k / (len(starts) + 1),
+                f"Solving window {k + 1}/{len(starts)} ({window.formatted_dates[0]} to {window.formatted_dates[-1]})..."
+            )
+        
+        schedule_model = build_model(
+            window, stockout_penalty, transition_penalty, options,
+            fixed_cells=boundary_pins(instance, start, start + window.num_days),
+        )
+        remaining_min = (deadline - time.time()) / 60.0 - evaluation_time_min
+        window_time_min = max(remaining_min, 0.0) / (len(starts) - k)
+        status, solution_callback, solver = solve_model(
+            schedule_model, window_time_min, log_search_progress=False, on_solve_start=on_solve_start
+        )
+        if solution_callback.num_solutions() == 0:
+            return status, solution_callback, solver
+        
+        solution = solution_callback.solutions[-1]
+        kept_days = window.num_days if last_window else commit_days
+        for l, line in enumerate(instance.lines):
+            for d in range(kept_days):
+                grade = solution['is_producing'][line][window.formatted_dates[d]]
+                schedule[l, start + d] = instance.grade_index[grade] if grade is not None else -1
+        
+        if not last_window:
+            state = _advance_state(instance, schedule, start + commit_days, window, solution, commit_days, state)
+    
+    if progress_callback:
+        progress_callback(len(starts) / (len(starts) + 1), "Evaluating the stitched schedule...")
+    
+    # Pin every cell to the stitched schedule; the full model then yields inventory, stockouts and objective
+    cells = np.zeros((instance.num_grades, instance.num_lines, instance.num_days), dtype=np.int8)
+    for l in range(instance.num_lines):
+        for d in np.flatnonzero(schedule[l] >= 0).tolist():
+            cells[schedule[l, d], l, d] = 1
+    evaluation_time_min = max((deadline - time.time()) / 60.0, evaluation_time_min)
+    result = solve_fixed_schedule(
+        instance, stockout_penalty, transition_penalty, cells, options, evaluation_time_min, on_solve_start
+    )
+    
+    if progress_callback:
+        progress_callback(1.0, "Rolling horizon complete!")
+    return result
+
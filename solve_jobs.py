@@ -0,0 +1,232 @@
+"""
+Background solve jobs
+
+A solve runs in a daemon thread registered in a module-level job table, so
+the Streamlit script run that starts it returns at once and later runs
+(even of another browser session) poll the job by id. CP-SAT releases the
+GIL while it searches, so several jobs can proceed side by side without
+holding up the server's script threads.
+
+Any solve function with the build_and_solve_model signature works; it must
+accept ``progress_callback`` and ``on_solve_start``.
+
+Each solve's callback pushes its incumbents onto the job's queue from the
+solver thread; the page drains them with ``objective_trace()`` to draw the
+objective over time.
+"""
+
+import queue
+import threading
+import time
+import traceback
+import uuid
+from typing import Callable, Dict, List, Optional
+from constants import SOLVE_JOB_RETENTION_S
+from problem_instance import ProblemInstance
+
+JOB_RUNNING = 'running'
+JOB_DONE = 'done'
+JOB_FAILED = 'failed'
+JOB_CANCELLED = 'cancelled'
+
+_jobs: Dict[str, 'SolveJob'] = {}
+_jobs_lock = threading.Lock()
+
+
+class SolveCancelled(Exception):
+    """Raised inside a job's solve once the job has been cancelled"""
+
+
+class SolveJob:
+    """One background solve and its live state
+    
+    ``progress``/``message`` follow the solve's progress callback; ``result``
+    is the (status, solution_callback, solver) triple once ``status`` is
+    JOB_DONE, and ``error`` the formatted traceback if it is JOB_FAILED.
+    ``instance``, ``params`` and ``notes`` are kept for whoever picks up the
+    result. ``stopped_early`` is set once ``stop()`` cut the search short.
+    """
+
+    def __init__(self, job_id: str, instance: ProblemInstance, params: Dict, notes: Optional[List] = None):
+        self.job_id = job_id
+        self.instance = instance
+        self.params = dict(params)
+        self.notes = list(notes or [])
+        self.status = JOB_RUNNING
+        self.progress = 0.0
+        self.message = "Starting..."
+        self.started = time.time()
+        self.finished = None
+        self.result = None
+        self.error = None
+        self.stopped_early = False
+        self._cancel_requested = threading.Event()
+        # Stop request of the current solve, and one made before any solve started
+        self._search_stop = None
+        self._stop_pending = False
+        self._lock = threading.Lock()
+        self._incumbents = queue.Queue()
+        self._objective_trace = []
+        self._solver = None
+        self._solution_callback = None
+
+    @property
+    def is_running(self) -> bool:
+        return self.status == JOB_RUNNING
+
+    @property
+    def elapsed(self) -> float:
+        return (self.finished or time.time()) - self.started
+
+    @property
+    def best_objective(self) -> Optional[float]:
+        """Objective of the latest solution of the current (or last) solve, None before the first one"""
+        solution_callback = self._solution_callback
+        if solution_callback is None or not solution_callback.solutions:
+            return None
+        return solution_callback.solutions[-1]['objective']
+
+    def objective_trace(self) -> List[Dict]:
+        """Incumbents reported so far as {'elapsed', 'objective', 'bound'}, elapsed since the job started
+        
+        Drains the incumbent queue, so it should be called from one thread only.
+        """
+        while True:
+            try:
+                incumbent = self._incumbents.get_nowait()
+            except queue.Empty:
+                break
+            self._objective_trace.append({
+                'elapsed': incumbent['time'] - self.started,
+                'objective': incumbent['objective'],
+                'bound': incumbent['bound'],
+            })
+        return list(self._objective_trace)
+
+    def stop(self):
+        """Stop the running search and keep the best solution found so far
+        
+        Only the current solve is stopped; multi-solve drivers (rolling horizon,
+        LNS) go on with their next solve. A stop made before the first solve
+        has started applies to that solve.
+        """
+        with self._lock:
+            self.stopped_early = True
+            if self._search_stop is None:
+                self._stop_pending = True
+                return
+            self._search_stop.set()
+            solver = self._solver
+        solver.StopSearch()
+
+    def cancel(self):
+        """Stop the running search and discard its result"""
+        self._cancel_requested.set()
+        with self._lock:
+            search_stop, solver = self._search_stop, self._solver
+        if search_stop is not None:
+            search_stop.set()
+            solver.StopSearch()
+
+    def _on_progress(self, pct: float, message: str):
+        self.progress = float(pct)
+        self.message = message
+
+    def _on_solve_start(self, solver, solution_callback):
+        # Multi-solve drivers (rolling horizon, LNS) stop at their next solve
+        if self._cancel_requested.is_set():
+            raise SolveCancelled()
+        solution_callback.incumbent_queue = self._incumbents
+        # A stop or cancel arriving before the search has started cannot stop it yet; the
+        # search then checks for it at its first solution or bound improvement
+        search_stop = threading.Event()
+        solution_callback.stop_event = search_stop
+        def stop_if_requested(bound):
+            if search_stop.is_set():
+                solver.StopSearch()
+        solver.best_bound_callback = stop_if_requested
+        with self._lock:
+            if self._stop_pending or self._cancel_requested.is_set():
+                search_stop.set()
+                self._stop_pending = False
+            self._search_stop = search_stop
+            self._solver = solver
+            self._solution_callback = solution_callback
+
+    def _run(self, solve: Callable, solve_kwargs: Dict):
+        try:
+            result = solve(
+                instance=self.instance, progress_callback=self._on_progress,
+                on_solve_start=self._on_solve_start, **solve_kwargs
+            )
+            if self._cancel_requested.is_set():
+                raise SolveCancelled()
+            self.result = result
+            self.status = JOB_DONE
+        except SolveCancelled:
+            self.status = JOB_CANCELLED
+        except Exception:
+            self.error = traceback.format_exc()
+            self.status = JOB_FAILED
+        finally:
+            self.finished = time.time()
+            with self._lock:
+                self._search_stop = None
+                self._solver = None
+
+
+def start_job(solve: Callable, instance: ProblemInstance, params: Dict, notes: Optional[List] = None,
+              **solve_kwargs) -> str:
+    """Run solve(instance=instance, **solve_kwargs) in the background; returns the job id"""
+    _prune_jobs()
+    job = SolveJob(uuid.uuid4().hex[:12], instance, params, notes)
+    with _jobs_lock:
+        _jobs[job.job_id] = job
+    threading.Thread(
+        target=job._run, args=(solve, solve_kwargs), name=f"solve-{job.job_id}", daemon=True
+    ).start()
+    return job.job_id
+
+
+def get_job(job_id: Optional[str]) -> Optional[SolveJob]:
+    with _jobs_lock:
+        return _jobs.get(job_id)
+
+
+def list_jobs() -> List[SolveJob]:
+    with _jobs_lock:
+        return list(_jobs.values())
+
+
+def cancel_job(job_id: str) -> bool:
+    """Cancel a running job; False if it is unknown or already finished"""
+    job = get_job(job_id)
+    if job is None or not job.is_running:
+        return False
+    job.cancel()
+    return True
+
+
+def stop_job(job_id: str) -> bool:
+    """Stop a running job early, keeping its best solution; False if it is unknown or already finished"""
+    job = get_job(job_id)
+    if job is None or not job.is_running:
+        return False
+    job.stop()
+    return True
+
+
+def forget_job(job_id: str):
+    """Drop a job from the table, cancelling it if it still runs"""
+    with _jobs_lock:
+        job = _jobs.pop(job_id, None)
+    if job is not None and job.is_running:
+        job.cancel()
+
+
+def _prune_jobs():
+    """Drop finished jobs nobody collected within SOLVE_JOB_RETENTION_S"""
+    cutoff = time.time() - SOLVE_JOB_RETENTION_S
+    with _jobs_lock:
+        for job_id in [job_id for job_id, job in _jobs.items() if job.finished and job.finished < cutoff]:
+            del _jobs[job_id]
@@ -3,39 +3,56 @@ CP-SAT Solver for production optimization
 """
 
 from ortools.sat.python import cp_model
+import numpy as np
 import time
-from typing import Dict, List, Tuple
-from constants import SOLVER_NUM_WORKERS, SOLVER_RANDOM_SEED
-import math
+from typing import Dict, List, Optional, Tuple
+from constants import (
+    SOLVER_NUM_WORKERS, SOLVER_RANDOM_SEED, IDLE_LINE_PENALTY, DEFAULT_MODEL_OPTIONS, MODEL_OPTION_CHOICES,
+)
+from problem_instance import ProblemInstance
 
 
 class SolutionCallback(cp_model.CpSolverSolutionCallback):
-    """Callback to capture all solutions during search"""
+    """Callback to capture all solutions during search
     
-    def __init__(self, production, inventory, stockout, is_producing, grades, lines, dates, formatted_dates, num_days, 
-                 inventory_deficit_penalties=None, closing_inventory_deficit_penalties=None):
+    Variable containers are indexed by position: ``is_producing[g][l]`` and
+    ``production[g][l]`` are per-day lists (None if the grade cannot run on the
+    line; production entries are IntVars or capacity * literal expressions), ``inventory[g]`` has num_days + 1 entries and ``stockout[g]`` num_days.
+    Quantities are multiplied by ``scale`` to undo model quantity scaling.
+    """
+
+    def __init__(self, instance: ProblemInstance, production, inventory, stockout, is_producing,
+                 inventory_deficit_penalties=None, closing_inventory_deficit_penalties=None, scale=1):
         cp_model.CpSolverSolutionCallback.__init__(self)
+        self.instance = instance
         self.production = production
         self.inventory = inventory
         self.stockout = stockout
         self.is_producing = is_producing
-        self.grades = grades
-        self.lines = lines
-        self.dates = dates
-        self.formatted_dates = formatted_dates
-        self.num_days = num_days
+        self.grades = instance.grades
+        self.lines = instance.lines
+        self.dates = instance.dates
+        self.formatted_dates = instance.formatted_dates
+        self.num_days = instance.num_days
         self.inventory_deficit_penalties = inventory_deficit_penalties or {}
         self.closing_inventory_deficit_penalties = closing_inventory_deficit_penalties or {}
+        self.scale = scale
         self.solutions = []
         self.solution_times = []
         self.start_time = time.time()
         self.objective_breakdowns = []
+        # Hint coverage/agreement report when the solve was warm-started
+        self.warm_start = None
+        # Optional queue.Queue receiving {'time', 'objective', 'bound'} per solution for other threads
+        self.incumbent_queue = None
+        # Optional threading.Event; once set, the search stops at its next solution
+        self.stop_event = None
 
     def on_solution_callback(self):
         current_time = time.time() - self.start_time
         self.solution_times.append(current_time)
         current_obj = self.ObjectiveValue()
-
+        
         solution = {
             'objective': current_obj,
             'time': current_time,
@@ -44,80 +61,63 @@ class SolutionCallback(cp_model.CpSolverSolutionCallback):
             'stockout': {},
             'is_producing': {}
         }
-
+        
         # Store production data
-        for grade in self.grades:
+        for g, grade in enumerate(self.grades):
             solution['production'][grade] = {}
-            for line in self.lines:
+            for l in range(len(self.lines)):
+                production_row = self.production[g][l]
+                if production_row is None:
+                    continue
                 for d in range(self.num_days):
-                    key = (grade, line, d)
-                    if key in self.production:
-                        value = self.Value(self.production[key])
-                        if value > 0:
-                            date_key = self.formatted_dates[d]
-                            if date_key not in solution['production'][grade]:
-                                solution['production'][grade][date_key] = 0
-                            solution['production'][grade][date_key] += value
+                    value = self.Value(production_row[d]) * self.scale
+                    if value > 0:
+                        date_key = self.formatted_dates[d]
+                        if date_key not in solution['production'][grade]:
+                            solution['production'][grade][date_key] = 0
+                        solution['production'][grade][date_key] += value
         
         # Store inventory data - OPENING inventory for each day
-        for grade in self.grades:
+        for g, grade in enumerate(self.grades):
             solution['inventory'][grade] = {}
             
-            # First date gets initial inventory
+            # inventory[g][d] = opening inventory for day d
             for d in range(self.num_days):
-                key = (grade, d)
-                if key in self.inventory:
-                    # Map inventory at day d to the date for day d
-                    # inventory_vars[(grade, d)] = opening inventory for day d
-                    solution['inventory'][grade][self.formatted_dates[d]] = self.Value(self.inventory[key])
+                solution['inventory'][grade][self.formatted_dates[d]] = self.Value(self.inventory[g][d]) * self.scale
             
             # Store final closing inventory separately
-            final_key = (grade, self.num_days)
-            if final_key in self.inventory:
-                solution['inventory'][grade]['final'] = self.Value(self.inventory[final_key])
+            solution['inventory'][grade]['final'] = self.Value(self.inventory[g][self.num_days]) * self.scale
         
         # Store stockout data
-        for grade in self.grades:
+        for g, grade in enumerate(self.grades):
             solution['stockout'][grade] = {}
             for d in range(self.num_days):
-                key = (grade, d)
-                if key in self.stockout:
-                    value = self.Value(self.stockout[key])
-                    if value > 0:
-                        solution['stockout'][grade][self.formatted_dates[d]] = value
+                value = self.Value(self.stockout[g][d]) * self.scale
+                if value > 0:
+                    solution['stockout'][grade][self.formatted_dates[d]] = value
         
         # Store production schedule
-        for line in self.lines:
+        schedule = self._line_schedule()
+        for l, line in enumerate(self.lines):
             solution['is_producing'][line] = {}
             for d in range(self.num_days):
-                date_key = self.formatted_dates[d]
-                solution['is_producing'][line][date_key] = None
-                for grade in self.grades:
-                    key = (grade, line, d)
-                    if key in self.is_producing and self.Value(self.is_producing[key]) == 1:
-                        solution['is_producing'][line][date_key] = grade
-                        break
-
+                g = schedule[l][d]
+                solution['is_producing'][line][self.formatted_dates[d]] = self.grades[g] if g is not None else None
+        
         # Count transitions
         transition_count_per_line = {line: 0 for line in self.lines}
         total_transitions = 0
-
-        for line in self.lines:
+        
+        for l, line in enumerate(self.lines):
             last_grade = None
             for d in range(self.num_days):
-                current_grade = None
-                for grade in self.grades:
-                    key = (grade, line, d)
-                    if key in self.is_producing and self.Value(self.is_producing[key]) == 1:
-                        current_grade = grade
-                        break
-                
+                current_grade = schedule[l][d]
                 if current_grade is not None:
                     if last_grade is not None and current_grade != last_grade:
                         transition_count_per_line[line] += 1
                         total_transitions += 1
                     last_grade = current_grade
-
+        
         solution['transitions'] = {
             'per_line': transition_count_per_line,
             'total': total_transitions
@@ -127,8 +127,29 @@ class SolutionCallback(cp_model.CpSolverSolutionCallback):
         breakdown = self.calculate_objective_breakdown(current_obj)
         solution['objective_breakdown'] = breakdown
         self.objective_breakdowns.append(breakdown)
-
+        
         self.solutions.append(solution)
+        
+        if self.incumbent_queue is not None:
+            self.incumbent_queue.put({
+                'time': time.time(), 'objective': current_obj, 'bound': self.BestObjectiveBound()
+            })
+        
+        if self.stop_event is not None and self.stop_event.is_set():
+            self.StopSearch()
+
+    def _line_schedule(self) -> List[List]:
+        """Grade index produced per line and day (None if idle)"""
+        schedule = [[None] * self.num_days for _ in self.lines]
+        for l in range(len(self.lines)):
+            for g in range(len(self.grades)):
+                producing_row = self.is_producing[g][l]
+                if producing_row is None:
+                    continue
+                for d in range(self.num_days):
+                    if schedule[l][d] is None and self.Value(producing_row[d]) == 1:
+                        schedule[l][d] = g
+        return schedule
 
     def calculate_objective_breakdown(self, solver_objective):
         """Calculate detailed breakdown of the objective value"""
@@ -144,69 +165,452 @@ class SolutionCallback(cp_model.CpSolverSolutionCallback):
         return len(self.solutions)
 
 
-def build_and_solve_model(
-    grades: List[str],
-    lines: List[str],
-    dates: List,
-    formatted_dates: List[str],
-    num_days: int,
-    capacities: Dict,
-    initial_inventory: Dict,
-    min_inventory: Dict,
-    max_inventory: Dict,
-    min_closing_inventory: Dict,
-    demand_data: Dict,
-    allowed_lines: Dict,
-    min_run_days: Dict,
-    max_run_days: Dict,
-    force_start_date: Dict,
-    rerun_allowed: Dict,
-    material_running_info: Dict,
-    shutdown_periods: Dict,
-    pre_shutdown_grades: Dict,  # NEW parameter
-    restart_grades: Dict,       # NEW parameter
-    transition_rules: Dict,
-    buffer_days: int,
+def _inventory_bounds(instance: ProblemInstance, scale: int = 1) -> Tuple[List, List, List]:
+    """Per grade/day bounds of the opening inventory, from the data instead of a fixed 0..100000
+
+    Stock can grow by at most the capacity of the grade's available lines and is
+    capped by max inventory; it can shrink by at most the day's demand. Returns
+    (lower, upper) as G x (D + 1) lists and the G x D production capacity.
+    """
+    available = np.array([instance.calendar.available[line] for line in instance.lines], dtype=np.int64)
+    if available.size == 0:
+        available = np.zeros((0, instance.num_days), dtype=np.int64)
+    daily_capacity = (instance.allowed * (instance.capacities // scale)[None, :]) @ available
+    demand = instance.demand // scale
+    max_inventory = instance.max_inventory // scale
+
+    lower = np.empty((instance.num_grades, instance.num_days + 1), dtype=np.int64)
+    upper = np.empty_like(lower)
+    lower[:, 0] = upper[:, 0] = instance.initial_inventory // scale
+    for d in range(instance.num_days):
+        lower[:, d + 1] = np.maximum(lower[:, d] - demand[:, d], 0)
+        upper[:, d + 1] = np.minimum(upper[:, d] + daily_capacity[:, d], max_inventory)
+    # Keep domains non-empty; conflicting data is reported by the max inventory constraint
+    upper = np.maximum(upper, lower)
+    return lower.tolist(), upper.tolist(), daily_capacity.tolist()
+
+
+FREE_CELL = -1
+CONFLICT_CELL = -2
+
+
+def fixed_cell_values(instance: ProblemInstance, extra_pins: Optional[np.ndarray] = None) -> np.ndarray:
+    """Value forced on every (grade, line, day) cell by the data, before any variable exists
+
+    Covers shutdown days, material running blocks and the changeover after them,
+    pre-shutdown/restart days and force start dates, plus optional ``extra_pins``
+    (same shape, -1 = free). Returns a G x L x D int8 array: 0/1 for fixed cells,
+    FREE_CELL, or CONFLICT_CELL where two rules disagree.
+    """
+    num_days = instance.num_days
+    calendar = instance.calendar
+    fixed = np.full((instance.num_grades, instance.num_lines, num_days), FREE_CELL, dtype=np.int8)
+    
+    def pin(g, l, d, value):
+        current = fixed[g, l, d]
+        if current == FREE_CELL:
+            fixed[g, l, d] = value
+        elif current != value:
+            fixed[g, l, d] = CONFLICT_CELL
+    
+    def pin_single_grade(l, d, forced_grade):
+        for g in instance.grades_on_line(l):
+            pin(g, l, d, 1 if g == forced_grade else 0)
+    
+    for l, line in enumerate(instance.lines):
+        line_grades = instance.grades_on_line(l)
+        for d in calendar.shutdown_days(line):
+            for g in line_grades:
+                pin(g, l, d, 0)
+        
+        material = int(instance.material_grade[l])
+        material_days = int(instance.material_days[l])
+        if material >= 0:
+            for d in range(material_days):
+                pin_single_grade(l, d, material)
+            if material_days < num_days:
+                pin(material, l, material_days, 0)
+        
+        shutdown_blocks = calendar.shutdown_blocks.get(line)
+        if shutdown_blocks:
+            day_before = shutdown_blocks[0][0] - 1
+            if instance.pre_shutdown_grade[l] >= 0 and day_before >= 0:
+                pin_single_grade(l, day_before, int(instance.pre_shutdown_grade[l]))
+            day_after = shutdown_blocks[-1][1] + 1
+            if instance.restart_grade[l] >= 0 and day_after < num_days:
+                pin_single_grade(l, day_after, int(instance.restart_grade[l]))
+        
+        for g in line_grades:
+            if instance.force_start[g, l] >= 0:
+                pin(g, l, int(instance.force_start[g, l]), 1)
+    
+    if extra_pins is not None:
+        for g, l, d in zip(*np.nonzero((extra_pins >= 0) & instance.allowed[:, :, None])):
+            pin(g, l, d, int(extra_pins[g, l, d]))
+    
+    return fixed
+
+
+def _add(model: cp_model.CpModel, constraint, enforcement=None):
+    """model.Add for constraints whose terms may be fixed ints; enforcement may be a fixed 0/1 too
+
+    Constraints over fixed cells only are evaluated here: satisfied ones are
+    dropped and violated ones make the model (or the enforcement literal) false.
+    """
+    if enforcement is not None and isinstance(enforcement, int):
+        if not enforcement:
+            return
+        enforcement = None
+    if isinstance(constraint, bool):
+        if not constraint:
+            model.AddBoolOr([] if enforcement is None else [enforcement.Not()])
+        return
+    ct = model.Add(constraint)
+    if enforcement is not None:
+        ct.OnlyEnforceIf(enforcement)
+
+
+def _start_literal(model: cp_model.CpModel, prod_today, prod_yesterday, name: str):
+    """Literal for "producing today but not yesterday", or a fixed 0/1 when the cells decide it"""
+    today_fixed = isinstance(prod_today, int)
+    yesterday_fixed = isinstance(prod_yesterday, int)
+    if (today_fixed and prod_today == 0) or (yesterday_fixed and prod_yesterday == 1):
+        return 0
+    if today_fixed and yesterday_fixed:
+        return 1
+    if today_fixed:
+        return prod_yesterday.Not()
+    if yesterday_fixed:
+        return prod_today
+    start = model.NewBoolVar(name)
+    model.Add(start <= prod_today)
+    model.Add(start <= 1 - prod_yesterday)
+    model.Add(start >= prod_today - prod_yesterday)
+    return start
+
+
+def _max_campaigns(num_days: int, min_run: int, num_shutdowns: int) -> int:
+    """Most runs of one grade that fit in ``num_days`` days
+    
+    Every run takes at least one day and a gap day before the grade runs
+    again. Runs of at least ``min_run`` days take ``min_run + 1`` days each.
+    Shorter runs are only allowed when they start within ``min_run - 1`` days
+    of a shutdown or the horizon end, so at most every other of those days.
+    """
+    at_most_one_day = -(-num_days // 2)
+    if min_run <= 1:
+        return at_most_one_day
+    full_runs = -(-num_days // (min_run + 1))
+    short_runs = (num_shutdowns + 1) * (min_run // 2)
+    return min(full_runs + short_runs, at_most_one_day)
+
+
+def _add_campaign_runs(model: cp_model.CpModel, instance: ProblemInstance, is_producing) -> List[List[Tuple]]:
+    """Run rules as ordered optional campaign intervals per (grade, line)
+    
+    Each campaign slot is an optional interval whose length is bounded by the
+    min/max run days; slots of one grade are ordered with at least one day
+    between them, so every slot is exactly one run. The material running block
+    is a fixed interval and shutdown blocks are fixed intervals in the line's
+    NoOverlap. Slots are tied to the daily is_producing cells through one
+    "slot covers day" literal per slot and day: a covered day lies inside the
+    slot, a slot covers exactly its length in days, and each is_producing cell
+    outside the material block is the sum of its covering literals. Rerun not
+    allowed means a single slot after the material block.
+    
+    Returns per line (grade, follows_running_day, present) for every slot: a
+    present slot that starts the day after the line produced is a changeover.
+    """
+    calendar = instance.calendar
+    num_days = instance.num_days
+    campaigns = [[] for _ in instance.lines]
+    
+    for l, line in enumerate(instance.lines):
+        shutdown_blocks = calendar.shutdown_blocks.get(line, [])
+        intervals = [
+            model.NewIntervalVar(start, end - start + 1, end + 1, f'shutdown_{line}_{start}')
+            for start, end in shutdown_blocks
+        ]
+        # First shutdown day at or after each start day, and whether the line produces the day before it
+        next_unavailable = [calendar.next_unavailable(line, d) for d in range(num_days)]
+        produced_day_before = [0] + [
+            sum(is_producing[g][l][d] for g in instance.grades_on_line(l)) for d in range(num_days - 1)
+        ]
+        
+        for g in instance.grades_on_line(l):
+            grade = instance.grades[g]
+            producing_row = is_producing[g][l]
+            min_run = int(instance.min_run[g, l])
+            max_run = int(instance.max_run[g, l])
+            
+            previous_end = None
+            is_material = instance.material_grade[l] == g
+            material_running_days = int(instance.material_days[l]) if is_material else 0
+            if material_running_days > 0:
+                intervals.append(model.NewIntervalVar(
+                    0, material_running_days, material_running_days, f'material_campaign_{grade}_{line}'
+                ))
+                # Max run applies to the material block too
+                _add(model, material_running_days <= max_run)
+                previous_end = material_running_days
+            
+            # Forced changeover: the material grade never runs the day after its block, even a 0-day one
+            first_day = material_running_days + 1 if is_material else 0
+            if first_day >= num_days:
+                num_slots = 0
+            elif not instance.rerun_allowed[g, l]:
+                num_slots = 1
+            else:
+                num_slots = _max_campaigns(num_days - first_day, min_run, len(shutdown_blocks))
+            
+            covering = [[] for _ in range(num_days)]
+            previous_present = None
+            for k in range(num_slots):
+                # Earlier slots take at least one day plus a gap each
+                earliest_start = first_day + 2 * k
+                if earliest_start >= num_days:
+                    break
+                present = model.NewBoolVar(f'campaign_{grade}_{line}_{k}')
+                start = model.NewIntVar(0, num_days - 1, f'campaign_start_{grade}_{line}_{k}')
+                length = model.NewIntVar(0, min(max_run, num_days), f'campaign_length_{grade}_{line}_{k}')
+                end = model.NewIntVar(0, num_days, f'campaign_end_{grade}_{line}_{k}')
+                model.Add(end == start + length)
+                intervals.append(model.NewOptionalIntervalVar(
+                    start, length, end, present, f'campaign_interval_{grade}_{line}_{k}'
+                ))
+                
+                model.Add(length >= 1).OnlyEnforceIf(present)
+                model.Add(start >= earliest_start).OnlyEnforceIf(present)
+                model.Add(length == 0).OnlyEnforceIf(present.Not())
+                model.Add(start == 0).OnlyEnforceIf(present.Not())
+                
+                # Slots are used in order, one day apart at least (same-grade runs never touch)
+                if previous_present is not None:
+                    model.AddImplication(present, previous_present)
+                if previous_end is not None:
+                    model.Add(start >= previous_end + 1).OnlyEnforceIf(present)
+                
+                # The slot covers exactly the days [start, end)
+                covers = []
+                for d in range(earliest_start, num_days):
+                    covers_day = model.NewBoolVar(f'campaign_covers_{grade}_{line}_{k}_{d}')
+                    model.AddImplication(covers_day, present)
+                    model.Add(start <= d).OnlyEnforceIf(covers_day)
+                    model.Add(end >= d + 1).OnlyEnforceIf(covers_day)
+                    covers.append(covers_day)
+                    covering[d].append(covers_day)
+                model.Add(sum(covers) == length)
+                
+                # Min run unless the window hits a shutdown or the horizon end
+                if min_run > 1:
+                    reach = model.NewIntVar(0, num_days, f'campaign_reach_{grade}_{line}_{k}')
+                    model.AddElement(start, next_unavailable, reach)
+                    exempt = model.NewBoolVar(f'campaign_exempt_{grade}_{line}_{k}')
+                    model.Add(reach - start <= min_run - 1).OnlyEnforceIf(exempt)
+                    model.Add(length >= min_run).OnlyEnforceIf([present, exempt.Not()])
+                
+                follows_running_day = model.NewIntVar(0, 1, f'campaign_follows_run_{grade}_{line}_{k}')
+                model.AddElement(start, produced_day_before, follows_running_day)
+                campaigns[l].append((g, follows_running_day, present))
+                
+                previous_present = present
+                previous_end = end
+            
+            # Outside the material block a grade produces exactly on the days its slots cover
+            for d in range(material_running_days, num_days):
+                _add(model, producing_row[d] == sum(covering[d]))
+        
+        model.AddNoOverlap(intervals)
+    
+    return campaigns
+
+
+def resolve_model_options(model_options: Optional[Dict] = None) -> Dict:
+    """Merge model options over the defaults, rejecting unknown keys and values"""
+    options = dict(DEFAULT_MODEL_OPTIONS)
+    for key, value in (model_options or {}).items():
+        if key not in MODEL_OPTION_CHOICES:
+            raise ValueError(f"Unknown model option '{key}'")
+        if value not in MODEL_OPTION_CHOICES[key]:
+            raise ValueError(
+                f"Invalid value '{value}' for model option '{key}' "
+                f"(expected one of {', '.join(map(str, MODEL_OPTION_CHOICES[key]))})"
+            )
+        options[key] = value
+    return options
+
+
+class ScheduleModel:
+    """A built CP-SAT model together with the variables needed to read solutions"""
+
+    def __init__(self, instance: ProblemInstance, model: cp_model.CpModel, options: Dict,
+                 production, inventory, stockout, is_producing,
+                 inventory_deficit_penalties, closing_inventory_deficit_penalties, build_time: float,
+                 scale: int = 1):
+        self.instance = instance
+        self.model = model
+        self.options = options
+        self.production = production
+        self.inventory = inventory
+        self.stockout = stockout
+        self.is_producing = is_producing
+        self.inventory_deficit_penalties = inventory_deficit_penalties
+        self.closing_inventory_deficit_penalties = closing_inventory_deficit_penalties
+        self.build_time = build_time
+        self.scale = scale
+        self.hints = []
+
+    def hint_solution(self, solution: Dict) -> Dict:
+        """Hint is_producing with a previous solution dict, matched by line, date and grade name
+        
+        Days, lines or grades the solution does not know (e.g. after a horizon
+        shift) stay unhinted, as do cells the data already fixes. Returns the
+        number of hinted cells and the share of free cells they cover.
+        """
+        instance = self.instance
+        self.model.ClearHints()
+        self.hints = []
+        free_cells = 0
+        for l, line in enumerate(instance.lines):
+            line_schedule = solution.get('is_producing', {}).get(line, {})
+            for d, date_key in enumerate(instance.formatted_dates):
+                known_day = date_key in line_schedule
+                grade = line_schedule.get(date_key)
+                hinted_grade = instance.grade_index.get(grade, -1)
+                known_day = known_day and (grade is None or hinted_grade >= 0)
+                for g in instance.grades_on_line(l):
+                    var = self.is_producing[g][l][d]
+                    if isinstance(var, int):
+                        continue
+                    free_cells += 1
+                    if known_day:
+                        value = int(g == hinted_grade)
+                        self.model.AddHint(var, value)
+                        self.hints.append((g, l, d, value))
+        return {
+            'hinted': len(self.hints),
+            'coverage': len(self.hints) / free_cells if free_cells else 0.0,
+        }
+
+    def hint_agreement(self, solution: Dict) -> float:
+        """Share of hinted cells that kept their hinted value in a solution dict"""
+        if not self.hints:
+            return 0.0
+        cells = solution_cells(self.instance, solution)
+        kept = sum(int(cells[g, l, d] == value) for g, l, d, value in self.hints)
+        return kept / len(self.hints)
+
+    def new_solution_callback(self) -> SolutionCallback:
+        return SolutionCallback(
+            self.instance, self.production, self.inventory, self.stockout, self.is_producing,
+            self.inventory_deficit_penalties, self.closing_inventory_deficit_penalties, self.scale
+        )
+
+    def stats(self) -> Dict:
+        """Model size as built (before presolve)"""
+        proto = self.model.Proto()
+        return {
+            'variables': len(proto.variables),
+            'constraints': len(proto.constraints),
+            'build_time': self.build_time,
+            'scale': self.scale,
+        }
+
+
+def build_model(
+    instance: ProblemInstance,
     stockout_penalty: int,
     transition_penalty: int,
-    time_limit_min: int,
-    progress_callback=None
-) -> Tuple[int, SolutionCallback, cp_model.CpSolver]:
-    """Build and solve the optimization model"""
+    model_options: Optional[Dict] = None,
+    progress_callback=None,
+    fixed_cells: Optional[np.ndarray] = None,
+    campaign_engine: bool = False
+) -> ScheduleModel:
+    """Build the optimization model without solving it
+    
+    ``fixed_cells`` (G x L x D int8, -1 = free) pins extra is_producing cells,
+    e.g. to fix part of an incumbent schedule.
+    
+    ``campaign_engine`` states the run rules as campaign slots instead of day
+    windows (see _add_campaign_runs). The day grid stays underneath, so the
+    model is larger, not faster; it is kept to cross-check the run rules and
+    is not offered as a model option.
+    """
     
     if progress_callback:
         progress_callback(0.0, "Building optimization model...")
     
+    build_start = time.time()
+    options = resolve_model_options(model_options)
+    
+    grades = instance.grades
+    lines = instance.lines
+    num_days = instance.num_days
+    buffer_days = instance.buffer_days
+    calendar = instance.calendar
+    transition_rules = instance.transitions
+    
+    # Optional common-divisor scaling of every quantity; objective weights absorb the factor
+    scale = instance.quantity_gcd() if options['quantity_scaling'] == 'gcd' else 1
+    capacities = (instance.capacities // scale).tolist()
+    initial_inventory = (instance.initial_inventory // scale).tolist()
+    min_inventory = (instance.min_inventory // scale).tolist()
+    max_inventory = (instance.max_inventory // scale).tolist()
+    min_closing_inventory = (instance.min_closing_inventory // scale).tolist()
+    demand = (instance.demand // scale).tolist()
+    stockout_weight = stockout_penalty * scale
+    inventory_lb, inventory_ub, daily_capacity = _inventory_bounds(instance, scale)
+    min_run_days = instance.min_run.tolist()
+    max_run_days = instance.max_run.tolist()
+    initial_grade = instance.initial_grade.tolist()
+    initial_run_days = instance.initial_run_days.tolist()
+    rerun_allowed = instance.rerun_allowed.tolist()
+    material_grade = instance.material_grade.tolist()
+    material_days = instance.material_days.tolist()
+    
+    grade_lines = [instance.lines_for_grade(g) for g in range(len(grades))]
+    line_grades = [instance.grades_on_line(l) for l in range(len(lines))]
+    
     model = cp_model.CpModel()
     
-    # Decision variables
-    is_producing = {}
-    production = {}
+    # Decision variables: is_producing[g][l][d], production[g][l][d]
+    is_producing = [[None] * len(lines) for _ in grades]
+    production = [[None] * len(lines) for _ in grades]
+    
+    # Create production variables; with the 'linear' encoding production is the
+    # expression capacity * is_producing instead of a separate IntVar
+    linear_production = options['production_encoding'] == 'linear'
     
-    def is_allowed_combination(grade, line):
-        return line in allowed_lines.get(grade, [])
+    # With 'constants', cells fixed by the data are plain 0/1 ints instead of
+    # variables; conflicting cells stay variables and get both pins below
+    fixed = fixed_cell_values(instance, fixed_cells) if options['fixed_cells'] == 'constants' else None
     
-    # Create production variables
-    for grade in grades:
-        for line in allowed_lines[grade]:
+    for g, grade in enumerate(grades):
+        for l in grade_lines[g]:
+            line = lines[l]
+            capacity = capacities[l]
+            producing_row = []
+            production_row = []
             for d in range(num_days):
-                key = (grade, line, d)
-                is_producing[key] = model.NewBoolVar(f'is_producing_{grade}_{line}_{d}')
+                if fixed is not None and fixed[g, l, d] >= 0:
+                    value = int(fixed[g, l, d])
+                    producing_row.append(value)
+                    production_row.append(capacity * value)
+                    continue
+                
+                producing_var = model.NewBoolVar(f'is_producing_{grade}_{line}_{d}')
+                producing_row.append(producing_var)
+                if linear_production:
+                    production_row.append(capacity * producing_var)
+                    continue
                 
                 # Always enforce full capacity or zero (HARD CONSTRAINT)
-                production_value = model.NewIntVar(0, capacities[line], f'production_{grade}_{line}_{d}')
-                model.Add(production_value == capacities[line]).OnlyEnforceIf(is_producing[key])
-                model.Add(production_value == 0).OnlyEnforceIf(is_producing[key].Not())
-                production[key] = production_value
-    
-    # Helper functions
-    def get_production_var(grade, line, d):
-        key = (grade, line, d)
-        return production.get(key, 0)
-    
-    def get_is_producing_var(grade, line, d):
-        key = (grade, line, d)
-        return is_producing.get(key)
+                production_value = model.NewIntVar(0, capacity, f'production_{grade}_{line}_{d}')
+                model.Add(production_value == capacity).OnlyEnforceIf(producing_var)
+                model.Add(production_value == 0).OnlyEnforceIf(producing_var.Not())
+                production_row.append(production_value)
+            is_producing[g][l] = producing_row
+            production[g][l] = production_row
     
     if progress_callback:
         progress_callback(0.1, "Adding hard constraints...")
@@ -214,130 +618,128 @@ def build_and_solve_model(
     # ========== HARD CONSTRAINTS ==========
     
     # 1. Shutdown constraints (HARD)
-    for line in lines:
-        if line in shutdown_periods and shutdown_periods[line]:
-            for d in shutdown_periods[line]:
-                for grade in grades:
-                    if is_allowed_combination(grade, line):
-                        key = (grade, line, d)
-                        if key in is_producing:
-                            model.Add(is_producing[key] == 0)
-                            model.Add(production[key] == 0)
+    for l, line in enumerate(lines):
+        for d in calendar.shutdown_days(line):
+            for g in line_grades[l]:
+                _add(model, is_producing[g][l][d] == 0)
+                if not linear_production:
+                    _add(model, production[g][l][d] == 0)
     
     # 2. One grade per line per day (HARD)
-    for line in lines:
+    for l in range(len(lines)):
         for d in range(num_days):
-            producing_vars = []
-            for grade in grades:
-                if is_allowed_combination(grade, line):
-                    var = get_is_producing_var(grade, line, d)
-                    if var is not None:
-                        producing_vars.append(var)
+            producing_vars = [is_producing[g][l][d] for g in line_grades[l]]
             if producing_vars:
-                model.Add(sum(producing_vars) <= 1)
+                _add(model, sum(producing_vars) <= 1)
     
     # 3. Material running constraints (HARD)
     # This creates a fixed block of production
-    material_running_map = {}
-    for plant, (material, expected_days) in material_running_info.items():
-        material_running_map[plant] = {
-            'material': material,
-            'expected_days': min(expected_days, num_days)
-        }
+    for l in range(len(lines)):
+        material = material_grade[l]
+        if material < 0:
+            continue
         
         # Force the material to run for exactly expected_days
-        for d in range(min(expected_days, num_days)):
-            if is_allowed_combination(material, plant):
-                model.Add(get_is_producing_var(material, plant, d) == 1)
-                # Force all other grades to 0
-                for other_material in grades:
-                    if other_material != material and is_allowed_combination(other_material, plant):
-                        model.Add(get_is_producing_var(other_material, plant, d) == 0)
+        for d in range(material_days[l]):
+            _add(model, is_producing[material][l][d] == 1)
+            # Force all other grades to 0
+            for other_material in line_grades[l]:
+                if other_material != material:
+                    _add(model, is_producing[other_material][l][d] == 0)
     
     # ========== NEW: PRE-SHUTDOWN AND RESTART GRADE CONSTRAINTS ==========
     if progress_callback:
         progress_callback(0.15, "Adding shutdown/restart constraints...")
+
+    def force_single_grade(l, d, forced_grade):
+        _add(model, is_producing[forced_grade][l][d] == 1)
+        # Also force all other grades to 0 on that day
+        for other_grade in line_grades[l]:
+            if other_grade != forced_grade:
+                _add(model, is_producing[other_grade][l][d] == 0)
     
-    for line in lines:
-        if line in shutdown_periods and shutdown_periods[line]:
-            shutdown_days = shutdown_periods[line]
-            
-            # Pre-Shutdown Grade constraint - ONLY if specified and not empty
-            if line in pre_shutdown_grades and pre_shutdown_grades[line]:
-                pre_grade = pre_shutdown_grades[line]
-                if pre_grade in grades and is_allowed_combination(pre_grade, line):
-                    # Day before shutdown must produce the pre-shutdown grade
-                    # HARD CONSTRAINT
-                    day_before = shutdown_days[0] - 1
-                    if day_before >= 0:
-                        var = get_is_producing_var(pre_grade, line, day_before)
-                        if var is not None:
-                            model.Add(var == 1)
-                            # Also force all other grades to 0 on that day
-                            for other_grade in grades:
-                                if other_grade != pre_grade and is_allowed_combination(other_grade, line):
-                                    other_var = get_is_producing_var(other_grade, line, day_before)
-                                    if other_var is not None:
-                                        model.Add(other_var == 0)
-            
-            # Restart Grade constraint - ONLY if specified and not empty
-            if line in restart_grades and restart_grades[line]:
-                restart_grade = restart_grades[line]
-                if restart_grade in grades and is_allowed_combination(restart_grade, line):
-                    # Day after shutdown must produce the restart grade
-                    # HARD CONSTRAINT
-                    day_after = shutdown_days[-1] + 1
-                    if day_after < num_days:
-                        var = get_is_producing_var(restart_grade, line, day_after)
-                        if var is not None:
-                            model.Add(var == 1)
-                            # Also force all other grades to 0 on that day
-                            for other_grade in grades:
-                                if other_grade != restart_grade and is_allowed_combination(other_grade, line):
-                                    other_var = get_is_producing_var(other_grade, line, day_after)
-                                    if other_var is not None:
-                                        model.Add(other_var == 0)
+    for l, line in enumerate(lines):
+        shutdown_blocks = calendar.shutdown_blocks.get(line)
+        if not shutdown_blocks:
+            continue
+        
+        # Pre-Shutdown Grade: day before shutdown must produce it (HARD)
+        pre_grade = instance.pre_shutdown_grade[l]
+        day_before = shutdown_blocks[0][0] - 1
+        if pre_grade >= 0 and day_before >= 0:
+            force_single_grade(l, day_before, pre_grade)
+        
+        # Restart Grade: day after shutdown must produce it (HARD)
+        restart_grade = instance.restart_grade[l]
+        day_after = shutdown_blocks[-1][1] + 1
+        if restart_grade >= 0 and day_after < num_days:
+            force_single_grade(l, day_after, restart_grade)
+    
+    # Extra pins requested by the caller
+    if fixed_cells is not None:
+        for g, l, d in zip(*np.nonzero(fixed_cells >= 0)):
+            if is_producing[g][l] is not None:
+                _add(model, is_producing[g][l][d] == int(fixed_cells[g, l, d]))
     
     if progress_callback:
         progress_callback(0.2, "Adding inventory constraints...")
     
-    # Inventory variables
-    inventory_vars = {}
-    for grade in grades:
-        for d in range(num_days + 1):
-            inventory_vars[(grade, d)] = model.NewIntVar(0, 100000, f'inventory_{grade}_{d}')
-    
-    stockout_vars = {}
-    for grade in grades:
-        for d in range(num_days):
-            stockout_vars[(grade, d)] = model.NewIntVar(0, 100000, f'stockout_{grade}_{d}')
+    # Inventory variables: inventory_vars[g][d] is the opening inventory of day d
+    inventory_vars = [
+        [
+            model.NewIntVar(inventory_lb[g][d], inventory_ub[g][d], f'inventory_{grade}_{d}')
+            for d in range(num_days + 1)
+        ]
+        for g, grade in enumerate(grades)
+    ]
+    stockout_vars = [[None] * num_days for _ in grades]
     
     # ========== FIXED INVENTORY BALANCE CONSTRAINTS ==========
     # This fixes the bug where stockouts occur despite available inventory
     
     # Initial inventory
-    for grade in grades:
-        model.Add(inventory_vars[(grade, 0)] == initial_inventory[grade])
+    for g in range(len(grades)):
+        model.Add(inventory_vars[g][0] == initial_inventory[g])
     
     # Inventory balance for each day
-    for grade in grades:
+    for g, grade in enumerate(grades):
         for d in range(num_days):
             # Calculate total production for this grade on day d
-            produced_today = sum(
-                get_production_var(grade, line, d) 
-                for line in allowed_lines[grade]
-            )
-            demand_today = demand_data[grade].get(dates[d], 0)
+            produced_today = sum(production[g][l][d] for l in grade_lines[g])
+            demand_today = demand[g][d]
+            
+            if options['inventory_balance'] != 'reified':
+                # Lean forms without the available/enough_inventory auxiliaries;
+                # stockout is the expression demand - supplied
+                if demand_today == 0:
+                    model.Add(inventory_vars[g][d + 1] == inventory_vars[g][d] + produced_today)
+                    stockout_vars[g][d] = 0
+                    continue
+                
+                supplied = model.NewIntVar(0, demand_today, f'supplied_{grade}_{d}')
+                if options['inventory_balance'] == 'min_equality':
+                    # supplied = min(opening + production, demand)
+                    model.AddMinEquality(supplied, [inventory_vars[g][d] + produced_today, demand_today])
+                else:
+                    # Linear relaxation: only the stockout penalty pushes supply up, so the
+                    # solver may hold stock back when that avoids larger deficit penalties
+                    model.Add(supplied <= inventory_vars[g][d] + produced_today)
+                
+                model.Add(inventory_vars[g][d + 1] == inventory_vars[g][d] + produced_today - supplied)
+                stockout_vars[g][d] = demand_today - supplied
+                continue
             
             # Available inventory (opening inventory + production)
-            available = model.NewIntVar(0, 100000, f'available_{grade}_{d}')
-            model.Add(available == inventory_vars[(grade, d)] + produced_today)
+            available = model.NewIntVar(
+                inventory_lb[g][d], inventory_ub[g][d] + daily_capacity[g][d], f'available_{grade}_{d}'
+            )
+            model.Add(available == inventory_vars[g][d] + produced_today)
             
             # Supply variable - what we actually supply today
-            supplied = model.NewIntVar(0, 100000, f'supplied_{grade}_{d}')
+            supplied = model.NewIntVar(0, max(demand_today, 0), f'supplied_{grade}_{d}')
             
             # Stockout variable
-            stockout = model.NewIntVar(0, 100000, f'stockout_{grade}_{d}')
+            stockout = model.NewIntVar(0, max(demand_today, 0), f'stockout_{grade}_{d}')
             
             # ========== CRITICAL FIX: FORCE MAXIMUM POSSIBLE SUPPLY ==========
             # This prevents artificial stockouts when inventory is available
@@ -363,265 +765,238 @@ def build_and_solve_model(
             model.Add(stockout == demand_today - supplied)
             
             # Update inventory for next day
-            model.Add(inventory_vars[(grade, d + 1)] == inventory_vars[(grade, d)] + produced_today - supplied)
-            model.Add(inventory_vars[(grade, d + 1)] >= 0)
+            model.Add(inventory_vars[g][d + 1] == inventory_vars[g][d] + produced_today - supplied)
+            model.Add(inventory_vars[g][d + 1] >= 0)
             
             # Store stockout variable
-            stockout_vars[(grade, d)] = stockout
+            stockout_vars[g][d] = stockout
     
     # Maximum inventory (HARD)
-    for grade in grades:
+    for g in range(len(grades)):
         for d in range(1, num_days + 1):
-            model.Add(inventory_vars[(grade, d)] <= max_inventory[grade])
+            model.Add(inventory_vars[g][d] <= max_inventory[g])
     
     if progress_callback:
         progress_callback(0.3, "Adding capacity constraints...")
     
     # 4. Full capacity utilization (HARD - except shutdown days)
-    for line in lines:
+    for l, line in enumerate(lines):
         for d in range(num_days):
-            if line in shutdown_periods and d in shutdown_periods[line]:
+            if calendar.is_shutdown(line, d):
                 continue
-            production_vars = [
-                get_production_var(grade, line, d) 
-                for grade in grades 
-                if is_allowed_combination(grade, line)
-            ]
+            production_vars = [production[g][l][d] for g in line_grades[l]]
             if production_vars:
                 # Line must produce at full capacity
-                model.Add(sum(production_vars) == capacities[line])
+                _add(model, sum(production_vars) == capacities[l])
     
     if progress_callback:
         progress_callback(0.4, "Adding run constraints...")
     
     # 5. Force start date constraints (HARD)
-    for grade_plant_key, start_date in force_start_date.items():
-        if start_date:
-            grade, plant = grade_plant_key
-            try:
-                start_day_index = dates.index(start_date)
-                var = get_is_producing_var(grade, plant, start_day_index)
-                if var is not None:
-                    model.Add(var == 1)
-            except ValueError:
-                pass
-    
-    # ========== CORRECTED MIN/MAX RUN DAYS LOGIC ==========
-    # Material running creates a fixed block
-    # After material running ends, there MUST be a changeover
-    # Minimum run days applies to NEW runs started within planning horizon
-    
-    for grade in grades:
-        for line in allowed_lines[grade]:
-            grade_plant_key = (grade, line)
-            min_run = min_run_days.get(grade_plant_key, 1)
-            max_run = max_run_days.get(grade_plant_key, 9999)
-            
-            # Check if this line has material running
-            has_material_running = line in material_running_map
-            material_running_grade = material_running_map[line]['material'] if has_material_running else None
-            material_running_days = material_running_map[line]['expected_days'] if has_material_running else 0
-            
-            # ========== FORCE CHANGEOVER AFTER MATERIAL RUNNING ==========
-            if has_material_running and material_running_grade == grade:
-                # This grade is forced for material_running_days
-                # The day after material running ends, we MUST NOT produce the same grade
-                if material_running_days < num_days:
-                    prod_day_after = get_is_producing_var(grade, line, material_running_days)
-                    if prod_day_after is not None:
-                        model.Add(prod_day_after == 0)  # Force changeover
-            
-            # ========== MINIMUM RUN DAYS CONSTRAINT ==========
-            # This applies to NEW runs started within planning horizon
-            # Material running block is excluded from min-run requirement
-            
-            # We'll track days where a new run could start
-            # A new run starts if:
-            # 1. Producing on day d
-            # 2. AND (day d is 0 OR not producing on day d-1)
-            # 3. AND day d is NOT within material running block for this grade
-            
-            for d in range(num_days):
-                # Check if this day is within material running block
-                is_in_material_block = (has_material_running and 
-                                       material_running_grade == grade and 
-                                       d < material_running_days)
-                
-                if is_in_material_block:
-                    continue  # Skip min-run constraint for material running days
-                
-                prod_today = get_is_producing_var(grade, line, d)
-                if prod_today is None:
-                    continue
+    for g in range(len(grades)):
+        for l in grade_lines[g]:
+            start_day_index = instance.force_start[g, l]
+            if start_day_index >= 0:
+                _add(model, is_producing[g][l][start_day_index] == 1)
+    
+    if campaign_engine and instance.has_initial_state:
+        raise ValueError("The campaign engine does not support carried-in run state")
+    if campaign_engine:
+        # ========== CAMPAIGN INTERVALS ==========
+        # Min/max run, rerun and the material changeover come from campaign slots
+        campaigns = _add_campaign_runs(model, instance, is_producing)
+    else:
+        # ========== RUN START INDICATORS ==========
+        # run_starts[g][l][d]: grade g starts a run on line l on day d (producing today,
+        # not yesterday; day 0 counts as a start). Built once and shared by min-run,
+        # max-run, rerun and changeover counting. Inside the material running block
+        # the material grade only continues its day-0 run, and it is forced off on the
+        # day after the block, so those days are constant 0. The grade carried in from
+        # before day 0 continues its run on day 0 instead of starting one.
+        run_starts = [[None] * len(lines) for _ in grades]
+        for g, grade in enumerate(grades):
+            for l in grade_lines[g]:
+                line = lines[l]
+                producing_row = is_producing[g][l]
+                material_running_days = material_days[l] if material_grade[l] == g else 0
                 
-                # Check if this is start of a new run
-                if d == 0:
-                    # Day 0: If producing and not in material block, it's a start
-                    # But wait, what if material running starts on day 0? We already skipped
-                    # So this is a genuine new start
-                    starts_new_run = prod_today
-                else:
-                    prod_yesterday = get_is_producing_var(grade, line, d - 1)
-                    if prod_yesterday is not None:
-                        # Check if yesterday was material running
-                        yesterday_in_material_block = (has_material_running and 
-                                                      material_running_grade == grade and 
-                                                      (d - 1) < material_running_days)
-                        
-                        if yesterday_in_material_block:
-                            # Yesterday was forced material running
-                            # Today cannot be same grade (we already enforced changeover)
-                            # So this cannot be a continuation
-                            continue
-                        
-                        # Create start indicator: producing today AND not producing yesterday
-                        starts_new_run = model.NewBoolVar(f'starts_new_run_{grade}_{line}_{d}')
-                        model.Add(starts_new_run <= prod_today)
-                        model.Add(starts_new_run <= 1 - prod_yesterday)
-                        model.Add(starts_new_run >= prod_today - prod_yesterday)
+                starts_row = []
+                for d in range(num_days):
+                    if d == 0:
+                        starts_row.append(0 if initial_grade[l] == g else producing_row[0])
+                    elif d <= material_running_days:
+                        starts_row.append(0)
                     else:
-                        continue
-                
-                # If this is start of a new run, enforce min_run days
-                # We need to ensure at least min_run consecutive days of production
-                # starting from day d
+                        starts_row.append(_start_literal(
+                            model, producing_row[d], producing_row[d - 1], f'run_start_{grade}_{line}_{d}'
+                        ))
+                run_starts[g][l] = starts_row
+        
+        # ========== CORRECTED MIN/MAX RUN DAYS LOGIC ==========
+        # Material running creates a fixed block
+        # After material running ends, there MUST be a changeover
+        # Minimum run days applies to NEW runs started within planning horizon
+        
+        def first_new_run_day(g, l):
+            """First day a start counts as a new run (after the material running block)"""
+            material_running_days = material_days[l] if material_grade[l] == g else 0
+            return material_running_days + 1 if material_running_days > 0 else 0
+        
+        for g, grade in enumerate(grades):
+            for l in grade_lines[g]:
+                line = lines[l]
+                min_run = min_run_days[g][l]
+                max_run = max_run_days[g][l]
+                producing_row = is_producing[g][l]
                 
-                # First, check if we have enough days remaining
-                if d + min_run > num_days:
-                    continue  # Not enough days for min_run
+                # Days of this grade's material running block on this line (0 if none)
+                material_running_days = material_days[l] if material_grade[l] == g else 0
                 
-                # Collect variables for the next min_run days
-                run_days_vars = []
-                valid_for_min_run = True
+                # ========== FORCE CHANGEOVER AFTER MATERIAL RUNNING ==========
+                if material_grade[l] == g:
+                    # This grade is forced for material_running_days
+                    # The day after material running ends, we MUST NOT produce the same grade
+                    if material_running_days < num_days:
+                        _add(model, producing_row[material_running_days] == 0)  # Force changeover
                 
-                for offset in range(min_run):
-                    day_idx = d + offset
-                    if day_idx >= num_days:
-                        valid_for_min_run = False
-                        break
-                    
-                    # Check for shutdown days
-                    if line in shutdown_periods and day_idx in shutdown_periods[line]:
-                        valid_for_min_run = False
-                        break
+                # ========== RUN CARRIED IN FROM BEFORE DAY 0 ==========
+                carried_run_days = initial_run_days[l] if initial_grade[l] == g else 0
+                if carried_run_days > 0:
+                    # Finish its min run unless exempt or cut by a shutdown/the horizon end
+                    owed_days = 0 if instance.initial_run_exempt[l] else min_run - carried_run_days
+                    if owed_days > 0 and calendar.window_available(line, 0, owed_days):
+                        for prod_var in producing_row[:owed_days]:
+                            _add(model, prod_var == 1)
                     
-                    prod_var = get_is_producing_var(grade, line, day_idx)
-                    if prod_var is not None:
-                        run_days_vars.append(prod_var)
-                    else:
-                        valid_for_min_run = False
-                        break
+                    # Max run counts the days before day 0 (the counter form seeds run_length instead)
+                    if options['run_formulation'] != 'counter':
+                        for d in range(max(max_run - carried_run_days, 0), min(max_run, num_days)):
+                            if calendar.window_available(line, 0, d + 1):
+                                _add(model, sum(run_starts[g][l][:d + 1]) >= 1, producing_row[d])
                 
-                if not valid_for_min_run or len(run_days_vars) < min_run:
+                if options['run_formulation'] == 'counter':
+                    # ========== RUN COUNTERS ==========
+                    # Same rules with O(days) constraints whatever the run limits:
+                    # remaining[d] = run days still owed after day d (min-run),
+                    # run_length[d] = length of the current run up to day d (max-run).
+                    # Non-producing days (including shutdowns) reset both counters.
+                    if min_run > 1:
+                        remaining = [
+                            model.NewIntVar(0, min_run - 1, f'run_remaining_{grade}_{line}_{d}')
+                            for d in range(num_days)
+                        ]
+                        for d in range(first_new_run_day(g, l), num_days):
+                            # Same exemption as the window form: shutdown or horizon end
+                            if calendar.window_available(line, d, min_run):
+                                _add(model, remaining[d] >= (min_run - 1) * run_starts[g][l][d])
+                        for d in range(1, num_days):
+                            model.Add(remaining[d] >= remaining[d - 1] - 1)
+                            # Days still owed force production tomorrow
+                            model.Add(remaining[d - 1] <= (min_run - 1) * producing_row[d])
+                    
+                    if max_run < num_days + carried_run_days:
+                        run_length = [
+                            model.NewIntVar(0, max_run, f'run_length_{grade}_{line}_{d}')
+                            for d in range(num_days)
+                        ]
+                        _add(model, run_length[0] >= (carried_run_days + 1) * producing_row[0])
+                        for d in range(1, num_days):
+                            _add(model, run_length[d] >= run_length[d - 1] + 1, producing_row[d])
                     continue
                 
-                # Enforce that if this is a start, all run_days_vars must be 1
-                for prod_var in run_days_vars[:min_run]:
-                    if d == 0:
-                        model.Add(prod_var == 1).OnlyEnforceIf(prod_today)
-                    else:
-                        model.Add(prod_var == 1).OnlyEnforceIf(starts_new_run)
-            
-            # ========== MAXIMUM RUN DAYS CONSTRAINT ==========
-            # This applies to ALL runs, including material running
-            
-            for d in range(num_days - max_run):
-                # Check sequence of max_run + 1 consecutive days
-                consecutive_vars = []
-                valid_sequence = True
+                # ========== MINIMUM RUN DAYS CONSTRAINT ==========
+                # This applies to NEW runs started within planning horizon
+                # Material running block (and its day-0 start) is excluded from min-run
                 
-                for offset in range(max_run + 1):
-                    day_idx = d + offset
-                    if day_idx >= num_days:
-                        valid_sequence = False
-                        break
+                for d in range(first_new_run_day(g, l), num_days):
+                    starts_new_run = run_starts[g][l][d]
                     
-                    # Shutdown days break the sequence
-                    if line in shutdown_periods and day_idx in shutdown_periods[line]:
-                        valid_sequence = False
-                        break
+                    # If this is start of a new run, enforce min_run days
+                    # The next min_run days must be inside the horizon and free of shutdowns
+                    if not calendar.window_available(line, d, min_run):
+                        continue
                     
-                    prod_var = get_is_producing_var(grade, line, day_idx)
-                    if prod_var is not None:
-                        consecutive_vars.append(prod_var)
-                    else:
-                        valid_sequence = False
-                        break
+                    # Enforce that if this is a start, all run days must be 1
+                    for prod_var in producing_row[d:d + min_run]:
+                        _add(model, prod_var == 1, starts_new_run)
                 
-                if valid_sequence and len(consecutive_vars) == max_run + 1:
-                    # Cannot have all max_run+1 days producing this grade
-                    model.Add(sum(consecutive_vars) <= max_run)
-    
+                # ========== MAXIMUM RUN DAYS CONSTRAINT ==========
+                # This applies to ALL runs, including material running
+                
+                for d in range(max_run, num_days):
+                    # Shutdown days break the sequence
+                    if not calendar.window_available(line, d - max_run, max_run + 1):
+                        continue
+                    
+                    # Producing on day d needs a run start within the last max_run days
+                    _add(model, sum(run_starts[g][l][d - max_run + 1:d + 1]) >= 1, producing_row[d])
+        
     if progress_callback:
         progress_callback(0.5, "Adding transition constraints...")
     
     # 6. Forbidden transitions (HARD)
-    for line in lines:
-        if transition_rules.get(line):
+    for l, line in enumerate(lines):
+        if transition_rules.has_rules(line):
+            forbidden = transition_rules.forbidden_matrix(line)
+            forbidden_pairs = [
+                (prev_grade, current_grade)
+                for prev_grade in line_grades[l]
+                for current_grade in line_grades[l]
+                if forbidden[prev_grade, current_grade]
+            ]
+            
+            # Day 0 follows the grade carried in from before the horizon
+            if initial_grade[l] >= 0 and num_days > 0:
+                for current_grade in line_grades[l]:
+                    if forbidden[initial_grade[l], current_grade]:
+                        _add(model, is_producing[current_grade][l][0] == 0)
+            
+            if not forbidden_pairs:
+                continue
+            
+            if options['transition_encoding'] == 'automaton':
+                # Per-day grade variable (0 = idle, k + 1 = k-th grade of the line) read by
+                # an automaton whose state is yesterday's grade; idle days reset it
+                states = range(len(line_grades[l]) + 1)
+                grade_sequence = []
+                for d in range(num_days):
+                    grade_var = model.NewIntVar(0, len(line_grades[l]), f'grade_{line}_{d}')
+                    model.Add(grade_var == sum(
+                        (k + 1) * is_producing[g][l][d] for k, g in enumerate(line_grades[l])
+                    ))
+                    grade_sequence.append(grade_var)
+                
+                transition_triples = [(0, label, label) for label in states]
+                for i, prev_grade in enumerate(line_grades[l]):
+                    transition_triples.append((i + 1, 0, 0))
+                    for j, current_grade in enumerate(line_grades[l]):
+                        if not forbidden[prev_grade, current_grade]:
+                            transition_triples.append((i + 1, j + 1, j + 1))
+                
+                model.AddAutomaton(grade_sequence, 0, list(states), transition_triples)
+                continue
+            
             for d in range(num_days - 1):
-                for prev_grade in grades:
-                    if prev_grade in transition_rules[line] and is_allowed_combination(prev_grade, line):
-                        allowed_next = transition_rules[line][prev_grade]
-                        for current_grade in grades:
-                            if (current_grade != prev_grade and 
-                                current_grade not in allowed_next and 
-                                is_allowed_combination(current_grade, line)):
-                                
-                                prev_var = get_is_producing_var(prev_grade, line, d)
-                                current_var = get_is_producing_var(current_grade, line, d + 1)
-                                
-                                if prev_var is not None and current_var is not None:
-                                    # HARD CONSTRAINT: Cannot have forbidden transition
-                                    model.Add(prev_var + current_var <= 1)
+                for prev_grade, current_grade in forbidden_pairs:
+                    # HARD CONSTRAINT: Cannot have forbidden transition
+                    _add(model, is_producing[prev_grade][l][d] + is_producing[current_grade][l][d + 1] <= 1)
     
     # 7. Rerun allowed constraints (HARD)
-    for grade in grades:
-        for line in allowed_lines[grade]:
-            grade_plant_key = (grade, line)
-            if not rerun_allowed.get(grade_plant_key, True):
-                # Count how many times this grade starts a new run
-                # Exclude material running from the count
-                
-                start_count_vars = []
-                for d in range(num_days):
-                    # Skip if this is within material running block
-                    has_material_running = line in material_running_map
-                    if has_material_running:
-                        material_running_grade = material_running_map[line]['material']
-                        material_running_days = material_running_map[line]['expected_days']
-                        if material_running_grade == grade and d < material_running_days:
-                            continue
-                    
-                    prod_today = get_is_producing_var(grade, line, d)
-                    if prod_today is None:
-                        continue
-                    
-                    if d == 0:
-                        # Day 0 could be a start (if not in material block)
-                        start_count_vars.append(prod_today)
-                    else:
-                        prod_yesterday = get_is_producing_var(grade, line, d - 1)
-                        if prod_yesterday is not None:
-                            # Check if yesterday was material running
-                            yesterday_in_material = (has_material_running and 
-                                                    material_running_grade == grade and 
-                                                    (d - 1) < material_running_days)
-                            
-                            if yesterday_in_material:
-                                # Yesterday was material running
-                                # Today cannot be same grade (changeover enforced)
-                                continue
-                            
-                            # Create start indicator
-                            start_indicator = model.NewBoolVar(f'rerun_start_{grade}_{line}_{d}')
-                            model.Add(start_indicator <= prod_today)
-                            model.Add(start_indicator <= 1 - prod_yesterday)
-                            model.Add(start_indicator >= prod_today - prod_yesterday)
-                            start_count_vars.append(start_indicator)
-                
-                if start_count_vars:
-                    # Can start at most once (excluding material running)
-                    model.Add(sum(start_count_vars) <= 1)
+    for g in range(len(grades)):
+        for l in grade_lines[g]:
+            if rerun_allowed[g][l] or campaign_engine:
+                continue
+            
+            # Count how many times this grade starts a new run
+            # Exclude material running from the count; a fixed 0 is never a start
+            start_count_vars = [
+                start for start in run_starts[g][l][first_new_run_day(g, l):]
+                if not (isinstance(start, int) and start == 0)
+            ]
+            
+            if start_count_vars:
+                # Can start at most once (excluding material running), counting runs before day 0
+                _add(model, sum(start_count_vars) <= 1 - int(instance.started_before[g, l]))
     
     if progress_callback:
         progress_callback(0.6, "Adding soft constraints...")
@@ -634,28 +1009,28 @@ def build_and_solve_model(
     closing_inventory_deficit_penalties = {}
     
     # 1. Minimum inventory (SOFT)
-    for grade in grades:
+    for g, grade in enumerate(grades):
         for d in range(num_days):
-            if min_inventory[grade] > 0:
-                min_inv_value = int(min_inventory[grade])
-                inventory_tomorrow = inventory_vars[(grade, d + 1)]
+            if min_inventory[g] > 0:
+                min_inv_value = int(min_inventory[g])
+                inventory_tomorrow = inventory_vars[g][d + 1]
                 
-                deficit_var = model.NewIntVar(0, 100000, f'inv_deficit_{grade}_{d}')
+                deficit_var = model.NewIntVar(0, min_inv_value, f'inv_deficit_{grade}_{d}')
                 model.Add(deficit_var >= min_inv_value - inventory_tomorrow)
                 model.Add(deficit_var >= 0)
                 
-                inventory_deficit_penalties[(grade, d)] = deficit_var
+                inventory_deficit_penalties[(g, d)] = deficit_var
         
         # Minimum closing inventory (SOFT)
-        if min_closing_inventory[grade] > 0 and buffer_days > 0:
-            closing_inventory = inventory_vars[(grade, num_days - buffer_days)]
-            min_closing = min_closing_inventory[grade]
+        if min_closing_inventory[g] > 0 and buffer_days > 0:
+            closing_inventory = inventory_vars[g][num_days - buffer_days]
+            min_closing = min_closing_inventory[g]
             
-            closing_deficit_var = model.NewIntVar(0, 100000, f'closing_deficit_{grade}')
+            closing_deficit_var = model.NewIntVar(0, min_closing, f'closing_deficit_{grade}')
             model.Add(closing_deficit_var >= min_closing - closing_inventory)
             model.Add(closing_deficit_var >= 0)
             
-            closing_inventory_deficit_penalties[grade] = closing_deficit_var
+            closing_inventory_deficit_penalties[g] = closing_deficit_var
     
     if progress_callback:
         progress_callback(0.7, "Building objective function...")
@@ -666,61 +1041,110 @@ def build_and_solve_model(
     objective_terms = []
     
     # 1. Stockout penalties (SOFT)
-    for grade in grades:
+    for g in range(len(grades)):
         for d in range(num_days):
-            if (grade, d) in stockout_vars:
-                objective_terms.append(stockout_penalty * stockout_vars[(grade, d)])
-
+            objective_terms.append(stockout_weight * stockout_vars[g][d])
+    
     # 2. Inventory deficit penalties (SOFT)
-    for (grade, d), deficit_var in inventory_deficit_penalties.items():
-        objective_terms.append(stockout_penalty * deficit_var)
+    for (g, d), deficit_var in inventory_deficit_penalties.items():
+        objective_terms.append(stockout_weight * deficit_var)
     
     # 3. Closing inventory deficit penalties (SOFT)
-    for grade, closing_deficit_var in closing_inventory_deficit_penalties.items():
-        objective_terms.append(stockout_penalty * closing_deficit_var * 3)
+    for g, closing_deficit_var in closing_inventory_deficit_penalties.items():
+        objective_terms.append(stockout_weight * closing_deficit_var * 3)
     
     # 4. Transition penalties (SOFT - for ALLOWED transitions only)
     # Forbidden transitions are already prevented by HARD constraints
-    for line in lines:
-        for d in range(num_days - 1):
-            for grade1 in grades:
-                if line not in allowed_lines[grade1]:
+    for l, line in enumerate(lines):
+        if len(line_grades[l]) < 2:
+            continue
+        
+        # Changeover on day 0 from the grade carried in from before the horizon
+        if initial_grade[l] >= 0 and num_days > 0:
+            costs_from = transition_rules.cost_matrix(line, transition_penalty)[initial_grade[l]]
+            for g in line_grades[l]:
+                if g != initial_grade[l] and costs_from[g] != 0:
+                    objective_terms.append(int(costs_from[g]) * is_producing[g][l][0])
+        
+        changeover_cost = transition_rules.uniform_cost(line, transition_penalty, line_grades[l])
+        if options['changeover_encoding'] == 'indicator' and changeover_cost is not None and campaign_engine:
+            # Every campaign starting the day after the line produced is a changeover
+            if changeover_cost == 0:
+                continue
+            for k, (g, follows_running_day, present) in enumerate(campaigns[l]):
+                changed = model.NewBoolVar(f'changed_{line}_{grades[g]}_{k}')
+                model.Add(changed >= follows_running_day + present - 1)
+                objective_terms.append(changeover_cost * changed)
+            continue
+        
+        if options['changeover_encoding'] == 'indicator' and changeover_cost is not None:
+            # Uniform cost: one "grade changed" literal per line-day. Some grade starts
+            # a run tomorrow while the line produces today.
+            if changeover_cost == 0:
+                continue
+            for d in range(num_days - 1):
+                lower_bound = (
+                    sum(run_starts[g][l][d + 1] for g in line_grades[l])
+                    + sum(is_producing[g][l][d] for g in line_grades[l]) - 1
+                )
+                # A bound over fixed cells only is a constant: >= 1 is a certain
+                # changeover, <= 0 imposes nothing
+                if isinstance(lower_bound, int):
+                    if lower_bound >= 1:
+                        objective_terms.append(changeover_cost)
                     continue
-                for grade2 in grades:
-                    if line not in allowed_lines[grade2] or grade1 == grade2:
-                        continue
-                    
-                    # Skip if this is a forbidden transition (already handled as HARD)
-                    if (transition_rules.get(line) and 
-                        grade1 in transition_rules[line] and 
-                        grade2 not in transition_rules[line][grade1]):
+                changed = model.NewBoolVar(f'changed_{line}_{d}')
+                model.Add(changed >= lower_bound)
+                objective_terms.append(changeover_cost * changed)
+            continue
+        
+        forbidden = transition_rules.forbidden_matrix(line)
+        costs = transition_rules.cost_matrix(line, transition_penalty)
+        allowed_pairs = [
+            (grade1, grade2)
+            for grade1 in line_grades[l]
+            for grade2 in line_grades[l]
+            if grade1 != grade2 and not forbidden[grade1, grade2] and costs[grade1, grade2] != 0
+        ]
+        for d in range(num_days - 1):
+            for grade1, grade2 in allowed_pairs:
+                prod_from = is_producing[grade1][l][d]
+                prod_to = is_producing[grade2][l][d + 1]
+                cost = int(costs[grade1, grade2])
+                
+                # Fixed cells: a fixed 0 rules the transition out, a fixed 1 leaves
+                # the other cell as the transition literal
+                if isinstance(prod_from, int) or isinstance(prod_to, int):
+                    if (isinstance(prod_from, int) and prod_from == 0) or (isinstance(prod_to, int) and prod_to == 0):
                         continue
-                    
-                    # Only penalize ALLOWED transitions
-                    trans_var = model.NewBoolVar(f'trans_{line}_{d}_{grade1}_to_{grade2}')
-                    
-                    # Link transition variable to production decisions
-                    model.Add(trans_var <= is_producing[(grade1, line, d)])
-                    model.Add(trans_var <= is_producing[(grade2, line, d + 1)])
-                    model.Add(trans_var >= is_producing[(grade1, line, d)] + 
-                              is_producing[(grade2, line, d + 1)] - 1)
-                    
-                    objective_terms.append(transition_penalty * trans_var)
+                    objective_terms.append(cost * (prod_to if isinstance(prod_from, int) else prod_from))
+                    continue
+                
+                # Only penalize ALLOWED transitions
+                trans_var = model.NewBoolVar(f'trans_{line}_{d}_{grades[grade1]}_to_{grades[grade2]}')
+                
+                # Link transition variable to production decisions
+                model.Add(trans_var <= prod_from)
+                model.Add(trans_var <= prod_to)
+                model.Add(trans_var >= prod_from + prod_to - 1)
+                
+                objective_terms.append(cost * trans_var)
     
     # 5. Idle line penalty (SOFT - to minimize gaps, but not required)
-    idle_penalty = 500  # Lower than transition penalty to prioritize min runs
-    for line in lines:
+    idle_penalty = IDLE_LINE_PENALTY  # Lower than transition penalty to prioritize min runs
+    for l, line in enumerate(lines):
         for d in range(num_days):
-            if line in shutdown_periods and d in shutdown_periods[line]:
+            if calendar.is_shutdown(line, d):
                 continue
-                
-            is_idle = model.NewBoolVar(f'idle_{line}_{d}')
             
-            producing_vars = [
-                is_producing[(grade, line, d)] 
-                for grade in grades 
-                if (grade, line, d) in is_producing
-            ]
+            producing_vars = [is_producing[g][l][d] for g in line_grades[l]]
+            if producing_vars and all(isinstance(prod, int) for prod in producing_vars):
+                # Every cell fixed: the idle cost is a constant
+                if not any(producing_vars):
+                    objective_terms.append(idle_penalty)
+                continue
+            
+            is_idle = model.NewBoolVar(f'idle_{line}_{d}')
             
             if producing_vars:
                 model.Add(sum(producing_vars) == 0).OnlyEnforceIf(is_idle)
@@ -733,6 +1157,28 @@ def build_and_solve_model(
     else:
         model.Minimize(0)
     
+    return ScheduleModel(
+        instance, model, options, production, inventory_vars, stockout_vars, is_producing,
+        inventory_deficit_penalties, closing_inventory_deficit_penalties, time.time() - build_start, scale
+    )
+
+
+def solve_model(
+    schedule_model: ScheduleModel,
+    time_limit_min: float,
+    progress_callback=None,
+    log_search_progress: bool = True,
+    log_callback=None,
+    on_solve_start=None
+) -> Tuple[int, SolutionCallback, cp_model.CpSolver]:
+    """Solve a built model, capturing every improving solution
+    
+    ``log_callback`` receives the solver log line by line instead of stdout.
+    ``on_solve_start`` receives (solver, solution_callback) just before the
+    search, e.g. to follow it or stop it from another thread with
+    solver.StopSearch().
+    """
+    
     if progress_callback:
         progress_callback(0.8, "Solving optimization problem...")
     
@@ -741,17 +1187,87 @@ def build_and_solve_model(
     solver.parameters.max_time_in_seconds = time_limit_min * 60.0
     solver.parameters.num_search_workers = SOLVER_NUM_WORKERS
     solver.parameters.random_seed = SOLVER_RANDOM_SEED
-    solver.parameters.log_search_progress = True
+    solver.parameters.log_search_progress = log_search_progress
     
-    solution_callback = SolutionCallback(
-        production, inventory_vars, stockout_vars, is_producing,
-        grades, lines, dates, formatted_dates, num_days,
-        inventory_deficit_penalties, closing_inventory_deficit_penalties
-    )
+    solution_callback = schedule_model.new_solution_callback()
     
-    status = solver.Solve(model, solution_callback)
+    if log_callback is not None:
+        solver.parameters.log_search_progress = True
+        solver.parameters.log_to_stdout = False
+        solver.log_callback = log_callback
+    
+    if on_solve_start is not None:
+        on_solve_start(solver, solution_callback)
+    status = solver.Solve(schedule_model.model, solution_callback)
     
     if progress_callback:
         progress_callback(1.0, "Optimization complete!")
     
     return status, solution_callback, solver
+
+
+def build_and_solve_model(
+    instance: ProblemInstance,
+    stockout_penalty: int,
+    transition_penalty: int,
+    time_limit_min: int,
+    progress_callback=None,
+    model_options: Optional[Dict] = None,
+    warm_start: Optional[Dict] = None,
+    on_solve_start=None
+) -> Tuple[int, SolutionCallback, cp_model.CpSolver]:
+    """Build and solve the optimization model
+    
+    ``warm_start`` is a previous solution dict used as hints; the callback's
+    ``warm_start`` then reports hint coverage and how much of the hint the
+    first and final solutions kept.
+    """
+    schedule_model = build_model(instance, stockout_penalty, transition_penalty, model_options, progress_callback)
+    if warm_start is None:
+        return solve_model(schedule_model, time_limit_min, progress_callback, on_solve_start=on_solve_start)
+    
+    report = schedule_model.hint_solution(warm_start)
+    if progress_callback:
+        progress_callback(0.75, f"Warm start: hinted {report['coverage']:.0%} of the schedule")
+    status, solution_callback, solver = solve_model(
+        schedule_model, time_limit_min, progress_callback, on_solve_start=on_solve_start
+    )
+    if solution_callback.num_solutions() > 0:
+        report['first_agreement'] = schedule_model.hint_agreement(solution_callback.solutions[0])
+        report['final_agreement'] = schedule_model.hint_agreement(solution_callback.solutions[-1])
+        report['first_solution_s'] = solution_callback.solution_times[0]
+    solution_callback.warm_start = report
+    return status, solution_callback, solver
+
+
+def solution_cells(instance: ProblemInstance, solution: Dict) -> np.ndarray:
+    """is_producing values of a solution dict as a G x L x D int8 array (-1 where the grade cannot run)"""
+    cells = np.where(instance.allowed[:, :, None], 0, FREE_CELL).astype(np.int8)
+    cells = np.broadcast_to(cells, (instance.num_grades, instance.num_lines, instance.num_days)).copy()
+    for l, line in enumerate(instance.lines):
+        line_schedule = solution['is_producing'].get(line, {})
+        for d, date_key in enumerate(instance.formatted_dates):
+            grade = line_schedule.get(date_key)
+            if grade is not None:
+                cells[instance.grade_index[grade], l, d] = 1
+    return cells
+
+
+def solve_fixed_schedule(
+    instance: ProblemInstance,
+    stockout_penalty: int,
+    transition_penalty: int,
+    cells: np.ndarray,
+    model_options: Optional[Dict] = None,
+    time_limit_min: float = 1.0,
+    on_solve_start=None
+) -> Tuple[int, SolutionCallback, cp_model.CpSolver]:
+    """Evaluate a complete schedule on the full model
+    
+    Every is_producing cell is pinned to ``cells`` (G x L x D, 1 = producing),
+    so the solve only settles inventory and stockouts and returns the exact
+    objective, or no solution if the schedule breaks a hard constraint.
+    """
+    options = dict(model_options or {}, fixed_cells='constants')
+    schedule_model = build_model(instance, stockout_penalty, transition_penalty, options, fixed_cells=cells)
+    return solve_model(schedule_model, time_limit_min, log_search_progress=False, on_solve_start=on_solve_start)
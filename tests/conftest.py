@@ -0,0 +1,30 @@
+import copy
+import os
+import sys
+
+import pytest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+TEMPLATE_PATH = os.path.join(REPO_ROOT, 'polymer_production_template.xlsx')
+
+_template_data = None
+
+
+@pytest.fixture
+def template_data():
+    """Validated sheets of the bundled template workbook (a fresh copy per test)"""
+    global _template_data
+    if _template_data is None:
+        from headless import load_workbook
+        _template_data, _ = load_workbook(TEMPLATE_PATH, use_cache=False)
+    return copy.deepcopy(_template_data)
+
+
+@pytest.fixture
+def template_instance(template_data):
+    from problem_instance import build_problem_instance
+    instance, _ = build_problem_instance(template_data, 3)
+    return instance
@@ -0,0 +1,61 @@
+from datetime import date, timedelta
+
+import numpy as np
+
+from calendar_index import CalendarIndex, contiguous_blocks
+
+START = date(2025, 11, 1)
+
+
+def _calendar(num_days, shutdown_days=None):
+    return CalendarIndex([START + timedelta(days=d) for d in range(num_days)], shutdown_days, ['L1'])
+
+
+def test_contiguous_blocks():
+    assert contiguous_blocks([]) == []
+    assert contiguous_blocks([4]) == [(4, 4)]
+    assert contiguous_blocks([7, 3, 4, 5, 4, 9]) == [(3, 5), (7, 7), (9, 9)]
+
+
+def test_day_range():
+    calendar = _calendar(10)
+    assert calendar.day_range(START, START) == [0]
+    assert calendar.day_range(START + timedelta(days=8), START + timedelta(days=20)) == [8, 9]
+    assert calendar.day_range(START - timedelta(days=5), START + timedelta(days=1)) == [0, 1]
+    assert calendar.day_range(START + timedelta(days=10), START + timedelta(days=12)) == []
+    assert calendar.day_range(START + timedelta(days=3), START + timedelta(days=2)) == []
+
+
+def test_day_range_on_empty_horizon():
+    assert _calendar(0).day_range(START, START + timedelta(days=3)) == []
+
+
+def test_next_unavailable_with_block_at_horizon_end():
+    calendar = _calendar(6, {'L1': [4, 5]})
+    assert calendar.shutdown_blocks['L1'] == [(4, 5)]
+    assert [calendar.next_unavailable('L1', d) for d in range(6)] == [4, 4, 4, 4, 4, 5]
+    assert calendar.window_available('L1', 0, 4)
+    assert not calendar.window_available('L1', 1, 4)
+
+
+def test_next_unavailable_without_shutdowns():
+    calendar = _calendar(3)
+    assert [calendar.next_unavailable('L1', d) for d in range(3)] == [3, 3, 3]
+    assert calendar.next_unavailable('unknown line', 1) == 3
+    assert calendar.window_available('L1', 0, 3)
+    assert not calendar.window_available('L1', 1, 3)
+
+
+def test_single_day_horizon():
+    calendar = _calendar(1, {'L1': [0, 3]})
+    assert calendar.shutdown_blocks['L1'] == [(0, 0)]
+    assert calendar.next_unavailable('L1', 0) == 0
+    assert calendar.is_shutdown('L1', 0)
+    assert calendar.day_range(START, START) == [0]
+
+
+def test_indices_of():
+    calendar = _calendar(5)
+    values = np.array(['2025-11-03', 'NaT', '2025-10-31', '2025-11-06'], dtype='datetime64[D]')
+    assert calendar.indices_of(values).tolist() == [2, -1, -1, -1]
+    assert _calendar(0).indices_of(values).tolist() == [-1, -1, -1, -1]
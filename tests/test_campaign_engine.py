@@ -0,0 +1,80 @@
+import pandas as pd
+import pytest
+from ortools.sat.python import cp_model
+
+from problem_instance import build_problem_instance
+from solver_cp_sat import build_model, solve_model
+
+
+def solve_with_both_engines(instance, model_options=None):
+    """Best solution of the day-grid and the campaign engine, both required optimal"""
+    results = {}
+    for engine in ('day_grid', 'campaign'):
+        schedule_model = build_model(instance, 10, 5, model_options, campaign_engine=engine == 'campaign')
+        status, solution_callback, solver = solve_model(schedule_model, 0.5, log_search_progress=False)
+        assert status == cp_model.OPTIMAL
+        results[engine] = solution_callback.solutions[-1]
+    return results
+
+
+def test_zero_day_material_block_forces_changeover(template_data):
+    # Moulding ran until the horizon start on Plant1 and is short of stock: restarting it on day 0 would pay
+    template_data['Plant'].loc[template_data['Plant']['Plant'] == 'Plant1', 'Expected Run Days'] = 0
+    inventory = template_data['Inventory']
+    moulding = inventory['Grade Name'] == 'Moulding'
+    inventory.loc[moulding, 'Opening Inventory'] = 0
+    inventory.loc[moulding, 'Min. Inventory'] = 0
+    template_data['Demand'] = template_data['Demand'].head(10)
+    instance, _ = build_problem_instance(template_data, 0)
+    
+    results = solve_with_both_engines(instance)
+    
+    assert results['campaign']['objective'] == results['day_grid']['objective']
+    first_day = instance.formatted_dates[0]
+    assert results['campaign']['is_producing']['Plant1'][first_day] != 'Moulding'
+
+
+def two_grade_instance(template_data, num_days):
+    """Plant1 running Moulding and Raffia only, with max run 2 and no rerun limit"""
+    plant = template_data['Plant']
+    template_data['Plant'] = plant[plant['Plant'] == 'Plant1']
+    inventory = template_data['Inventory']
+    inventory = inventory[inventory['Grade Name'].isin(['Moulding', 'Raffia'])].copy()
+    inventory['Lines'] = 'Plant1'
+    inventory['Min. Run Days'] = 1
+    inventory['Max. Run Days'] = 2
+    inventory['Rerun Allowed'] = 'Yes'
+    template_data['Inventory'] = inventory
+    template_data['Demand'] = template_data['Demand'][['Date', 'Moulding', 'Raffia']].head(num_days)
+    template_data['Transition_Plant1'] = template_data['Transition_Plant1'].loc[
+        ['Moulding', 'Raffia'], ['Moulding', 'Raffia']
+    ]
+    del template_data['Transition_Plant2']
+    instance, _ = build_problem_instance(template_data, 0)
+    return instance
+
+
+def test_engines_agree_when_more_campaigns_are_needed(template_data):
+    # Max run 2 over 30 days needs at least 10 runs per line, so each grade needs more than 6 campaigns
+    instance = two_grade_instance(template_data, 30)
+    
+    results = solve_with_both_engines(instance)
+    
+    assert results['campaign']['objective'] == results['day_grid']['objective']
+
+
+@pytest.mark.parametrize('fixed_cells', ['constraints', 'constants'])
+def test_engines_agree_across_a_gap_without_production(template_data, fixed_cells):
+    # Plant1 stops for three days mid-horizon; a campaign resuming after the gap is not a changeover
+    plant = template_data['Plant']
+    plant1 = plant['Plant'] == 'Plant1'
+    start = template_data['Demand']['Date'].iloc[5]
+    plant.loc[plant1, 'Shutdown Start Date'] = start
+    plant.loc[plant1, 'Shutdown End Date'] = start + pd.Timedelta(days=2)
+    instance = two_grade_instance(template_data, 15)
+    
+    results = solve_with_both_engines(instance, {'fixed_cells': fixed_cells})
+    
+    gap_day = instance.formatted_dates[6]
+    assert results['day_grid']['is_producing']['Plant1'][gap_day] is None
+    assert results['campaign']['objective'] == results['day_grid']['objective']
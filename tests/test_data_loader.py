@@ -0,0 +1,20 @@
+import io
+import logging
+import os
+
+from data_loader import ExcelDataLoader
+
+TEMPLATE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'polymer_production_template.xlsx')
+
+
+def test_load_logs_timings_per_stage(caplog):
+    with open(TEMPLATE_PATH, 'rb') as f:
+        loader = ExcelDataLoader(io.BytesIO(f.read()))
+    
+    with caplog.at_level(logging.INFO, logger='data_loader'):
+        success, data, errors, warnings = loader.load_and_validate()
+    
+    assert success
+    assert set(loader.timings) == {'open'} | set(data)
+    assert "Workbook loaded in" in caplog.text
+    assert all(f"{step} " in caplog.text for step in loader.timings)
@@ -0,0 +1,46 @@
+import pandas as pd
+
+from feasibility import SEVERITY_ERROR, SEVERITY_WARNING, analyze_feasibility, has_errors
+from problem_instance import build_problem_instance
+
+
+def _set_grade(data, grade, column, value):
+    inventory = data['Inventory']
+    inventory[column] = inventory[column].astype(object)
+    inventory.loc[inventory['Grade Name'] == grade, column] = value
+
+
+def _analyze(data):
+    instance, _ = build_problem_instance(data, 3)
+    return analyze_feasibility(instance)
+
+
+def test_template_has_no_errors(template_data):
+    assert not has_errors(_analyze(template_data))
+
+
+def test_unknown_line_is_reported(template_data):
+    _set_grade(template_data, 'Yarn', 'Lines', 'Plant2, Plant9')
+    issues = [issue for issue in _analyze(template_data) if 'Plant9' in issue['message']]
+    assert len(issues) == 1
+    assert issues[0]['severity'] == SEVERITY_WARNING
+    assert issues[0]['sheet'] == 'Inventory'
+    assert issues[0]['row'] is not None
+
+
+def test_force_start_outside_horizon_is_reported(template_data):
+    _set_grade(template_data, 'TQPP', 'Force Start Date', pd.Timestamp('2026-03-01'))
+    issues = [issue for issue in _analyze(template_data) if 'outside the planning horizon' in issue['message']]
+    # TQPP runs on both plants, so one issue per line
+    assert len(issues) == 2
+    assert all(issue['severity'] == SEVERITY_WARNING for issue in issues)
+
+
+def test_force_start_on_shutdown_day_is_an_error(template_data):
+    # Plant2 is shut down from 12-Nov-25; TQPP may only run on Plant2
+    _set_grade(template_data, 'TQPP', 'Lines', 'Plant2')
+    _set_grade(template_data, 'TQPP', 'Force Start Date', pd.Timestamp('2025-11-13'))
+    issues = _analyze(template_data)
+    assert any(
+        issue['severity'] == SEVERITY_ERROR and 'shutdown day' in issue['message'] for issue in issues
+    )
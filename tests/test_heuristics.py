@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+from constants import IDLE_LINE_PENALTY
+from heuristics import greedy_schedule, greedy_solution, schedule_solution
+from problem_instance import build_problem_instance
+from solver_cp_sat import build_and_solve_model
+
+
+@pytest.mark.parametrize('buffer_days', [0, 3])
+def test_template_greedy_plan_follows_the_rules(template_data, buffer_days):
+    instance, _ = build_problem_instance(template_data, buffer_days)
+    solution = greedy_solution(instance, 10, 5)
+    assert solution['violations'] == []
+
+
+@pytest.mark.parametrize('grade, day', [
+    ('Yarn', 1),   # inside Plant2's BOPP material running block
+    ('BOPP', 3),   # the changeover day after the material block
+    ('Yarn', 12),  # a Plant2 shutdown day
+])
+def test_force_start_conflicts_are_reported(template_instance, grade, day):
+    instance = template_instance
+    g, l = instance.grades.index(grade), instance.lines.index('Plant2')
+    instance.force_start[g, l] = day
+    
+    schedule = greedy_schedule(instance, 10, 5)
+    assert schedule[l, day] != g
+    violations = greedy_solution(instance, 10, 5)['violations']
+    assert f"Plant2: conflicting rules fix {grade} on {instance.formatted_dates[day]}" in violations
+
+
+def test_simulated_objective_matches_the_solver(template_instance):
+    instance = template_instance
+    status, solution_callback, solver = build_and_solve_model(instance, 10, 5, 0.1)
+    solution = solution_callback.solutions[-1]
+    schedule = np.array([
+        [instance.grade_index.get(grade, -1) for grade in solution['is_producing'][line].values()]
+        for line in instance.lines
+    ])
+    
+    assert schedule_solution(instance, schedule, 10, 5)['objective'] == solution['objective']
+    
+    # A line left idle outside a shutdown pays the solver's idle penalty
+    schedule[0, 5] = -1
+    assert schedule_solution(instance, schedule, 10, 5)['objective_breakdown']['idle'] == IDLE_LINE_PENALTY
@@ -0,0 +1,18 @@
+import time
+
+from ortools.sat.python import cp_model
+
+from lns import solve_lns
+from problem_instance import build_problem_instance
+
+
+def test_optimal_initial_solve_ends_the_search(template_data):
+    # Eight days solve to optimality at once; LNS must not spend its minute on neighborhoods
+    template_data['Demand'] = template_data['Demand'].head(8)
+    instance, _ = build_problem_instance(template_data, 0)
+    
+    start = time.time()
+    status, solution_callback, solver = solve_lns(instance, 10, 5, 1.0)
+    assert status == cp_model.OPTIMAL
+    assert solution_callback.num_solutions() > 0
+    assert time.time() - start < 10
@@ -0,0 +1,48 @@
+import pickle
+
+import numpy as np
+
+from instance_snapshot import _ARRAY_FIELDS, load_snapshot, save_snapshot
+
+
+def _assert_same_instance(actual, expected):
+    assert actual.grades == expected.grades
+    assert actual.lines == expected.lines
+    assert actual.dates == expected.dates
+    assert actual.buffer_days == expected.buffer_days
+    assert actual.unknown_lines == expected.unknown_lines
+    for name in _ARRAY_FIELDS:
+        np.testing.assert_array_equal(getattr(actual, name), getattr(expected, name), err_msg=name)
+    for line in expected.lines:
+        np.testing.assert_array_equal(actual.calendar.available[line], expected.calendar.available[line])
+        np.testing.assert_array_equal(
+            actual.transitions.forbidden_matrix(line), expected.transitions.forbidden_matrix(line)
+        )
+
+
+def test_build_from_template(template_instance):
+    instance = template_instance
+    assert instance.grades == ['BOPP', 'Moulding', 'Raffia', 'TQPP', 'Yarn']
+    assert instance.lines == ['Plant1', 'Plant2']
+    assert instance.num_days == 30 + 3
+    assert instance.demand.shape == (5, 33)
+    assert instance.capacities.tolist() == [1500, 1000]
+    # Yarn only runs on Plant2
+    assert instance.allowed[instance.grade_index['Yarn']].tolist() == [False, True]
+    assert instance.material_grade.tolist() == [instance.grade_index['Moulding'], instance.grade_index['BOPP']]
+    assert instance.material_days.tolist() == [1, 3]
+    assert instance.calendar.shutdown_blocks['Plant2'] == [(11, 14)]
+    assert instance.pre_shutdown_grade.tolist() == [-1, instance.grade_index['Raffia']]
+    assert (instance.force_start == -1).all()
+    assert not instance.has_initial_state
+
+
+def test_pickle_round_trip(template_instance):
+    _assert_same_instance(pickle.loads(pickle.dumps(template_instance)), template_instance)
+
+
+def test_snapshot_round_trip_preserves_every_array_field(template_instance):
+    params = {'time_limit_min': 2, 'stockout_penalty': 10, 'transition_penalty': 5, 'rolling_horizon': [42, 21]}
+    instance, loaded_params = load_snapshot(save_snapshot(template_instance, params))
+    assert loaded_params == params
+    _assert_same_instance(instance, template_instance)
@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+from ortools.sat.python import cp_model
+
+from rolling_horizon import solve_rolling_horizon
+
+
+@pytest.mark.parametrize('window_days', [11, 15])
+def test_shutdown_pins_survive_window_boundaries(template_instance, window_days):
+    # Plant2 is shut down on days 11-14: with 11-day windows the block starts on a window boundary,
+    # with 15-day windows the restart day opens a window
+    status, solution_callback, solver = solve_rolling_horizon(
+        template_instance, 10, 5, 0.3, window_days=window_days, commit_days=window_days
+    )
+    assert status in (cp_model.OPTIMAL, cp_model.FEASIBLE)
+    schedule = solution_callback.solutions[-1]['is_producing']['Plant2']
+    dates = template_instance.formatted_dates
+    assert schedule[dates[10]] == 'Raffia'
+    assert schedule[dates[15]] == 'Raffia'
+
+
+@pytest.mark.parametrize('window_days, commit_days', [(5, 5), (6, 3), (4, 2), (8, 4)])
+def test_small_windows_stitch_feasibly(template_instance, window_days, commit_days):
+    status, solution_callback, solver = solve_rolling_horizon(
+        template_instance, 10, 5, 0.1, window_days=window_days, commit_days=commit_days
+    )
+    assert status in (cp_model.OPTIMAL, cp_model.FEASIBLE)
+    assert solution_callback.num_solutions() > 0
+
+
+@pytest.mark.parametrize('min_run', [
+    [[3, 3], [1, 4], [2, 1], [2, 1], [3, 4]],
+    [[2, 2], [3, 3], [2, 2], [2, 2], [4, 3]],
+])
+def test_runs_crossing_window_end_keep_min_run(template_instance, min_run):
+    # Runs that cross a window end must still owe their min run: exempting them there left the
+    # stitched schedule with short runs that the full-horizon evaluation rejects
+    template_instance.min_run = np.array(min_run)
+    status, solution_callback, solver = solve_rolling_horizon(
+        template_instance, 10, 5, 0.1, window_days=5, commit_days=5
+    )
+    assert status in (cp_model.OPTIMAL, cp_model.FEASIBLE)
+    assert solution_callback.num_solutions() > 0
@@ -0,0 +1,29 @@
+from solve_jobs import JOB_CANCELLED, JOB_DONE, SolveJob
+from solver_cp_sat import build_and_solve_model
+
+
+def test_cancel_before_search_starts_stops_the_solve(template_instance):
+    job = SolveJob('race', template_instance, {})
+    
+    def solve(on_solve_start, **kwargs):
+        # Cancel after the job saw the solver but before solver.Solve runs
+        def on_start(solver, solution_callback):
+            on_solve_start(solver, solution_callback)
+            job.cancel()
+        return build_and_solve_model(on_solve_start=on_start, **kwargs)
+    
+    job._run(solve, dict(stockout_penalty=10, transition_penalty=5, time_limit_min=0.5))
+    assert job.status == JOB_CANCELLED
+    # The template needs several seconds to prove optimality; the cancelled search ends early
+    assert job.elapsed < 5
+
+
+def test_stop_before_search_starts_keeps_the_job(template_instance):
+    job = SolveJob('early-stop', template_instance, {})
+    # "Stop and Keep Best" clicked before the solve has reached the solver
+    job.stop()
+    
+    job._run(build_and_solve_model, dict(stockout_penalty=10, transition_penalty=5, time_limit_min=0.5))
+    assert job.status == JOB_DONE
+    assert job.stopped_early
+    assert job.elapsed < 5
@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+
+from transition_matrix import TransitionMatrix, transition_matrix_from_frames
+
+GRADES = ['A', 'B', 'C', 'D']
+
+
+def _sheet():
+    # No row and no column for D; the A -> A cell says No
+    return pd.DataFrame(
+        [['No', 'No', 'Yes'], ['yes', 'Yes', 'no'], ['Yes', 'YES', 'Yes']],
+        index=pd.Index(['A', 'B', 'C'], name='From'), columns=['A', 'B', 'C'],
+    )
+
+
+def _matrix(costs=None):
+    matrix = transition_matrix_from_frames({'Transition_L1': _sheet()}, GRADES)
+    return TransitionMatrix(GRADES, matrix.allowed, matrix.rows_defined, costs)
+
+
+def test_forbidden_needs_a_defined_row_a_non_yes_cell_and_distinct_grades():
+    transitions = _matrix()
+    assert transitions.lines == ['L1']
+    assert transitions.forbidden_pairs('L1') == [('A', 'B'), ('A', 'D'), ('B', 'C'), ('B', 'D'), ('C', 'D')]
+    assert not transitions.is_forbidden('L1', 'A', 'A')
+    assert not transitions.is_forbidden('L1', 'D', 'A')
+    assert transitions.allowed_next('L1', 'A') == ['A', 'C']
+    assert transitions.allowed_next('L1', 'D') == GRADES
+
+
+def test_line_without_sheet_has_no_rules():
+    transitions = _matrix()
+    assert not transitions.has_rules('L2')
+    assert not transitions.forbidden_matrix('L2').any()
+    assert not transitions.is_forbidden('L2', 'A', 'B')
+    assert not transitions.is_forbidden('L1', 'A', 'unknown')
+
+
+def test_uniform_cost_ignores_forbidden_pairs_and_the_diagonal():
+    costs = np.full((4, 4), 7, dtype=np.int64)
+    np.fill_diagonal(costs, 0)
+    costs[0, 1] = 99  # A -> B is forbidden
+    transitions = _matrix({'L1': costs})
+    assert transitions.uniform_cost('L1', 5) == 7
+    assert transitions.uniform_cost('L2', 5) == 5
+    
+    costs[2, 0] = 8  # C -> A is allowed
+    transitions = _matrix({'L1': costs})
+    assert transitions.uniform_cost('L1', 5) is None
+    assert transitions.uniform_cost('L1', 5, [0, 1, 3]) == 7
+    # A and B only: A -> B is forbidden, B -> A costs 7
+    assert transitions.uniform_cost('L1', 5, [0, 1]) == 7
+
+
+def test_uniform_cost_without_allowed_pairs_uses_the_default():
+    costs = np.full((4, 4), 9, dtype=np.int64)
+    transitions = _matrix({'L1': costs})
+    assert transitions.uniform_cost('L1', 5, [0]) == 5
@@ -0,0 +1,77 @@
+import os
+
+import workbook_cache
+from workbook_cache import WorkbookCache
+
+
+def _entry(name):
+    return {'Plant': name}, [f"warning for {name}"]
+
+
+def test_key_depends_on_content_and_format_version(monkeypatch):
+    key = WorkbookCache.key_for(b'workbook')
+    assert WorkbookCache.key_for(b'workbook') == key
+    assert WorkbookCache.key_for(b'workbook2') != key
+    monkeypatch.setattr(workbook_cache, 'CACHE_FORMAT_VERSION', workbook_cache.CACHE_FORMAT_VERSION + 1)
+    assert WorkbookCache.key_for(b'workbook') != key
+
+
+def test_round_trip_and_counters(tmp_path):
+    cache = WorkbookCache(str(tmp_path))
+    assert cache.get(b'a') is None
+    cache.put(b'a', *_entry('a'))
+    assert cache.get(b'a') == _entry('a')
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['entries']) == (1, 1, 1)
+
+
+def test_format_version_bump_invalidates_entries(tmp_path, monkeypatch):
+    cache = WorkbookCache(str(tmp_path))
+    cache.put(b'a', *_entry('a'))
+    monkeypatch.setattr(workbook_cache, 'CACHE_FORMAT_VERSION', workbook_cache.CACHE_FORMAT_VERSION + 1)
+    assert cache.get(b'a') is None
+
+
+def test_corrupt_entry_is_dropped(tmp_path):
+    cache = WorkbookCache(str(tmp_path))
+    cache.put(b'a', *_entry('a'))
+    path = cache._path_for(cache.key_for(b'a'))
+    with open(path, 'wb') as f:
+        f.write(b'not a pickle')
+    assert cache.get(b'a') is None
+    assert not os.path.exists(path)
+
+
+def test_eviction_drops_least_recently_used(tmp_path):
+    cache = WorkbookCache(str(tmp_path))
+    cache.put(b'a', *_entry('a'))
+    entry_size = cache.stats()['size_bytes']
+    cache.max_size_bytes = int(entry_size * 2.5)
+    cache.put(b'b', *_entry('b'))
+    
+    # Make 'a' older than 'b', then use it so 'b' becomes the least recently used
+    os.utime(cache._path_for(cache.key_for(b'a')), (1000, 1000))
+    os.utime(cache._path_for(cache.key_for(b'b')), (2000, 2000))
+    assert cache.get(b'a') is not None
+    cache.put(b'c', *_entry('c'))
+    
+    assert cache.stats()['entries'] == 2
+    assert cache.get(b'b') is None
+    assert cache.get(b'a') is not None
+    assert cache.get(b'c') is not None
+
+
+def test_newest_entry_is_kept_over_the_bound(tmp_path):
+    cache = WorkbookCache(str(tmp_path), max_size_mb=0)
+    cache.put(b'a', *_entry('a'))
+    os.utime(cache._path_for(cache.key_for(b'a')), (1000, 1000))
+    cache.put(b'b', *_entry('b'))
+    assert cache.stats()['entries'] == 1
+    assert cache.get(b'b') == _entry('b')
+
+
+def test_default_cache_dir_does_not_depend_on_the_working_directory(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    cache_dir = WorkbookCache().cache_dir
+    assert os.path.isabs(cache_dir)
+    assert not cache_dir.startswith(str(tmp_path))
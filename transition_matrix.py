@@ -0,0 +1,123 @@
+"""
+Boolean transition matrices aligned to a global grade index
+"""
+
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional, Tuple
+
+
+class TransitionMatrix:
+    """Allowed grade-to-grade transitions per line
+    
+    ``allowed[line][i, j]`` is True when grade ``grades[i]`` may be followed by
+    ``grades[j]`` on the next day. A transition is only forbidden when the
+    line's sheet has a row for the previous grade, the cell is not 'Yes' and
+    the grades differ; lines without a sheet have no restrictions.
+    
+    ``costs[line][i, j]`` optionally overrides the changeover penalty of each
+    (previous, next) pair on a line; lines without a cost matrix use the
+    uniform transition penalty.
+    """
+    
+    def __init__(self, grades: List[str], allowed: Optional[Dict[str, np.ndarray]] = None,
+                 rows_defined: Optional[Dict[str, np.ndarray]] = None,
+                 costs: Optional[Dict[str, np.ndarray]] = None):
+        self.grades = list(grades)
+        self.grade_index = {grade: i for i, grade in enumerate(self.grades)}
+        self.allowed = dict(allowed or {})
+        self.rows_defined = dict(rows_defined or {})
+        self.costs = {line: np.asarray(matrix, dtype=np.int64) for line, matrix in (costs or {}).items()}
+        self._forbidden = {
+            line: self.rows_defined[line][:, None] & ~matrix & ~np.eye(len(self.grades), dtype=bool)
+            for line, matrix in self.allowed.items()
+        }
+    
+    @property
+    def lines(self) -> List[str]:
+        return list(self.allowed.keys())
+    
+    def has_rules(self, line: str) -> bool:
+        rows = self.rows_defined.get(line)
+        return rows is not None and bool(rows.any())
+    
+    def forbidden_matrix(self, line: str) -> np.ndarray:
+        """Boolean grades x grades matrix of forbidden (previous, next) pairs"""
+        matrix = self._forbidden.get(line)
+        if matrix is None:
+            return np.zeros((len(self.grades), len(self.grades)), dtype=bool)
+        return matrix
+    
+    def is_forbidden(self, line: str, prev_grade: str, next_grade: str) -> bool:
+        matrix = self._forbidden.get(line)
+        if matrix is None:
+            return False
+        i = self.grade_index.get(prev_grade)
+        j = self.grade_index.get(next_grade)
+        if i is None or j is None:
+            return False
+        return bool(matrix[i, j])
+    
+    def forbidden_pairs(self, line: str) -> List[Tuple[str, str]]:
+        """Forbidden (previous, next) grade pairs in grade order"""
+        rows, cols = np.nonzero(self.forbidden_matrix(line))
+        return [(self.grades[i], self.grades[j]) for i, j in zip(rows.tolist(), cols.tolist())]
+    
+    def cost_matrix(self, line: str, default_cost: int) -> np.ndarray:
+        """Changeover penalty per (previous, next) pair; default_cost where no matrix is set"""
+        matrix = self.costs.get(line)
+        if matrix is None:
+            return np.full((len(self.grades), len(self.grades)), default_cost, dtype=np.int64)
+        return matrix
+    
+    def uniform_cost(self, line: str, default_cost: int, grade_indices: Optional[List[int]] = None) -> Optional[int]:
+        """The single changeover penalty shared by all allowed pairs among grade_indices, or None if they differ"""
+        matrix = self.costs.get(line)
+        if matrix is None:
+            return default_cost
+        indices = np.arange(len(self.grades)) if grade_indices is None else np.asarray(grade_indices, dtype=np.int64)
+        sub = matrix[np.ix_(indices, indices)]
+        mask = ~self.forbidden_matrix(line)[np.ix_(indices, indices)] & ~np.eye(len(indices), dtype=bool)
+        values = np.unique(sub[mask])
+        if values.size == 0:
+            return default_cost
+        return int(values[0]) if values.size == 1 else None
+    
+    def allowed_next(self, line: str, prev_grade: str) -> List[str]:
+        """Grades that may follow prev_grade on this line"""
+        i = self.grade_index.get(prev_grade)
+        if i is None:
+            return list(self.grades)
+        forbidden = self.forbidden_matrix(line)[i]
+        return [grade for grade, blocked in zip(self.grades, forbidden.tolist()) if not blocked]
+
+
+def transition_matrix_from_frames(transition_dfs: Dict[str, pd.DataFrame],
+                                  grades: Optional[List[str]] = None) -> TransitionMatrix:
+    """Build per-line matrices from Transition_<line> sheets (rows: previous grade, columns: next grade)"""
+    frames = {}
+    for sheet_name, df in transition_dfs.items():
+        # Extract plant name from sheet name (e.g., "Transition_Plant1" -> "Plant1")
+        if sheet_name.startswith('Transition_'):
+            plant_name = sheet_name.replace('Transition_', '')
+        else:
+            plant_name = sheet_name
+        if df is not None:
+            frames[plant_name] = df[~df.index.duplicated(keep='last')]
+    
+    if grades is None:
+        grades = []
+        for df in frames.values():
+            for grade in list(df.index) + list(df.columns):
+                if grade not in grades:
+                    grades.append(grade)
+    
+    allowed = {}
+    rows_defined = {}
+    for plant_name, df in frames.items():
+        # One vectorized comparison per sheet, then align to the global grade index
+        is_yes = df.astype(str).apply(lambda col: col.str.lower()) == 'yes'
+        allowed[plant_name] = is_yes.reindex(index=grades, columns=grades, fill_value=False).to_numpy(dtype=bool)
+        rows_defined[plant_name] = np.isin(np.array(grades, dtype=object), df.index.to_numpy(dtype=object))
+    
+    return TransitionMatrix(grades, allowed, rows_defined)
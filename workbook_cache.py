@@ -0,0 +1,129 @@
+"""
+Content-addressed on-disk cache of parsed and validated workbooks
+"""
+
+import hashlib
+import os
+import pickle
+import threading
+from typing import Dict, List, Optional, Tuple
+from constants import WORKBOOK_CACHE_DIR, WORKBOOK_CACHE_MAX_MB
+
+# Bump when the loader output changes so stale entries are never served
+CACHE_FORMAT_VERSION = 1
+
+
+class WorkbookCache:
+    """Stores validated sheet DataFrames keyed by a hash of the uploaded bytes"""
+    
+    def __init__(self, cache_dir: str = WORKBOOK_CACHE_DIR, max_size_mb: float = WORKBOOK_CACHE_MAX_MB):
+        self.cache_dir = cache_dir
+        self.max_size_bytes = int(max_size_mb * 1024 * 1024)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def key_for(file_bytes: bytes) -> str:
+        """Content hash used as the cache key"""
+        digest = hashlib.sha256(file_bytes)
+        digest.update(f"v{CACHE_FORMAT_VERSION}".encode())
+        return digest.hexdigest()
+    
+    def _path_for(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.pkl")
+    
+    def get(self, file_bytes: bytes) -> Optional[Tuple[Dict, List[str]]]:
+        """Return (sheet data, warnings) for a previously validated upload, or None"""
+        path = self._path_for(self.key_for(file_bytes))
+        with self._lock:
+            try:
+                with open(path, 'rb') as f:
+                    entry = pickle.load(f)
+                os.utime(path)  # mark as recently used for LRU eviction
+            except FileNotFoundError:
+                self.misses += 1
+                return None
+            except Exception:
+                # Corrupt or incompatible entry - drop it and re-parse
+                self._remove(path)
+                self.misses += 1
+                return None
+            self.hits += 1
+        return entry['data'], entry['warnings']
+    
+    def put(self, file_bytes: bytes, data: Dict, warnings: List[str]):
+        """Store validated sheet data, then evict least recently used entries over the size bound"""
+        path = self._path_for(self.key_for(file_bytes))
+        with self._lock:
+            try:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                tmp_path = f"{path}.{os.getpid()}.tmp"
+                with open(tmp_path, 'wb') as f:
+                    pickle.dump({'data': data, 'warnings': list(warnings)}, f, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(tmp_path, path)
+                self._evict()
+            except OSError:
+                # Caching is best-effort; a read-only disk must not break uploads
+                pass
+    
+    def stats(self) -> Dict:
+        """Hit/miss counters and current on-disk footprint"""
+        entries = self._entries()
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'entries': len(entries),
+            'size_bytes': sum(size for _, size, _ in entries),
+        }
+    
+    def clear(self):
+        """Delete every cached entry"""
+        with self._lock:
+            for path, _, _ in self._entries():
+                self._remove(path)
+    
+    def _entries(self) -> List[Tuple[str, int, float]]:
+        """(path, size, last-used time) for every cache file"""
+        entries = []
+        try:
+            names = os.listdir(self.cache_dir)
+        except FileNotFoundError:
+            return entries
+        for name in names:
+            if not name.endswith('.pkl'):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                st_info = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((path, st_info.st_size, st_info.st_mtime))
+        return entries
+    
+    def _evict(self):
+        entries = sorted(self._entries(), key=lambda e: e[2])
+        total = sum(size for _, size, _ in entries)
+        # Always keep the newest entry, even if it alone exceeds the bound
+        while total > self.max_size_bytes and len(entries) > 1:
+            path, size, _ = entries.pop(0)
+            self._remove(path)
+            total -= size
+    
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+_workbook_cache = None
+
+
+def get_workbook_cache() -> WorkbookCache:
+    """Process-wide cache instance shared by all sessions"""
+    global _workbook_cache
+    if _workbook_cache is None:
+        _workbook_cache = WorkbookCache()
+    return _workbook_cache